@@ -0,0 +1,78 @@
+import argparse
+import json
+import sys
+
+# Metrics where a larger value is an improvement; every other compared metric
+# is a time or a memory size, better when smaller. Maxima are left out as too noisy
+HIGHER_IS_BETTER = ("items_per_second",)
+COMPARED_SUFFIXES = ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "seconds", "_bytes", "items_per_second")
+# Whole stages faster than this are dominated by timer noise
+MIN_SECONDS = 0.005
+
+
+def flatten(results, prefix=""):
+    """Flattens nested result dictionaries into {"suite.scale.stage.metric": value}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, candidate, threshold=0.10):
+    """
+    Compares two benchmark reports metric by metric.
+
+    Args:
+        baseline (dict): Report written by run.py for the reference commit.
+        candidate (dict): Report for the commit under test.
+        threshold (float): Relative change beyond which a metric counts as a
+            regression or an improvement.
+
+    Returns:
+        list: (metric, baseline value, candidate value, relative change, verdict)
+        for every timing, throughput and memory metric present in both reports.
+    """
+    before, after = flatten(baseline["results"]), flatten(candidate["results"])
+    rows = []
+    for metric in sorted(before.keys() & after.keys()):
+        if not metric.endswith(COMPARED_SUFFIXES) or not before[metric]:
+            continue
+        stage_seconds = metric.rsplit(".", 1)[0] + ".seconds"
+        if max(before.get(stage_seconds, MIN_SECONDS), after.get(stage_seconds, MIN_SECONDS)) < MIN_SECONDS:
+            continue
+        change = (after[metric] - before[metric]) / abs(before[metric])
+        worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+        verdict = "regression" if worse > threshold else "improvement" if worse < -threshold else ""
+        rows.append((metric, before[metric], after[metric], change, verdict))
+    return rows
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    arg_parser.add_argument("baseline")
+    arg_parser.add_argument("candidate")
+    arg_parser.add_argument("--threshold", type=float, default=0.10,
+                            help="Relative change that counts as a regression (default 10%%).")
+    arg_parser.add_argument("--fail-on-regression", action="store_true",
+                            help="Exit with status 1 if any metric regressed.")
+    args = arg_parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline_report = json.load(f)
+    with open(args.candidate) as f:
+        candidate_report = json.load(f)
+    if baseline_report["meta"].get("trace_memory") != candidate_report["meta"].get("trace_memory"):
+        print("Warning: only one of the runs traced memory, so traced stage timings aren't comparable.")
+
+    rows = compare(baseline_report, candidate_report, args.threshold)
+    print(f"{baseline_report['meta']['revision']} -> {candidate_report['meta']['revision']}")
+    width = max((len(row[0]) for row in rows), default=10)
+    for metric, before_value, after_value, change, verdict in rows:
+        print(f"{metric:<{width}} {before_value:>14,.3f} {after_value:>14,.3f} {change:>+8.1%}  {verdict}")
+    regressions = [row for row in rows if row[4] == "regression"]
+    print(f"{len(regressions)} regressions, {sum(row[4] == 'improvement' for row in rows)} improvements")
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
@@ -0,0 +1,137 @@
+import random
+
+# Word lists for the synthetic corpora; combined at random so that texts share
+# vocabulary (and therefore embedding neighbours) the way real listings do
+_NEIGHBORHOOD_PREFIXES = ["Green", "Maple", "River", "Cedar", "Lake", "Oak", "Sunny", "Pine", "Harbor", "Willow",
+                          "Stone", "Meadow", "Hill", "Silver", "Brook", "Elm", "Fox", "Bay", "Park", "North"]
+_NEIGHBORHOOD_SUFFIXES = ["Oaks", "Heights", "Meadows", "Village", "Commons", "Crossing", "Grove", "Point",
+                          "Ridge", "Gardens", "Square", "Terrace", "Landing", "Valley", "Shores"]
+_HOME_TYPES = ["family home", "bungalow", "townhouse", "condo", "loft", "farmhouse", "colonial", "ranch",
+               "craftsman", "cottage", "modern build", "duplex"]
+_FEATURES = ["an open-concept kitchen", "hardwood floors", "a two-car garage", "solar panels", "a large backyard",
+             "a finished basement", "floor-to-ceiling windows", "a rooftop terrace", "a home office",
+             "a fireplace", "a swimming pool", "a vegetable garden", "quartz countertops", "a wraparound porch",
+             "smart home features", "vaulted ceilings", "a walk-in closet", "lake views", "city views"]
+_NEIGHBORHOOD_FEATURES = ["excellent schools", "quiet tree-lined streets", "vibrant nightlife", "farmers markets",
+                          "bike paths", "public transport", "hiking trails", "a community pool", "local cafes",
+                          "a dog park", "waterfront dining", "easy highway access", "a historic main street",
+                          "playgrounds", "organic grocery stores"]
+
+_BOROUGHS = {
+    "Manhattan": ["Upper West Side", "Harlem", "Chelsea-Hudson Yards", "East Village", "Washington Heights"],
+    "Brooklyn": ["Park Slope", "Williamsburg", "Bushwick", "Crown Heights", "East New York"],
+    "Queens": ["Astoria", "Flushing", "Jackson Heights", "Long Island City", "Jamaica"],
+    "Bronx": ["Fordham", "Mott Haven", "Riverdale", "Parkchester", "Soundview"],
+    "Staten Island": ["St. George", "Tottenville", "Great Kills", "Grasmere-Arrochar-South Beach-Dongan Hills"],
+}
+_SITE_NAMES = ["Greenmarket", "Community Garden", "Library", "Youth Farm", "Compost Hub", "Farmers Market",
+               "Church", "School", "Recreation Center", "Plaza"]
+_HOSTS = ["GrowNYC", "NYC Compost Project", "Snug Harbor Youth", "BIG Reuse", "Earth Matter", "Sims Municipal",
+          "Local volunteers", "Department of Sanitation"]
+_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_STREETS = ["Broadway", "Main Street", "Atlantic Avenue", "Grand Concourse", "Victory Boulevard", "Queens Boulevard",
+            "Robin Road", "Bedford Avenue", "Amsterdam Avenue", "Flatbush Avenue"]
+
+
+def synthetic_listings(count, seed=0):
+    """
+    Generates deterministic real estate listings that pass the listing schema.
+
+    Args:
+        count (int): Number of listings.
+        seed (int): Random seed; the same seed always yields the same corpus.
+
+    Yields:
+        dict: One listing at a time, so large corpora can be streamed to disk.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        neighborhood = f"{rng.choice(_NEIGHBORHOOD_PREFIXES)} {rng.choice(_NEIGHBORHOOD_SUFFIXES)}"
+        bedrooms = rng.randint(1, 6)
+        bathrooms = rng.randint(1, max(1, bedrooms))
+        house_size = rng.randrange(500, 1200 * bedrooms + 1, 50)
+        features = rng.sample(_FEATURES, 3)
+        yield {
+            "neighborhood": neighborhood,
+            "price": rng.randrange(150_000, 3_000_000, 5_000),
+            "bedrooms": bedrooms,
+            "bathrooms": bathrooms,
+            "house_size": house_size,
+            "description": (
+                f"A {bedrooms}-bedroom {rng.choice(_HOME_TYPES)} in {neighborhood} with {features[0]}, "
+                f"{features[1]} and {features[2]}. Bright living spaces and a practical layout make it "
+                f"an easy place to settle in."
+            ),
+            "neighborhood_description": (
+                f"{neighborhood} is known for {' and '.join(rng.sample(_NEIGHBORHOOD_FEATURES, 2))}, "
+                f"with {rng.choice(_NEIGHBORHOOD_FEATURES)} a short walk away."
+            ),
+        }
+
+
+def synthetic_listing_queries(count, seed=1):
+    """Free-text buyer queries in the style of PreferenceParser.get_query_string()."""
+    rng = random.Random(seed)
+    return [
+        f"A {rng.randint(2, 5)}-bedroom {rng.choice(_HOME_TYPES)} with {rng.choice(_FEATURES)} "
+        f"near {rng.choice(_NEIGHBORHOOD_FEATURES)}"
+        for _ in range(count)
+    ]
+
+
+def synthetic_food_sites(count, seed=0):
+    """
+    Generates deterministic rows shaped like nyc_food_scrap_drop_off_sites.csv.
+
+    Args:
+        count (int): Number of sites.
+        seed (int): Random seed.
+
+    Yields:
+        dict: One site with the text columns the RAG notebook uses, plus latitude
+        and longitude.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        borough = rng.choice(list(_BOROUGHS))
+        ntaname = rng.choice(_BOROUGHS[borough])
+        start, end = sorted(rng.sample(range(6, 22), 2))
+        days = sorted(rng.sample(range(7), rng.randint(1, 3)))
+        yield {
+            "borough": borough,
+            "ntaname": ntaname,
+            "food_scrap_drop_off_site": f"{ntaname} {rng.choice(_SITE_NAMES)} #{i}",
+            "location": f"{rng.randint(1, 999)} {rng.choice(_STREETS)}, {borough} NY",
+            "hosted_by": rng.choice(_HOSTS),
+            "open_months": rng.choice(["Year Round", "April - November", "Year Round (except holidays)"]),
+            "operation_day_hours": ", ".join(
+                f"{_DAYS[day]} (Start Time: {start}:00 - End Time: {end}:00)" for day in days
+            ),
+            "website": rng.choice(["grownyc.org", "compost.nyc", "snug-harbor.org", ""]),
+            "notes": rng.choice(["", "No meat, bones or dairy.", "Accepts meat and dairy.", "24/7 smart bins."]),
+            "latitude": round(40.5 + rng.random() * 0.4, 6),
+            "longitude": round(-74.25 + rng.random() * 0.55, 6),
+        }
+
+
+def food_site_text(row):
+    """The text the RAG notebook embeds for each site."""
+    return (f"Location: {row['food_scrap_drop_off_site']} in {row['ntaname']}, {row['borough']}. "
+            f"Address: {row['location']}. "
+            f"Hosted by: {row['hosted_by']}. "
+            f"Schedule: Open {row['open_months']}, {row['operation_day_hours']}. "
+            f"Website: {row['website']}"
+            f"Notes: {row['notes']}")
+
+
+def synthetic_food_site_questions(count, seed=1):
+    """Questions in the style of the RAG notebook's examples."""
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        borough = rng.choice(list(_BOROUGHS))
+        questions.append(
+            f"Where can I drop off food scraps hosted by {rng.choice(_HOSTS)} in "
+            f"{rng.choice(_BOROUGHS[borough])}, {borough} on {rng.choice(_DAYS)}, and do they accept meat and dairy?"
+        )
+    return questions
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+import openai
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "personalized-real-estate-agent"))
+
+import database  # noqa: E402
+from corpora import synthetic_listing_queries, synthetic_listings  # noqa: E402
+from fake_openai_server import FakeOpenAIServer, hashing_embeddings  # noqa: E402
+from listing_filters import ListingFilter  # noqa: E402
+from listing_io import write_listings  # noqa: E402
+from measure import Stage, latency_summary, time_calls  # noqa: E402
+from personalizer import ListingPersonalizer  # noqa: E402
+from preference_parser import PreferenceParser  # noqa: E402
+
+
+class HashingEncoder:
+    """
+    Offline stand-in for SentenceTransformer with the same encode interface.
+
+    Embeds with fake_openai_server.hashing_embeddings, so no model download is
+    needed and timings measure the HomeMatch pipeline rather than the model.
+
+    Args:
+        model_name (str): Ignored; accepted for SentenceTransformer compatibility.
+        dim (int): Embedding dimension (all-MiniLM-L6-v2's by default).
+        latency_per_text (float): Seconds of simulated model time per text.
+    """
+
+    def __init__(self, model_name=None, dim=384, latency_per_text=0.0, **kwargs):
+        self.dim = dim
+        self.latency_per_text = latency_per_text
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        embeddings = hashing_embeddings(texts, self.dim)
+        return embeddings[0] if single else embeddings
+
+
+def run(scale, workdir, queries=200, e2e_runs=20, llm_latency=0.2, encoder_latency=0.0, trace_memory=False):
+    """
+    Benchmarks HomeMatch ingestion, search and end-to-end latency on a synthetic corpus.
+
+    Args:
+        scale (int): Number of listings.
+        workdir (str): Scratch directory for the listings file and ChromaDB.
+        queries (int): Searches timed per search mode.
+        e2e_runs (int): End-to-end runs (preferences, search, personalization).
+        llm_latency (float): Seconds the fake chat completion API takes per call.
+        encoder_latency (float): Simulated encoder seconds per text.
+        trace_memory (bool): Record the peak heap usage of each stage.
+
+    Returns:
+        dict: Measurements per stage.
+    """
+    results = {"scale": scale}
+    listings_file = os.path.join(workdir, "listings.jsonl")
+    with Stage(trace_memory=False) as stage:
+        write_listings(listings_file, synthetic_listings(scale))
+    results["corpus"] = stage.as_dict(scale)
+
+    database.SentenceTransformer = lambda model_name, **kwargs: HashingEncoder(
+        model_name, latency_per_text=encoder_latency
+    )
+    database._warm_models.clear()
+    db = database.HomeMatchDB(path=os.path.join(workdir, "chroma_db"))
+    # Measure the bare pipeline, whatever caches or indexes the environment configures;
+    # fake embeddings must not end up in a real embedding cache either
+    db.embedding_cache = db.ann_index = None
+    with Stage(trace_memory) as stage:
+        db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    results["ingest"] = stage.as_dict(scale)
+
+    texts = synthetic_listing_queries(queries)
+    results["search"] = latency_summary(time_calls(lambda query: db.search_listings(query, n_results=5), texts))
+    listing_filter = ListingFilter(min_bedrooms=3, max_price=900_000)
+    results["filtered_search"] = latency_summary(time_calls(
+        lambda query: db.search_listings(query, n_results=5, filters=listing_filter), texts
+    ))
+    batches = [texts[i:i + 16] for i in range(0, len(texts), 16)]
+    results["batch_search_16"] = latency_summary(time_calls(
+        lambda batch: db.search_listings_batch(batch, n_results=5), batches
+    ))
+
+    with FakeOpenAIServer(latency=llm_latency) as server:
+        personalizer = ListingPersonalizer()
+        personalizer.cache = None
+        previous_base, previous_key = openai.api_base, openai.api_key
+        openai.api_base, openai.api_key = server.api_base, "benchmark"
+        try:
+            def end_to_end(_):
+                preferences = PreferenceParser().extract_preferences()
+                found = db.search_by_preferences(preferences, n_results=3)
+                personalizer.personalize_many(found['metadatas'][0], preferences.query_string)
+
+            timings = time_calls(end_to_end, list(range(e2e_runs)))
+        finally:
+            openai.api_base, openai.api_key = previous_base, previous_key
+    results["end_to_end"] = latency_summary(timings)
+    db.close()
+    return results
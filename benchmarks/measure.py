@@ -0,0 +1,78 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def latency_summary(seconds):
+    """Summarizes per-call latencies (in seconds) as milliseconds."""
+    samples = np.asarray(seconds, dtype=np.float64) * 1000
+    if not len(samples):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(len(samples)),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+
+def time_calls(function, inputs, warmup=1):
+    """Calls function on each input and returns the per-call wall times in seconds."""
+    for item in inputs[:warmup]:
+        function(item)
+    timings = []
+    for item in inputs:
+        started = time.perf_counter()
+        function(item)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+class Stage:
+    """
+    Times a block of code and, optionally, its peak Python heap usage.
+
+    The peak comes from tracemalloc (which NumPy reports its buffers to), so it
+    covers allocations made inside the block only. Tracing slows allocation-heavy
+    code down, so compare traced runs with traced runs.
+
+    Args:
+        trace_memory (bool): Record ``peak_memory_bytes`` as well as ``seconds``.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.seconds = None
+        self.peak_memory_bytes = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._started
+        if self.trace_memory:
+            self.peak_memory_bytes = tracemalloc.get_traced_memory()[1] - self._baseline
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def as_dict(self, items=None):
+        """The stage's measurements, with a throughput if the number of items is given."""
+        result = {"seconds": round(self.seconds, 4)}
+        if items is not None:
+            result["items"] = items
+            result["items_per_second"] = round(items / self.seconds, 2) if self.seconds else None
+        if self.peak_memory_bytes is not None:
+            result["peak_memory_bytes"] = self.peak_memory_bytes
+        return result
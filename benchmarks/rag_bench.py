@@ -0,0 +1,115 @@
+import os
+import sys
+
+import numpy as np
+import openai
+
+_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(_ROOT, "custom-chatbot-rag"))
+sys.path.append(os.path.join(_ROOT, "personalized-real-estate-agent"))
+
+from corpora import food_site_text, synthetic_food_site_questions, synthetic_food_sites  # noqa: E402
+from embedding_store import EmbeddingStore  # noqa: E402
+from fake_openai_server import FakeOpenAIServer, hashing_embeddings  # noqa: E402
+from measure import Stage, latency_summary, time_calls  # noqa: E402
+from retrieval import VectorRetriever  # noqa: E402
+
+EMBEDDING_MODEL_NAME = "text-embedding-ada-002"
+COMPLETION_MODEL_NAME = "gpt-3.5-turbo-instruct"
+PROMPT_TEMPLATE = """
+Answer the question based on the context below, and if the question
+can't be answered based on the context, say "I don't know"
+
+Context:
+
+{}
+
+---
+
+Question: {}
+Answer:"""
+
+
+def _context_packer():
+    # tiktoken downloads its encodings on first use; without network (and no
+    # cached copy) the end-to-end run falls back to the top rows without packing
+    try:
+        from context_packing import ContextPacker, count_tokens
+        return ContextPacker(PROMPT_TEMPLATE), count_tokens
+    except Exception as e:
+        print(f"Context packing unavailable, joining the top rows instead: {e}")
+        return None, None
+
+
+def run(scale, workdir, queries=200, e2e_runs=20, llm_latency=0.2, embedding_latency=0.02, dim=1536,
+        batch_size=100, trace_memory=False):
+    """
+    Benchmarks the food-site RAG pipeline from the custom-chatbot-rag notebook.
+
+    Embeddings and completions come from a local FakeOpenAIServer, so ingest
+    throughput includes the client round trips the notebook pays for.
+
+    Args:
+        scale (int): Number of food-site rows.
+        workdir (str): Scratch directory for the embedding store.
+        queries (int): Retrieval calls timed.
+        e2e_runs (int): End-to-end question answering runs.
+        llm_latency (float): Seconds the fake completion API takes per call.
+        embedding_latency (float): Seconds the fake embeddings API takes per request.
+        dim (int): Embedding dimension.
+        batch_size (int): Texts per embeddings request.
+        trace_memory (bool): Record the peak heap usage of each stage.
+
+    Returns:
+        dict: Measurements per stage.
+    """
+    results = {"scale": scale, "dim": dim}
+    with Stage(trace_memory=False) as stage:
+        texts = [food_site_text(row) for row in synthetic_food_sites(scale)]
+    results["corpus"] = stage.as_dict(scale)
+
+    with FakeOpenAIServer(latency=llm_latency, embedding_latency=embedding_latency, embedding_dim=dim) as server:
+        previous_base, previous_key = openai.api_base, openai.api_key
+        openai.api_base, openai.api_key = server.api_base, "benchmark"
+        try:
+            with Stage(trace_memory) as stage:
+                store = EmbeddingStore.create(os.path.join(workdir, "embeddings"), dim=dim, overwrite=True)
+                for start in range(0, scale, batch_size):
+                    batch = texts[start:start + batch_size]
+                    response = openai.Embedding.create(input=batch, engine=EMBEDDING_MODEL_NAME)
+                    store.append(np.array([item["embedding"] for item in response["data"]], dtype=np.float32),
+                                 [{"text": text} for text in batch])
+            results["ingest"] = stage.as_dict(scale)
+
+            with Stage(trace_memory) as stage:
+                store = EmbeddingStore(os.path.join(workdir, "embeddings"))
+                retriever = VectorRetriever(store.vectors, assume_normalized=True)
+            results["load"] = stage.as_dict(scale)
+
+            questions = synthetic_food_site_questions(queries)
+            question_embeddings = hashing_embeddings(questions, dim)
+            results["search"] = latency_summary(time_calls(
+                lambda embedding: retriever.search(embedding, k=50), list(question_embeddings)
+            ))
+
+            packer, count_tokens = _context_packer()
+            token_counts = count_tokens(store.texts) if packer else None
+
+            def answer(question):
+                embedding = openai.Embedding.create(input=[question], engine=EMBEDDING_MODEL_NAME)["data"][0]["embedding"]
+                rows, similarities = retriever.search(embedding, k=50)
+                candidates = [store.texts[row] for row in rows]
+                if packer:
+                    prompt = packer.pack(question, candidates, token_counts=[token_counts[row] for row in rows],
+                                         max_tokens=1800, scores=similarities.tolist()).prompt
+                else:
+                    prompt = PROMPT_TEMPLATE.format("\n\n###\n\n".join(candidates[:5]), question)
+                openai.Completion.create(model=COMPLETION_MODEL_NAME, prompt=prompt, max_tokens=150)
+
+            results["end_to_end"] = {
+                **latency_summary(time_calls(answer, questions[:e2e_runs])),
+                "context_packing": packer is not None,
+            }
+        finally:
+            openai.api_base, openai.api_key = previous_base, previous_key
+    return results
@@ -0,0 +1,134 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def git_revision():
+    """Short hash of HEAD, suffixed with "-dirty" when the tree has uncommitted changes."""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def _run_one(suite, scale, options):
+    # Runs in a fresh process, so the peak RSS belongs to this suite and scale
+    # alone and no warm model or cache carries over between runs
+    with tempfile.TemporaryDirectory(prefix=f"bench-{suite}-") as workdir:
+        if suite == "homematch":
+            import homematch_bench
+            result = homematch_bench.run(
+                scale, workdir, queries=options["queries"], e2e_runs=options["e2e_runs"],
+                llm_latency=options["llm_latency"], encoder_latency=options["encoder_latency"],
+                trace_memory=options["trace_memory"],
+            )
+        else:
+            import rag_bench
+            result = rag_bench.run(
+                scale, workdir, queries=options["queries"], e2e_runs=options["e2e_runs"],
+                llm_latency=options["llm_latency"], embedding_latency=options["embedding_latency"],
+                dim=options["rag_dim"], trace_memory=options["trace_memory"],
+            )
+    result["peak_rss_bytes"] = _peak_rss_bytes()
+    return result
+
+
+def run_suites(suites, scales, queries=200, e2e_runs=20, llm_latency=0.2, embedding_latency=0.02,
+               encoder_latency=0.0, rag_dim=1536, trace_memory=False):
+    """
+    Runs the benchmark suites at each scale, each in a fresh process and scratch directory.
+
+    Every run reports its process's peak resident memory. With trace_memory,
+    the ingest and load stages also report their peak Python heap growth from
+    tracemalloc, at the cost of much slower (and not comparable) timings.
+
+    Returns:
+        dict: ``meta`` describing the run and ``results`` keyed by suite, then scale.
+    """
+    options = {
+        "queries": queries,
+        "e2e_runs": e2e_runs,
+        "llm_latency": llm_latency,
+        "embedding_latency": embedding_latency,
+        "encoder_latency": encoder_latency,
+        "rag_dim": rag_dim,
+        "trace_memory": trace_memory,
+    }
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            **options,
+        },
+        "results": {},
+    }
+    for suite in suites:
+        for scale in scales:
+            print(f"Running {suite} at {scale:,} rows...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                result = executor.submit(_run_one, suite, scale, options).result()
+            report["results"].setdefault(suite, {})[str(scale)] = result
+            print(f"  ingest {result['ingest']['items_per_second']:,.0f} rows/s, "
+                  f"search p95 {result['search']['p95_ms']:.2f} ms, "
+                  f"end-to-end p95 {result['end_to_end']['p95_ms']:.1f} ms")
+    return report
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Run the offline HomeMatch and RAG benchmarks.")
+    arg_parser.add_argument("--suite", choices=["homematch", "rag"], action="append",
+                            help="Suite to run (repeatable; default: both).")
+    arg_parser.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000],
+                            help="Corpus sizes, e.g. 1000 10000 100000 1000000.")
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--e2e-runs", type=int, default=20)
+    arg_parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    arg_parser.add_argument("--embedding-latency-ms", type=float, default=20.0,
+                            help="Fake embeddings API latency per request (RAG suite).")
+    arg_parser.add_argument("--encoder-latency-ms", type=float, default=0.0,
+                            help="Simulated sentence-transformers time per text (HomeMatch suite).")
+    arg_parser.add_argument("--rag-dim", type=int, default=1536)
+    arg_parser.add_argument("--trace-memory", action="store_true",
+                            help="Also record per-stage heap peaks with tracemalloc (slows those stages down).")
+    arg_parser.add_argument("--output-dir", default=os.path.join(HERE, "results"))
+    args = arg_parser.parse_args()
+
+    report = run_suites(
+        args.suite or ["homematch", "rag"], args.scales, queries=args.queries, e2e_runs=args.e2e_runs,
+        llm_latency=args.llm_latency_ms / 1000, embedding_latency=args.embedding_latency_ms / 1000,
+        encoder_latency=args.encoder_latency_ms / 1000, rag_dim=args.rag_dim,
+        trace_memory=args.trace_memory,
+    )
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{report['meta']['revision']}.json")
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output_path}")
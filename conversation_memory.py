@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List
+
+import re
+
+from langchain.memory import ConversationBufferMemory, ConversationSummaryMemory
+from langchain.pydantic_v1 import PrivateAttr
+from langchain.schema import AIMessage, BaseMessage, HumanMessage
+
+# memory classes for the movie recommender in langchain_mem.py, kept in their own module
+# so they can be imported without the recommender's network calls
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# you could choose to store some of the q/a in memory as well, in addition to original questions
+class MementoBufferMemory(ConversationBufferMemory):
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        self.chat_memory.add_ai_message(output_str)
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        print(f"tiktoken unavailable ({e}), estimating 4 characters per token")
+        return None
+
+# messages are counted again on every turn, so each distinct text is only encoded once
+@lru_cache(maxsize=4096)
+def count_tokens(text, model=DEFAULT_MODEL):
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+# chat formatting adds a few tokens per message on top of its content
+TOKENS_PER_MESSAGE = 4
+RATING_LINE = re.compile(r"RATING FOR MOVIE .+? is\s*\d+", re.IGNORECASE)
+
+# keeps the history under max_token_limit, so the prompt stays the same size however many movies are rated:
+# the first pinned_messages (the seeded personal Q&A) are never touched, the last recent_turns ratings stay verbatim,
+# older ratings shrink to their "RATING FOR MOVIE ... is N" line, and the oldest of those are dropped once over budget
+class TokenBudgetMemory(MementoBufferMemory):
+    max_token_limit: int = 1500
+    pinned_messages: int = 0
+    recent_turns: int = 2
+
+    def message_tokens(self, message) -> int:
+        return count_tokens(message.content) + TOKENS_PER_MESSAGE
+
+    def token_count(self) -> int:
+        return sum(self.message_tokens(message) for message in self.chat_memory.messages)
+
+    def compress(self, message):
+        ratings = RATING_LINE.findall(message.content)
+        if not ratings:
+            return None
+        return type(message)(content=ratings[-1])
+
+    def prune(self) -> None:
+        messages = self.chat_memory.messages
+        pinned, turns = messages[:self.pinned_messages], messages[self.pinned_messages:]
+        recent_start = max(0, len(turns) - self.recent_turns)
+        older = [self.compress(message) for message in turns[:recent_start]]
+        kept = [message for message in older if message is not None] + turns[recent_start:]
+
+        budget = self.max_token_limit - sum(self.message_tokens(message) for message in pinned)
+        used = sum(self.message_tokens(message) for message in kept)
+        # oldest first, but always keep the latest turn
+        while used > budget and len(kept) > 1:
+            used -= self.message_tokens(kept.pop(0))
+
+        self.chat_memory.clear()
+        for message in pinned + kept:
+            self.chat_memory.add_message(message)
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        self.prune()
+
+# ConversationSummaryMemory makes a blocking LLM call after every turn, doubling the round-trips per movie.
+# this one queues the turns and folds every summarize_every of them into the summary with a single call,
+# on a background thread. readers get the latest finished summary; flush() waits for everything queued so far
+class DeferredSummaryMemory(ConversationSummaryMemory):
+    summarize_every: int = 2
+
+    _executor: Any = PrivateAttr(default=None)
+    _pending: List[BaseMessage] = PrivateAttr(default_factory=list)
+    _futures: List[Any] = PrivateAttr(default_factory=list)
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # a single worker applies the updates in order, each one building on the previous summary
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        self._pending += [HumanMessage(content=input_str), AIMessage(content=output_str)]
+        if len(self._pending) >= 2 * self.summarize_every:
+            self._submit()
+
+    def _submit(self) -> None:
+        messages, self._pending = self._pending, []
+        self._futures = [future for future in self._futures if not future.done()]
+        self._futures.append(self._executor.submit(self._summarize, messages))
+
+    def _summarize(self, messages: List[BaseMessage]) -> None:
+        try:
+            self.buffer = self.predict_new_summary(messages, self.buffer)
+        except Exception as e:
+            print(f"Error updating recommendation summary, keeping the previous one: {e}")
+
+    def flush(self) -> None:
+        if self._pending:
+            self._submit()
+        for future in self._futures:
+            future.result()
+        self._futures = []
+
+    def clear(self) -> None:
+        self.flush()
+        self._pending = []
+        super().clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown()
@@ -0,0 +1,195 @@
+import re
+
+import numpy as np
+
+from retrieval import _top_k
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercased alphanumeric tokens; punctuation such as "East New York Farms:" is dropped."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index for exact-term lookups over the text rows.
+
+    Postings are kept in a compressed sparse row layout: for term id ``t``,
+    ``doc_ids[offsets[t]:offsets[t + 1]]`` (int32, ascending) lists the rows
+    containing it and ``term_freqs`` (uint16) the matching counts. Scoring a
+    question touches only the postings of its terms, one vectorized slice each.
+
+    Rows added after the first build are buffered and merged into the arrays
+    at the next search, so adding rows one by one doesn't rebuild the layout
+    each time.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization, from 0 (none) to 1 (full).
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.term_freqs = np.zeros(0, dtype=np.uint16)
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        # Postings of rows added since the last merge, as (term id, row, count) columns
+        self._pending = []
+
+    @classmethod
+    def from_texts(cls, texts, **kwargs):
+        index = cls(**kwargs)
+        index.add(texts)
+        return index
+
+    @classmethod
+    def from_dataframe(cls, df, column="text", **kwargs):
+        """Builds an index with one entry per dataframe row, in row order."""
+        return cls.from_texts(df[column].tolist(), **kwargs)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, texts):
+        """
+        Indexes more rows; they get the next row positions in order.
+
+        Returns:
+            np.ndarray: The row positions given to the new texts.
+        """
+        first_row = len(self)
+        term_ids, rows, counts, lengths = [], [], [], []
+        for row, text in enumerate(texts, start=first_row):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            terms, term_counts = np.unique(
+                np.array([self.vocabulary.setdefault(token, len(self.vocabulary)) for token in tokens],
+                         dtype=np.int64),
+                return_counts=True,
+            )
+            term_ids.append(terms)
+            counts.append(term_counts)
+            rows.append(np.full(len(terms), row, dtype=np.int32))
+        if lengths:
+            self._pending.append((np.concatenate(term_ids), np.concatenate(rows), np.concatenate(counts)))
+            self.doc_lengths = np.concatenate([self.doc_lengths, np.array(lengths, dtype=np.float32)])
+        return np.arange(first_row, len(self))
+
+    def _merge_pending(self):
+        if not self._pending:
+            return
+        old_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        terms = np.concatenate([old_terms] + [pending[0] for pending in self._pending])
+        rows = np.concatenate([self.doc_ids] + [pending[1] for pending in self._pending])
+        counts = np.concatenate([self.term_freqs] + [pending[2] for pending in self._pending])
+        # Rows only ever grow, so a stable sort by term keeps each postings list in row order
+        order = np.argsort(terms, kind="stable")
+        self.doc_ids = rows[order].astype(np.int32)
+        self.term_freqs = np.minimum(counts[order], np.iinfo(np.uint16).max).astype(np.uint16)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)))])
+        self._pending = []
+
+    def idf(self, document_frequency):
+        n = len(self)
+        return np.log1p((n - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def scores(self, question):
+        """BM25 score of every row for the question; rows sharing no term score 0."""
+        self._merge_pending()
+        scores = np.zeros(len(self), dtype=np.float32)
+        if not len(self):
+            return scores
+        lengths = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.doc_lengths.mean(), 1e-9))
+        for token in set(tokenize(question)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            rows = self.doc_ids[start:end]
+            freqs = self.term_freqs[start:end].astype(np.float32)
+            # Each row appears once per postings list, so fancy-index += is safe
+            scores[rows] += self.idf(end - start) * freqs * (self.k1 + 1) / (freqs + lengths[rows])
+        return scores
+
+    def search(self, question, k=10, candidates=None):
+        """
+        Finds the rows best matching the question's terms.
+
+        Args:
+            question (str): The question text.
+            k (int): Number of rows to return; None returns every matching row.
+            candidates (array-like): Optional row indices to restrict the results to.
+
+        Returns:
+            tuple: (row indices, BM25 scores), best first. Rows sharing no
+            term with the question are left out, so fewer than k may come back.
+        """
+        scores = self.scores(question)
+        rows = None
+        if candidates is not None:
+            rows = np.asarray(candidates, dtype=np.int64)
+            scores = scores[rows]
+        top = _top_k(scores, k)
+        top = top[scores[top] > 0]
+        return (top if rows is None else rows[top]), scores[top]
+
+    @property
+    def memory_bytes(self):
+        return self.offsets.nbytes + self.doc_ids.nbytes + self.term_freqs.nbytes + self.doc_lengths.nbytes
+
+
+def reciprocal_rank_fusion(rankings, k=60, weights=None, limit=None):
+    """
+    Merges ranked lists of row indices with reciprocal rank fusion.
+
+    Each list adds ``weight / (k + rank)`` (rank counted from 1) to every row
+    it contains, so rows ranked high by several retrievers rise to the top
+    without the retrievers' scores having to be comparable.
+
+    Args:
+        rankings (list): Ranked row index sequences, best first.
+        k (int): Damping constant; larger values flatten the rank differences.
+        weights (list): Optional weight per ranking (default 1 each).
+        limit (int): Number of rows to return; None returns them all.
+
+    Returns:
+        tuple: (row indices, fused scores), best first.
+    """
+    weights = [1.0] * len(rankings) if weights is None else weights
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, row in enumerate(ranking, start=1):
+            fused[int(row)] = fused.get(int(row), 0.0) + weight / (k + rank)
+    rows = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+    scores = np.fromiter(fused.values(), dtype=np.float32, count=len(fused))
+    top = _top_k(scores, limit)
+    return rows[top], scores[top]
+
+
+def hybrid_search(bm25, retriever, question, question_embedding, k=10, candidates=50, rrf_k=60,
+                  weights=(1.0, 1.0), rows=None):
+    """
+    Fuses BM25 and vector search results for one question.
+
+    Args:
+        bm25 (BM25Index): Lexical index over the same rows as the retriever.
+        retriever (VectorRetriever): Embedding retriever.
+        question (str): The question text, for BM25.
+        question_embedding (array-like): The question embedding, for the retriever.
+        k (int): Number of rows to return.
+        candidates (int): Rows taken from each retriever before fusion.
+        rrf_k (int): Reciprocal rank fusion damping constant.
+        weights (tuple): (lexical, vector) weights.
+        rows (array-like): Optional row indices both searches are restricted to.
+
+    Returns:
+        tuple: (row indices, fused scores), best first.
+    """
+    lexical_rows, _ = bm25.search(question, candidates, candidates=rows)
+    vector_rows, _ = retriever.search(question_embedding, candidates, candidates=rows)
+    return reciprocal_rank_fusion([lexical_rows, vector_rows], k=rrf_k, weights=list(weights), limit=k)
@@ -0,0 +1,132 @@
+import functools
+
+import numpy as np
+import tiktoken
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(encoding_name="cl100k_base"):
+    """Returns the tiktoken encoder, creating it only once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(texts, encoding_name="cl100k_base"):
+    """
+    Counts the tokens of every text in one batch call.
+
+    Meant to run once at index time; store the result next to the texts
+    (e.g. as a "n_tokens" dataframe column) and pass it to ContextPacker.pack.
+    """
+    encoded = get_encoding(encoding_name).encode_ordinary_batch(list(texts))
+    return np.array([len(tokens) for tokens in encoded], dtype=np.int32)
+
+
+class PackedContext:
+    """The packed prompt plus what went into it."""
+
+    def __init__(self, prompt, rows, used_tokens, max_tokens):
+        self.prompt = prompt
+        # Positions (in the ranked candidate list) of the rows included in the context
+        self.rows = rows
+        self.used_tokens = used_tokens
+        self.max_tokens = max_tokens
+
+    def __repr__(self):
+        return (f"PackedContext(rows={len(self.rows)}, "
+                f"used_tokens={self.used_tokens}/{self.max_tokens})")
+
+
+class ContextPacker:
+    """
+    Fits ranked context rows into a prompt's token budget.
+
+    The template and separator are tokenized once, and row token counts come
+    from the index, so packing a prompt only tokenizes the question. Counts are
+    summed per piece, which can differ from tokenizing the assembled prompt by a
+    token or so at the boundaries.
+
+    Args:
+        template (str): Prompt template with two ``{}`` placeholders, for the
+            context and the question.
+        separator (str): Text placed between context rows.
+        encoding_name (str): tiktoken encoding to count with.
+    """
+
+    def __init__(self, template, separator="\n\n###\n\n", encoding_name="cl100k_base"):
+        self.template = template
+        self.separator = separator
+        self.encoding = get_encoding(encoding_name)
+        self.template_tokens = len(self.encoding.encode_ordinary(template.format("", "")))
+        self.separator_tokens = len(self.encoding.encode_ordinary(separator))
+
+    def _greedy(self, token_counts, budget):
+        # Unlike stopping at the first row that doesn't fit, keep trying the smaller ones after it
+        chosen = []
+        used = 0
+        for i, count in enumerate(token_counts):
+            cost = count + (self.separator_tokens if chosen else 0)
+            if used + cost <= budget:
+                chosen.append(i)
+                used += cost
+        return chosen
+
+    def _knapsack(self, token_counts, budget, values):
+        # Every row pays for a separator; the first one doesn't need it, so widen the budget by one
+        capacity = budget + self.separator_tokens
+        if capacity <= 0:
+            return []
+        weights = np.asarray(token_counts, dtype=np.int64) + self.separator_tokens
+        best = np.zeros(capacity + 1)
+        keep = np.zeros((len(weights), capacity + 1), dtype=bool)
+        for i, (weight, value) in enumerate(zip(weights, values)):
+            if weight > capacity:
+                continue
+            with_item = best[:-weight] + value if weight else best + value
+            improved = with_item > best[weight:]
+            keep[i, weight:] = improved
+            best[weight:] = np.where(improved, with_item, best[weight:])
+        chosen = []
+        remaining = capacity
+        for i in range(len(weights) - 1, -1, -1):
+            if keep[i, remaining]:
+                chosen.append(i)
+                remaining -= weights[i]
+        return sorted(chosen)
+
+    def pack(self, question, texts, token_counts=None, max_tokens=1800, scores=None, strategy="greedy"):
+        """
+        Builds a prompt from the question and as much ranked context as fits.
+
+        Args:
+            question (str): The user's question.
+            texts (list): Candidate context rows, most relevant first.
+            token_counts (list): Precomputed token count of each row; counted on
+                the fly if omitted.
+            max_tokens (int): Token budget for the whole prompt.
+            scores (list): Relevance of each row, used by the knapsack strategy.
+                Defaults to a 1 / (rank + 1) decay.
+            strategy (str): "greedy" takes rows in rank order, skipping those
+                that don't fit; "knapsack" picks the set of rows with the highest
+                total relevance that fits.
+
+        Returns:
+            PackedContext: The prompt, the included rows and the tokens used.
+        """
+        if token_counts is None:
+            token_counts = count_tokens(texts)
+        token_counts = [int(count) for count in token_counts]
+        fixed = self.template_tokens + len(self.encoding.encode_ordinary(question))
+        budget = max_tokens - fixed
+
+        if strategy == "greedy":
+            chosen = self._greedy(token_counts, budget)
+        elif strategy == "knapsack":
+            if scores is None:
+                scores = [1.0 / (rank + 1) for rank in range(len(texts))]
+            chosen = self._knapsack(token_counts, budget, np.asarray(scores, dtype=np.float64))
+        else:
+            raise ValueError(f"Unknown packing strategy: {strategy}")
+
+        used = fixed + sum(token_counts[i] for i in chosen) + self.separator_tokens * max(len(chosen) - 1, 0)
+        context = self.separator.join(texts[i] for i in chosen)
+        return PackedContext(self.template.format(context, question), chosen, used, max_tokens)
@@ -0,0 +1,164 @@
+import ast
+import json
+import os
+import zlib
+
+import numpy as np
+
+# Fixed size of the .npy header, so appends can rewrite the row count in place
+_NPY_HEADER_SIZE = 256
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def _npy_header(rows, dim):
+    header = repr({"descr": "<f4", "fortran_order": False, "shape": (rows, dim)})
+    prefix_size = len(_NPY_MAGIC) + 2
+    header = header.ljust(_NPY_HEADER_SIZE - prefix_size - 1) + "\n"
+    return _NPY_MAGIC + (len(header)).to_bytes(2, "little") + header.encode("latin1")
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk store of embeddings with their text and metadata.
+
+    A store is a directory with three files:
+
+    - ``vectors.npy``: a standard float32 ``.npy`` matrix, opened memory-mapped
+      so loading costs the same regardless of row count and no float parsing
+      happens. Its header has a fixed size so appends only rewrite the shape.
+    - ``records.jsonl``: one JSON object per row with its text and metadata.
+    - ``manifest.json``: row count, dimension, byte sizes and a running CRC32
+      of the vector bytes. The manifest is replaced atomically after each
+      append, so a crash mid-append leaves the previous state readable.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.jsonl"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, self.MANIFEST_FILE), "r") as f:
+            self.manifest = json.load(f)
+        self._vectors = None
+        self._records = None
+
+    @classmethod
+    def create(cls, path, dim, overwrite=False):
+        """Creates an empty store for embeddings of the given dimension."""
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, cls.MANIFEST_FILE)
+        if os.path.exists(manifest_path) and not overwrite:
+            raise FileExistsError(f"An embedding store already exists at {path}")
+        with open(os.path.join(path, cls.VECTORS_FILE), "wb") as f:
+            f.write(_npy_header(0, dim))
+        open(os.path.join(path, cls.RECORDS_FILE), "wb").close()
+        cls._write_manifest(path, {
+            "format": 1,
+            "dtype": "float32",
+            "rows": 0,
+            "dim": dim,
+            "records_bytes": 0,
+            "crc32": 0,
+        })
+        return cls(path)
+
+    @classmethod
+    def _write_manifest(cls, path, manifest):
+        manifest_path = os.path.join(path, cls.MANIFEST_FILE)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    @property
+    def dim(self):
+        return self.manifest["dim"]
+
+    @property
+    def vectors(self):
+        """The (rows, dim) float32 matrix, memory-mapped read-only."""
+        if self._vectors is None:
+            if len(self) == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._vectors = np.memmap(
+                os.path.join(self.path, self.VECTORS_FILE), dtype=np.float32, mode="r",
+                offset=_NPY_HEADER_SIZE, shape=(len(self), self.dim),
+            )
+        return self._vectors
+
+    @property
+    def records(self):
+        """The text and metadata of every row, read from the sidecar on first access."""
+        if self._records is None:
+            with open(os.path.join(self.path, self.RECORDS_FILE), "rb") as f:
+                data = f.read(self.manifest["records_bytes"])
+            self._records = [json.loads(line) for line in data.splitlines()]
+        return self._records
+
+    @property
+    def texts(self):
+        return [record["text"] for record in self.records]
+
+    def append(self, embeddings, records):
+        """
+        Appends rows to the store.
+
+        Args:
+            embeddings (array-like): A (rows, dim) matrix of embeddings.
+            records (list): One dictionary per row; it must contain "text" and may
+                hold any other JSON-serializable metadata.
+        """
+        embeddings = np.ascontiguousarray(np.asarray(embeddings, dtype="<f4"))
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected a (rows, {self.dim}) matrix, got shape {embeddings.shape}")
+        if len(records) != len(embeddings):
+            raise ValueError(f"Got {len(embeddings)} embeddings but {len(records)} records")
+
+        manifest = dict(self.manifest)
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        vector_bytes = embeddings.tobytes()
+        with open(vectors_path, "r+b") as f:
+            # Drop anything a previous, interrupted append left behind
+            f.truncate(_NPY_HEADER_SIZE + manifest["rows"] * self.dim * 4)
+            f.seek(0, os.SEEK_END)
+            f.write(vector_bytes)
+
+        record_bytes = b"".join(
+            json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records
+        )
+        with open(os.path.join(self.path, self.RECORDS_FILE), "r+b") as f:
+            f.truncate(manifest["records_bytes"])
+            f.seek(0, os.SEEK_END)
+            f.write(record_bytes)
+
+        manifest["rows"] += len(embeddings)
+        manifest["records_bytes"] += len(record_bytes)
+        manifest["crc32"] = zlib.crc32(vector_bytes, manifest["crc32"])
+        with open(vectors_path, "r+b") as f:
+            f.write(_npy_header(manifest["rows"], self.dim))
+        self._write_manifest(self.path, manifest)
+
+        self.manifest = manifest
+        self._vectors = None
+        if self._records is not None:
+            self._records.extend(records)
+
+    def verify(self, chunk_rows=65536):
+        """Recomputes the CRC32 of the stored vectors and compares it with the manifest."""
+        crc = 0
+        vectors = self.vectors
+        for start in range(0, len(vectors), chunk_rows):
+            crc = zlib.crc32(np.ascontiguousarray(vectors[start:start + chunk_rows]).tobytes(), crc)
+        with open(os.path.join(self.path, self.VECTORS_FILE), "rb") as f:
+            f.seek(len(_NPY_MAGIC) + 2)
+            header = ast.literal_eval(f.read(_NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2).decode("latin1"))
+        return crc == self.manifest["crc32"] and header["shape"] == (len(self), self.dim)
+
+    def to_dataframe(self):
+        """Returns the records as a dataframe, without the embeddings."""
+        import pandas as pd
+        return pd.DataFrame(self.records)
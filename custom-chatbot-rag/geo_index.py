@@ -0,0 +1,259 @@
+import re
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+# Names a question may use for each borough, as spelled in the dataset's borough column
+BOROUGH_ALIASES = {
+    "Manhattan": ("manhattan",),
+    "Brooklyn": ("brooklyn",),
+    "Queens": ("queens",),
+    "Bronx": ("bronx",),
+    "Staten Island": ("staten island",),
+}
+
+
+def haversine_km(latitudes, longitudes, latitude, longitude):
+    """Great-circle distance in kilometres from every (latitudes, longitudes) point to one point."""
+    lat1, lon1 = np.radians(latitudes), np.radians(longitudes)
+    lat2, lon2 = np.radians(latitude), np.radians(longitude)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """
+    Uniform grid over latitude/longitude points for radius and bounding-box queries.
+
+    Points are bucketed into square cells roughly ``cell_km`` on a side and
+    stored sorted by cell, with the start of every non-empty cell in
+    ``cell_starts`` (the same offsets layout as the BM25 postings). A query
+    only visits the cells overlapping its box and checks the points in them,
+    falling back to one vectorized pass over all points when the box covers
+    more cells than there are points. Boxes that cross the 180° meridian are
+    split into one query on each side, so radius searches near the date line
+    find points on both sides.
+
+    Rows without coordinates (NaN) are left out of the index.
+
+    Args:
+        latitudes (array-like): Latitude per row, in degrees.
+        longitudes (array-like): Longitude per row, in degrees.
+        cell_km (float): Approximate cell edge length.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_km=1.0):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        located = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        self.cell_km = cell_km
+        self.lat_step = cell_km / KM_PER_DEGREE_LATITUDE
+        # Longitude degrees shrink away from the equator; the grid is scaled at the points' mean latitude
+        reference = np.radians(latitudes[located].mean()) if len(located) else 0.0
+        self.lon_step = cell_km / (KM_PER_DEGREE_LATITUDE * max(np.cos(reference), 1e-6))
+
+        cells = self._cell_keys(latitudes[located], longitudes[located])
+        order = np.argsort(cells, kind="stable")
+        self.rows = located[order]
+        self.latitudes = latitudes[self.rows]
+        self.longitudes = longitudes[self.rows]
+        self.cell_ids, self.cell_starts = np.unique(cells[order], return_index=True)
+        self.cell_starts = np.append(self.cell_starts, len(self.rows))
+
+    @classmethod
+    def from_dataframe(cls, df, latitude="latitude", longitude="longitude", **kwargs):
+        return cls(df[latitude].to_numpy(dtype=np.float64), df[longitude].to_numpy(dtype=np.float64), **kwargs)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _cells(self, latitudes, longitudes):
+        return (np.floor(np.asarray(latitudes) / self.lat_step).astype(np.int64),
+                np.floor(np.asarray(longitudes) / self.lon_step).astype(np.int64))
+
+    def _cell_keys(self, latitudes, longitudes):
+        lat_cells, lon_cells = self._cells(latitudes, longitudes)
+        # Cell coordinates stay far below 2**31 for any valid latitude/longitude
+        return (lat_cells << 32) + (lon_cells & 0xFFFFFFFF)
+
+    def _positions_in_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Positions (into self.rows) of the points inside the box; min_lon > max_lon wraps across 180°."""
+        if max_lon < min_lon:
+            max_lon += 360.0
+        if max_lon - min_lon >= 360.0:
+            return self._positions_in_span(min_lat, -180.0, max_lat, 180.0)
+        # Shift the box so it starts in [-180, 180); a box running past 180° becomes two queries
+        shift = (min_lon + 180.0) % 360.0 - 180.0 - min_lon
+        min_lon, max_lon = min_lon + shift, max_lon + shift
+        if max_lon <= 180.0:
+            return self._positions_in_span(min_lat, min_lon, max_lat, max_lon)
+        return np.concatenate([self._positions_in_span(min_lat, min_lon, max_lat, 180.0),
+                               self._positions_in_span(min_lat, -180.0, max_lat, max_lon - 360.0)])
+
+    def _positions_in_span(self, min_lat, min_lon, max_lat, max_lon):
+        (lat_lo, lat_hi), (lon_lo, lon_hi) = self._cells([min_lat, max_lat], [min_lon, max_lon])
+        if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > len(self.rows):
+            candidates = np.arange(len(self.rows))
+        else:
+            lat_cells, lon_cells = np.meshgrid(np.arange(lat_lo, lat_hi + 1), np.arange(lon_lo, lon_hi + 1))
+            keys = (lat_cells.ravel() << 32) + (lon_cells.ravel() & 0xFFFFFFFF)
+            found = np.searchsorted(self.cell_ids, keys)
+            found = found[(found < len(self.cell_ids)) & (self.cell_ids[np.minimum(found, len(self.cell_ids) - 1)] == keys)]
+            if not len(found):
+                return np.zeros(0, dtype=np.int64)
+            candidates = np.concatenate([np.arange(self.cell_starts[i], self.cell_starts[i + 1]) for i in found])
+        inside = ((self.latitudes[candidates] >= min_lat) & (self.latitudes[candidates] <= max_lat)
+                  & (self.longitudes[candidates] >= min_lon) & (self.longitudes[candidates] <= max_lon))
+        return candidates[inside]
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Row indices of the points inside the box, in ascending order; min_lon > max_lon wraps across 180°."""
+        return np.sort(self.rows[self._positions_in_box(min_lat, min_lon, max_lat, max_lon)])
+
+    def within_radius(self, latitude, longitude, radius_km):
+        """
+        Finds the points within radius_km of a location.
+
+        Returns:
+            tuple: (row indices, distances in km), nearest first.
+        """
+        # Margins on the same sphere as haversine_km, with longitude scaled at the
+        # circle's poleward edge, where a degree is shortest, so the box covers it
+        lat_margin = np.degrees(radius_km / EARTH_RADIUS_KM)
+        edge = min(abs(latitude) + lat_margin, 90.0)
+        lon_margin = min(lat_margin / max(np.cos(np.radians(edge)), 1e-6), 180.0)
+        positions = self._positions_in_box(latitude - lat_margin, longitude - lon_margin,
+                                           latitude + lat_margin, longitude + lon_margin)
+        distances = haversine_km(self.latitudes[positions], self.longitudes[positions], latitude, longitude)
+        keep = distances <= radius_km
+        positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return self.rows[positions[order]], distances[order]
+
+    def nearest(self, latitude, longitude, k=5):
+        """The k points closest to a location, widening the search radius until enough are found."""
+        radius = self.cell_km
+        while True:
+            rows, distances = self.within_radius(latitude, longitude, radius)
+            if len(rows) >= min(k, len(self.rows)) or radius > 2 * np.pi * EARTH_RADIUS_KM:
+                return rows[:k], distances[:k]
+            radius *= 2
+
+
+class CategoricalIndex:
+    """
+    Row positions per value of a categorical column (e.g. borough or NTA name).
+
+    Lookups are case-insensitive and return sorted int64 arrays, ready to pass
+    as ``candidates`` to VectorRetriever.search or BM25Index.search.
+
+    Args:
+        values (iterable): Column value per row.
+        split (str): Optional regex splitting compound values into parts that
+            are indexed as well, with parenthesized qualifiers dropped; for NTA
+            names like "Astoria (East)-Woodside (North)", split="-" also makes
+            "astoria" and "woodside" lookups work.
+    """
+
+    def __init__(self, values, split=None):
+        values = [str(value).strip().lower() for value in values]
+        rows = {}
+        for row, value in enumerate(values):
+            names = {value}
+            if split and value:
+                names.update(re.sub(r"\s*\([^)]*\)", "", part).strip() for part in re.split(split, value))
+            for name in names:
+                if name:
+                    rows.setdefault(name, []).append(row)
+        self.rows = {name: np.array(positions, dtype=np.int64) for name, positions in rows.items()}
+
+    @classmethod
+    def from_dataframe(cls, df, column, split=None):
+        return cls(df[column].fillna("").tolist(), split=split)
+
+    def __contains__(self, value):
+        return value.strip().lower() in self.rows
+
+    def lookup(self, *values):
+        """Rows having any of the values, in ascending order."""
+        found = [self.rows[value.strip().lower()] for value in values if value.strip().lower() in self.rows]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def mentioned_in(self, text):
+        """Values that appear as whole words in the text, longest first so "East New York" beats "York"."""
+        text = text.lower()
+        mentioned = []
+        for value in sorted(self.rows, key=len, reverse=True):
+            if re.search(r"(?<!\w)" + re.escape(value) + r"(?!\w)", text):
+                mentioned.append(value)
+                text = text.replace(value, " ")
+        return mentioned
+
+
+def detect_boroughs(question, aliases=BOROUGH_ALIASES):
+    """Boroughs named in a question, as spelled in the dataset."""
+    question = question.lower()
+    return [
+        borough for borough, names in aliases.items()
+        if any(re.search(r"\b" + re.escape(name) + r"\b", question) for name in names)
+    ]
+
+
+class SiteIndex:
+    """
+    Spatial and administrative lookups over the drop-off sites.
+
+    Combines a GridIndex on the coordinates with categorical indexes on the
+    borough and neighbourhood (NTA) columns. candidates_for_question narrows a
+    question to the sites in the boroughs or neighbourhoods it names, so
+    semantic ranking only scores those rows.
+    """
+
+    def __init__(self, grid, boroughs, neighborhoods):
+        self.grid = grid
+        self.boroughs = boroughs
+        self.neighborhoods = neighborhoods
+
+    @classmethod
+    def from_dataframe(cls, df, cell_km=1.0):
+        return cls(
+            GridIndex.from_dataframe(df, cell_km=cell_km),
+            CategoricalIndex.from_dataframe(df, "borough"),
+            CategoricalIndex.from_dataframe(df, "ntaname", split="-"),
+        )
+
+    def within_radius(self, latitude, longitude, radius_km):
+        return self.grid.within_radius(latitude, longitude, radius_km)
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        return self.grid.within_bbox(min_lat, min_lon, max_lat, max_lon)
+
+    def in_borough(self, *boroughs):
+        return self.boroughs.lookup(*boroughs)
+
+    def candidates_for_question(self, question, use_neighborhoods=False):
+        """
+        Rows in the boroughs (or neighbourhoods) a question names.
+
+        Neighbourhood names are only matched with use_neighborhoods=True: many
+        of them ("Snug Harbor", "Madison", "Jamaica") also occur in site and
+        host names, where they don't mean the question is about that area.
+        A named neighbourhood is more specific than a borough, so it wins when
+        both are present.
+
+        Returns:
+            np.ndarray: Candidate row indices, or None when the question names
+            no known place and every row should be searched.
+        """
+        if use_neighborhoods:
+            neighborhoods = self.neighborhoods.mentioned_in(question)
+            if neighborhoods:
+                return self.neighborhoods.lookup(*neighborhoods)
+        boroughs = detect_boroughs(question)
+        if boroughs:
+            return self.boroughs.lookup(*boroughs)
+        return None
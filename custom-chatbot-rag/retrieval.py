@@ -0,0 +1,145 @@
+import weakref
+
+import numpy as np
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores along the last axis, best first."""
+    n = scores.shape[-1]
+    if k is None or k >= n:
+        return np.argsort(-scores, axis=-1, kind="stable")
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(top, order, axis=-1)
+
+
+class VectorRetriever:
+    """
+    Exact in-memory retriever over a contiguous, normalized float32 embedding matrix.
+
+    Rows are normalized once at construction, so cosine similarity for a question
+    is a single matrix-vector product and top-k selection uses argpartition
+    instead of sorting every row.
+
+    Pass ``assume_normalized=True`` for embeddings that already have unit length
+    (such as OpenAI's); a contiguous float32 matrix, including a memory-mapped
+    EmbeddingStore.vectors, is then used as-is without copying it into RAM.
+
+    For large corpora, set ``index`` to an approximate nearest neighbour index
+    built over the same rows with the cosine metric and row positions as IDs
+    (such as ann_index.HNSWIndex or IVFFlatIndex); top-k searches then go
+    through it instead of scoring every row.
+    """
+
+    def __init__(self, embeddings, assume_normalized=False, index=None):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = np.vstack([np.asarray(row, dtype=np.float32) for row in embeddings])
+        if not assume_normalized:
+            matrix = _normalize_rows(matrix)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.index = index
+
+    @classmethod
+    def from_dataframe(cls, df, column="embeddings"):
+        """Builds a retriever from a dataframe column holding one embedding per row."""
+        return cls(np.vstack(df[column].values).astype(np.float32))
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def similarities(self, query_embedding):
+        """Cosine similarity between the query and every row."""
+        query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        return self.matrix @ query
+
+    def search(self, query_embedding, k=10, candidates=None):
+        """
+        Finds the rows most similar to a query embedding.
+
+        Args:
+            query_embedding (array-like): The question embedding.
+            k (int): Number of rows to return; None returns every row.
+            candidates (array-like): Optional row indices to restrict the search
+                to (e.g. the sites in one borough); only those rows are scored,
+                exactly, bypassing the approximate index.
+
+        Returns:
+            tuple: (row indices, cosine similarities), most similar first.
+        """
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+            scores = self.matrix[candidates] @ query
+            top = _top_k(scores, k)
+            return candidates[top], scores[top]
+        if self.index is not None and k is not None:
+            rows, distances = self.index.search(np.asarray(query_embedding, dtype=np.float32), k)
+            return np.asarray(rows, dtype=np.int64), 1.0 - np.asarray(distances, dtype=np.float32)
+        scores = self.similarities(query_embedding)
+        top = _top_k(scores, k)
+        return top, scores[top]
+
+    def search_batch(self, query_embeddings, k=10):
+        """
+        Scores many questions with a single matrix multiplication.
+
+        Args:
+            query_embeddings (array-like): A (questions, dim) matrix.
+            k (int): Number of rows to return per question; None returns every row.
+
+        Returns:
+            tuple: (row indices, cosine similarities), each shaped (questions, k),
+            most similar first.
+        """
+        queries = _normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        scores = queries @ self.matrix.T
+        top = _top_k(scores, k)
+        return top, np.take_along_axis(scores, top, axis=-1)
+
+    def rows_sorted_by_relevance(self, query_embedding, df, k=None, candidates=None):
+        """
+        Drop-in replacement for sorting a dataframe with distances_from_embeddings.
+
+        Returns the k most relevant rows of df (every row if k is None, only
+        rows among candidates if given), most relevant first, with a
+        "distances" column holding the cosine distance.
+        """
+        top, similarities = self.search(query_embedding, k, candidates=candidates)
+        rows = df.iloc[top].copy()
+        rows["distances"] = 1.0 - similarities
+        return rows
+
+
+# (id(df), column) -> (weak reference to df, retriever); an entry is dropped as soon as its dataframe
+# is garbage collected, so neither the retriever's matrix nor a reused id outlives it
+_retrievers = {}
+
+
+def retriever_for(df, column="embeddings"):
+    """
+    Returns a VectorRetriever for df, building it only the first time df is seen.
+
+    The retriever is rebuilt if the dataframe's row count changes; rebuild it
+    explicitly with VectorRetriever.from_dataframe after editing embeddings in place.
+    """
+    key = (id(df), column)
+    entry = _retrievers.get(key)
+    if entry is not None:
+        df_ref, retriever = entry
+        if df_ref() is df and len(retriever) == len(df):
+            return retriever
+    retriever = VectorRetriever.from_dataframe(df, column)
+    if entry is None or entry[0]() is not df:
+        weakref.finalize(df, _retrievers.pop, key, None)
+    _retrievers[key] = (weakref.ref(df), retriever)
+    return retriever
@@ -0,0 +1,80 @@
+import numpy as np
+
+from bm25 import BM25Index, hybrid_search, reciprocal_rank_fusion, tokenize
+from retrieval import VectorRetriever
+
+TEXTS = [
+    "East New York Farms: compost drop-off on Saturdays",
+    "Union Square Greenmarket food scrap drop-off",
+    "Brooklyn Grange rooftop farm compost",
+    "Queens Botanical Garden compost site, open daily",
+    "Grand Army Plaza food scraps, Saturdays and Sundays",
+    "Staten Island compost yard",
+]
+
+
+def test_tokenize_drops_punctuation_and_case():
+    assert tokenize("East New York Farms: Drop-off!") == ["east", "new", "york", "farms", "drop", "off"]
+
+
+def test_incremental_adds_match_a_fresh_build():
+    fresh = BM25Index.from_texts(TEXTS)
+    incremental = BM25Index()
+    for start in range(0, len(TEXTS), 2):
+        positions = incremental.add(TEXTS[start:start + 2])
+        np.testing.assert_array_equal(positions, np.arange(start, min(start + 2, len(TEXTS))))
+        # Searching in between merges the pending rows
+        incremental.search("compost")
+
+    for question in ("compost saturdays", "food scrap drop-off", "rooftop farm", "nothing matches"):
+        np.testing.assert_allclose(incremental.scores(question), fresh.scores(question), rtol=1e-6)
+    np.testing.assert_array_equal(incremental.offsets, fresh.offsets)
+    np.testing.assert_array_equal(incremental.doc_ids, fresh.doc_ids)
+    np.testing.assert_array_equal(incremental.term_freqs, fresh.term_freqs)
+
+
+def test_search_ranks_matching_rows_and_respects_candidates():
+    index = BM25Index.from_texts(TEXTS)
+
+    rows, scores = index.search("compost saturdays", k=10)
+    assert rows[0] == 0  # the only row with both terms
+    assert set(rows) == {0, 2, 3, 4, 5}
+    assert np.all(np.diff(scores) <= 0) and np.all(scores > 0)
+
+    rows, _ = index.search("compost", k=10, candidates=[1, 2, 3])
+    assert set(rows) == {2, 3}
+    assert len(index.search("zebra")[0]) == 0
+
+
+def test_reciprocal_rank_fusion_ordering():
+    rows, scores = reciprocal_rank_fusion([[1, 2, 3], [3, 2, 4]], k=60)
+
+    # 2 is second in both lists; 3 is first in one and third in the other
+    assert list(rows) == [3, 2, 1, 4]
+    np.testing.assert_allclose(scores[0], 1 / 63 + 1 / 61)
+    np.testing.assert_allclose(scores[1], 2 / 62)
+
+    weighted, _ = reciprocal_rank_fusion([[1, 2], [2, 1]], weights=[2.0, 1.0], limit=1)
+    assert list(weighted) == [1]
+
+
+def test_hybrid_search_fuses_both_retrievers():
+    index = BM25Index.from_texts(TEXTS)
+    embeddings = np.eye(len(TEXTS), dtype=np.float32)
+    retriever = VectorRetriever(embeddings)
+
+    # Lexically row 2 is the rooftop farm; the embedding points at row 5
+    rows, _ = hybrid_search(index, retriever, "rooftop farm", embeddings[5], k=3, candidates=3)
+    assert set(rows[:2]) == {2, 5}
+
+    rows, _ = hybrid_search(index, retriever, "compost", embeddings[5], k=3, rows=[0, 1, 2])
+    assert set(rows) <= {0, 1, 2}
+
+
+def test_hybrid_search_over_no_candidates_is_empty():
+    index = BM25Index.from_texts(TEXTS)
+    retriever = VectorRetriever(np.eye(len(TEXTS), dtype=np.float32))
+
+    rows, scores = hybrid_search(index, retriever, "compost", np.ones(len(TEXTS)), k=3,
+                                 rows=np.zeros(0, dtype=np.int64))
+    assert len(rows) == 0 and len(scores) == 0
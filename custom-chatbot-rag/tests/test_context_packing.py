@@ -0,0 +1,83 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import context_packing
+from context_packing import ContextPacker, count_tokens
+
+TEMPLATE = "Answer from the context.\n\nContext: {}\n\nQuestion: {}\nAnswer:"
+
+
+class StubEncoding:
+    """One token per whitespace-separated word, so budgets are easy to reason about."""
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode_ordinary(text) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def stub_encoding(monkeypatch):
+    monkeypatch.setattr(context_packing, "get_encoding", lambda encoding_name="cl100k_base": StubEncoding())
+
+
+def _words(count, name):
+    return " ".join([name] * count)
+
+
+def test_count_tokens_uses_the_encoding():
+    np.testing.assert_array_equal(count_tokens(["a b c", "", "d"]), [3, 0, 1])
+
+
+def test_greedy_skips_rows_that_do_not_fit_and_keeps_trying():
+    packer = ContextPacker(TEMPLATE, separator=" ### ")
+    texts = [_words(5, "a"), _words(30, "b"), _words(4, "c"), _words(20, "d")]
+    fixed = packer.template_tokens + 1
+
+    packed = packer.pack("question", texts, max_tokens=fixed + 10)
+
+    # 5 + separator + 4 fits; the 30-token row is skipped, not the end of packing
+    assert packed.rows == [0, 2]
+    assert packed.used_tokens == fixed + 5 + 1 + 4
+    assert "a a a a a ### c c c c" in packed.prompt
+    assert packed.prompt.endswith("Question: question\nAnswer:")
+
+
+def test_knapsack_matches_brute_force_and_beats_greedy():
+    packer = ContextPacker(TEMPLATE, separator=" ### ")
+    token_counts = [9, 4, 4, 5, 3, 7]
+    texts = [_words(count, f"w{i}") for i, count in enumerate(token_counts)]
+    scores = [1.0, 0.9, 0.8, 0.7, 0.6, 0.5]
+    max_tokens = packer.template_tokens + 1 + 15
+
+    greedy = packer.pack("question", texts, token_counts, max_tokens=max_tokens, scores=scores)
+    knapsack = packer.pack("question", texts, token_counts, max_tokens=max_tokens, scores=scores,
+                           strategy="knapsack")
+
+    def cost(rows):
+        return sum(token_counts[i] for i in rows) + packer.separator_tokens * max(len(rows) - 1, 0)
+
+    best = max(
+        (rows for size in range(len(texts) + 1) for rows in itertools.combinations(range(len(texts)), size)
+         if cost(rows) <= 15),
+        key=lambda rows: sum(scores[i] for i in rows),
+    )
+    assert knapsack.rows == list(best)
+    assert sum(scores[i] for i in knapsack.rows) > sum(scores[i] for i in greedy.rows)
+    for packed in (greedy, knapsack):
+        assert packed.used_tokens <= max_tokens
+        assert packed.used_tokens == packer.template_tokens + 1 + cost(packed.rows)
+
+
+def test_nothing_fits_and_unknown_strategy():
+    packer = ContextPacker(TEMPLATE)
+
+    for strategy in ("greedy", "knapsack"):
+        packed = packer.pack("question", [_words(10, "a")], max_tokens=packer.template_tokens + 5,
+                             strategy=strategy)
+        assert packed.rows == []
+    with pytest.raises(ValueError):
+        packer.pack("question", ["a"], strategy="best")
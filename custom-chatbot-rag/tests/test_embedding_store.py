@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    return str(tmp_path / "embedding_store")
+
+
+def _embeddings(rows, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+
+
+def test_append_verify_and_reload(store_dir):
+    store = EmbeddingStore.create(store_dir, dim=8)
+    first, second = _embeddings(5), _embeddings(3, seed=1)
+    store.append(first, [{"text": f"site {i}", "borough": "Queens"} for i in range(5)])
+    store.append(second, [{"text": f"site {i}"} for i in range(5, 8)])
+
+    assert len(store) == 8 and store.verify()
+    reopened = EmbeddingStore(store_dir)
+    assert isinstance(reopened.vectors, np.memmap)
+    np.testing.assert_array_equal(reopened.vectors, np.vstack([first, second]))
+    assert reopened.texts == [f"site {i}" for i in range(8)]
+    assert reopened.records[0] == {"text": "site 0", "borough": "Queens"}
+    assert reopened.verify()
+    # The vector file stays a standard .npy
+    np.testing.assert_array_equal(np.load(os.path.join(store_dir, EmbeddingStore.VECTORS_FILE)),
+                                  np.vstack([first, second]))
+
+
+def test_verify_detects_corrupted_vectors(store_dir):
+    store = EmbeddingStore.create(store_dir, dim=8)
+    store.append(_embeddings(4), [{"text": str(i)} for i in range(4)])
+
+    with open(os.path.join(store_dir, EmbeddingStore.VECTORS_FILE), "r+b") as f:
+        f.seek(-4, os.SEEK_END)
+        f.write(np.float32(123.0).tobytes())
+
+    assert not EmbeddingStore(store_dir).verify()
+
+
+def test_interrupted_append_leaves_the_previous_state(store_dir):
+    store = EmbeddingStore.create(store_dir, dim=8)
+    embeddings = _embeddings(4)
+    store.append(embeddings, [{"text": str(i)} for i in range(4)])
+    # Bytes written by an append that crashed before updating the manifest
+    with open(os.path.join(store_dir, EmbeddingStore.VECTORS_FILE), "ab") as f:
+        f.write(b"\x00" * 40)
+    with open(os.path.join(store_dir, EmbeddingStore.RECORDS_FILE), "ab") as f:
+        f.write(b'{"text": "half')
+
+    reopened = EmbeddingStore(store_dir)
+    assert len(reopened) == 4 and reopened.verify()
+    assert reopened.texts == ["0", "1", "2", "3"]
+
+    reopened.append(_embeddings(1, seed=2), [{"text": "4"}])
+    again = EmbeddingStore(store_dir)
+    assert again.texts == ["0", "1", "2", "3", "4"] and again.verify()
+
+
+def test_append_rejects_mismatched_input(store_dir):
+    store = EmbeddingStore.create(store_dir, dim=8)
+
+    with pytest.raises(ValueError):
+        store.append(_embeddings(2, dim=4), [{"text": "a"}, {"text": "b"}])
+    with pytest.raises(ValueError):
+        store.append(_embeddings(2), [{"text": "a"}])
+    with pytest.raises(FileExistsError):
+        EmbeddingStore.create(store_dir, dim=8)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geo_index import CategoricalIndex, GridIndex, SiteIndex, detect_boroughs, haversine_km
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    latitudes = rng.uniform(40.50, 40.90, size=2000)
+    longitudes = rng.uniform(-74.25, -73.70, size=2000)
+    # A few sites without coordinates
+    latitudes[[3, 50, 700]] = np.nan
+    return latitudes, longitudes
+
+
+def test_haversine_known_distance():
+    # City Hall to Grand Central is about 5 km
+    distance = haversine_km(np.array([40.7128]), np.array([-74.0060]), 40.7527, -73.9772)[0]
+    assert distance == pytest.approx(5.1, abs=0.3)
+
+
+@pytest.mark.parametrize("cell_km", [0.25, 1.0, 5.0])
+@pytest.mark.parametrize("radius_km", [0.5, 2.0, 15.0])
+def test_within_radius_matches_brute_force(points, cell_km, radius_km):
+    latitudes, longitudes = points
+    grid = GridIndex(latitudes, longitudes, cell_km=cell_km)
+
+    rows, distances = grid.within_radius(40.7128, -74.0060, radius_km)
+
+    all_distances = haversine_km(latitudes, longitudes, 40.7128, -74.0060)
+    expected = np.flatnonzero(all_distances <= radius_km)
+    assert len(grid) == 1997
+    np.testing.assert_array_equal(np.sort(rows), expected)
+    np.testing.assert_allclose(distances, all_distances[rows])
+    assert np.all(np.diff(distances) >= 0)
+
+
+@pytest.mark.parametrize("box", [
+    (40.650, -73.980, 40.675, -73.960),
+    (40.50, -74.25, 40.90, -73.70),
+    (41.0, -73.0, 41.1, -72.9),
+])
+def test_within_bbox_matches_brute_force(points, box):
+    latitudes, longitudes = points
+    min_lat, min_lon, max_lat, max_lon = box
+
+    rows = GridIndex(latitudes, longitudes, cell_km=0.5).within_bbox(*box)
+
+    with np.errstate(invalid="ignore"):
+        expected = np.flatnonzero((latitudes >= min_lat) & (latitudes <= max_lat)
+                                  & (longitudes >= min_lon) & (longitudes <= max_lon))
+    np.testing.assert_array_equal(rows, expected)
+
+
+def test_nearest_matches_brute_force(points):
+    latitudes, longitudes = points
+    grid = GridIndex(latitudes, longitudes)
+
+    rows, _ = grid.nearest(40.60, -74.10, k=5)
+
+    all_distances = np.nan_to_num(haversine_km(latitudes, longitudes, 40.60, -74.10), nan=np.inf)
+    np.testing.assert_array_equal(rows, np.argsort(all_distances)[:5])
+
+
+def test_queries_wrap_across_the_antimeridian():
+    # Fiji straddles 180°: sites on both sides of the date line
+    rng = np.random.default_rng(1)
+    latitudes = rng.uniform(-17.5, -16.5, size=500)
+    longitudes = (rng.uniform(179.0, 181.0, size=500) + 180.0) % 360.0 - 180.0
+    grid = GridIndex(latitudes, longitudes)
+
+    rows, distances = grid.within_radius(-17.0, 179.95, 20.0)
+    all_distances = haversine_km(latitudes, longitudes, -17.0, 179.95)
+    np.testing.assert_array_equal(np.sort(rows), np.flatnonzero(all_distances <= 20.0))
+    assert (longitudes[rows] < 0).any() and (longitudes[rows] > 0).any()
+
+    rows, _ = grid.nearest(-17.0, -179.99, k=10)
+    np.testing.assert_array_equal(rows, np.argsort(haversine_km(latitudes, longitudes, -17.0, -179.99))[:10])
+
+    rows = grid.within_bbox(-17.2, 179.9, -16.8, -179.9)
+    expected = np.flatnonzero((latitudes >= -17.2) & (latitudes <= -16.8) & (np.abs(longitudes) >= 179.9))
+    np.testing.assert_array_equal(rows, expected)
+
+
+def test_categorical_index_and_question_scoping():
+    df = pd.DataFrame({
+        "borough": ["Manhattan", "Brooklyn", "Staten Island", "manhattan", None],
+        "ntaname": ["Chinatown", "Astoria (East)-Woodside (North)", "Snug Harbor", "SoHo", "Jamaica"],
+        "latitude": [40.716, 40.690, 40.643, 40.723, np.nan],
+        "longitude": [-73.996, -73.990, -74.102, -74.003, np.nan],
+    })
+    neighborhoods = CategoricalIndex.from_dataframe(df, "ntaname", split="-")
+    sites = SiteIndex.from_dataframe(df)
+
+    np.testing.assert_array_equal(neighborhoods.lookup("astoria", "Woodside"), [1])
+    assert "snug harbor" in neighborhoods
+    assert detect_boroughs("Anything open in Staten Island or the Bronx?") == ["Bronx", "Staten Island"]
+    np.testing.assert_array_equal(sites.candidates_for_question("drop-off in Manhattan"), [0, 3])
+    assert sites.candidates_for_question("Snug Harbor Youth compost") is None
+    np.testing.assert_array_equal(
+        sites.candidates_for_question("near Snug Harbor in Brooklyn", use_neighborhoods=True), [2])
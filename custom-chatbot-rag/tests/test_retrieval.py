@@ -0,0 +1,82 @@
+import gc
+
+import numpy as np
+import pandas as pd
+
+import retrieval
+from retrieval import VectorRetriever, _top_k, retriever_for
+
+
+def _random_embeddings(rows=200, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+
+
+def test_top_k_matches_a_full_sort():
+    scores = np.random.default_rng(1).normal(size=(3, 50)).astype(np.float32)
+
+    np.testing.assert_array_equal(_top_k(scores, 5), np.argsort(-scores, axis=-1)[:, :5])
+    np.testing.assert_array_equal(_top_k(scores[0], None), np.argsort(-scores[0]))
+
+
+def test_search_matches_brute_force_cosine():
+    embeddings = _random_embeddings()
+    query = _random_embeddings(rows=1, seed=2)[0]
+    retriever = VectorRetriever(embeddings)
+
+    rows, similarities = retriever.search(query, k=10)
+
+    expected = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    np.testing.assert_array_equal(rows, np.argsort(-expected)[:10])
+    np.testing.assert_allclose(similarities, expected[rows], rtol=1e-5)
+
+
+def test_search_restricted_to_candidates_and_batched():
+    embeddings = _random_embeddings()
+    queries = _random_embeddings(rows=4, seed=3)
+    retriever = VectorRetriever(embeddings)
+    candidates = np.arange(0, 200, 7)
+
+    rows, _ = retriever.search(queries[0], k=5, candidates=candidates)
+    assert set(rows) <= set(candidates)
+    np.testing.assert_array_equal(rows, candidates[np.argsort(-retriever.similarities(queries[0])[candidates])[:5]])
+
+    batch_rows, batch_similarities = retriever.search_batch(queries, k=5)
+    for query, expected_rows, expected_similarities in zip(queries, batch_rows, batch_similarities):
+        rows, similarities = retriever.search(query, k=5)
+        np.testing.assert_array_equal(rows, expected_rows)
+        np.testing.assert_allclose(similarities, expected_similarities, rtol=1e-5)
+
+
+def test_rows_sorted_by_relevance_adds_cosine_distances():
+    embeddings = _random_embeddings(rows=20)
+    df = pd.DataFrame({"text": [f"row {i}" for i in range(20)], "embeddings": list(embeddings)})
+    retriever = VectorRetriever.from_dataframe(df)
+
+    rows = retriever.rows_sorted_by_relevance(embeddings[4], df, k=3)
+
+    assert rows["text"].iloc[0] == "row 4"
+    assert abs(rows["distances"].iloc[0]) < 1e-6
+    assert rows["distances"].is_monotonic_increasing
+
+
+def test_retriever_for_reuses_and_rebuilds_per_dataframe():
+    df = pd.DataFrame({"embeddings": list(_random_embeddings(rows=10))})
+
+    retriever = retriever_for(df)
+    assert retriever_for(df) is retriever
+
+    df.loc[10] = [np.ones(16, dtype=np.float32)]
+    rebuilt = retriever_for(df)
+    assert rebuilt is not retriever and len(rebuilt) == 11
+
+
+def test_retriever_for_drops_entries_of_collected_dataframes():
+    before = len(retrieval._retrievers)
+    df = pd.DataFrame({"embeddings": list(_random_embeddings(rows=10))})
+    retriever_for(df)
+    retriever_for(df, column="embeddings")
+    assert len(retrieval._retrievers) == before + 1
+
+    del df
+    gc.collect()
+    assert len(retrieval._retrievers) == before
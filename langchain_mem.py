@@ -2,126 +2,18 @@ from langchain.chat_models import ChatOpenAI
 from langchain.llms import OpenAI
 from langchain.prompts import PromptTemplate
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from langchain.memory import ConversationSummaryMemory, ConversationBufferMemory, CombinedMemory, ChatMessageHistory
+from langchain.memory import CombinedMemory, ChatMessageHistory
 from langchain.chains import ConversationChain
-from typing import Any, Dict, Optional, Tuple
+from typing import Optional, Tuple
 
-import requests
 import os
 
+from conversation_memory import DeferredSummaryMemory, TokenBudgetMemory
+from movie_plot_fetcher import WikipediaPlotFetcher
+
 os.environ["OPENAI_API_KEY"] = "YOUR API KEY"
 os.environ["OPENAI_API_BASE"] = "https://openai.vocareum.com/v1"
 
-def get_movie_plot(movie_name):
-    headers = {
-        'User-Agent': 'MoviePlotFetcher/1.0'
-    }
-
-    base_url = f"https://en.wikipedia.org/w/api.php"
-
-    def is_movie_page(title):
-        params = {
-            "action": "query",
-            "format": "json",
-            "titles": title,
-            "prop": "categories|revisions",
-            "rvprop": "content",
-            "cllimit": "max"
-        }
-
-        response = requests.get(base_url, headers=headers, params=params)
-        data = response.json()
-
-        try:
-            page = list(data["query"]["pages"].values())[0]
-
-            # Check categories for Movie indication
-            categories = [cat["title"] for cat in page.get("categories", [])]
-            for category in categories:
-                if "films" in category.lower():
-                    return True
-
-            # Check for infobox movie in the page content
-            content = page["revisions"][0]["*"]
-            if "{{Infobox film" in content:
-                return True
-
-        except Exception as e:
-            pass
-
-        return False
-
-    def extract_plot_from_text(full_text):
-        try:
-            # Find the start of the Plot section
-            plot_start = full_text.index("== Plot ==") + len("== Plot ==")
-
-            # Find the start of the next section
-            next_section_start = full_text.find("==", plot_start)
-
-            # If no next section is found, use the end of the text
-            if next_section_start == -1:
-                next_section_start = len(full_text)
-
-            # Extract the plot text and strip leading/trailing whitespace
-            plot_text = full_text[plot_start:next_section_start].strip()
-
-            # Return the extracted plot
-            return plot_text
-
-        except ValueError:
-            # Return a message if the Plot section isn't found
-            return "Plot section not found in the text."
-
-    def extract_first_paragraph(full_text):
-        # Find the first double newline
-        end_of_first_paragraph = full_text.find("\n\n")
-
-        # If found, slice the string to get the first paragraph
-        if end_of_first_paragraph != -1:
-            return full_text[:end_of_first_paragraph].strip()
-
-        # If not found, return the whole text as it might be just one paragraph
-        return full_text.strip()
-
-
-    search_params = {
-        "action": "query",
-        "format": "json",
-        "list": "search",
-        "srsearch": movie_name,
-        "utf8": 1,
-        "srlimit": 5  # Top 5 search results
-    }
-
-    response = requests.get(base_url, headers=headers, params=search_params)
-    data = response.json()
-
-    # Go through top search results to find a movie page
-    for search_result in data["query"]["search"]:
-        title = search_result["title"]
-        if is_movie_page(title):
-            # Fetch plot for the movie page
-            plot_params = {
-                "action": "query",
-                "format": "json",
-                "titles": title,
-                "prop": "extracts",
-                "explaintext": True,
-            }
-
-            plot_response = requests.get(base_url, headers=headers, params=plot_params)
-            plot_data = plot_response.json()
-
-            try:
-                page = list(plot_data["query"]["pages"].values())[0]
-                full_text = page.get("extract", "No text...")
-                return f"""Overview:\n{extract_first_paragraph(full_text)}\nPlot:\n{extract_plot_from_text(full_text)}""".strip()
-            except:
-                return "Error fetching plot."
-
-    return "Movie not found."
-
 
 model_name = "gpt-3.5-turbo"
 temperature = 0.0
@@ -156,7 +48,7 @@ for i in range(len(personal_questions)):
 history.add_ai_message("""Now tell me a plot summary of a movie you're considering watching, and specify how you want me to respond to you with the movie rating""")
 
 # will be updated for every new conversation / run.
-summary_memory = ConversationSummaryMemory(
+summary_memory = DeferredSummaryMemory(
     llm=llm,
     memory_key="recommendation_summary",
     # input_key acts as a signpost, pointing the memory to the correct piece of data that represents the user's side of the conversation.
@@ -169,17 +61,16 @@ summary_memory = ConversationSummaryMemory(
     # The input_key parameter resolves this ambiguity, ensuring that only the new user message is appended to the history for that turn, preventing duplication and confusion.
     input_key="input",
     buffer=f"The human answered {len(personal_questions)} personal questions). Use them to rate, from 1 to {max_rating}, how much they like a movie they describe to you.",
+    summarize_every=2,
     return_messages=True)
 
-# you could choose to store some of the q/a in memory as well, in addition to original questions
-class MementoBufferMemory(ConversationBufferMemory):
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        input_str, output_str = self._get_input_output(inputs, outputs)
-        self.chat_memory.add_ai_message(output_str)
-
-# the ENTIRE chat history it holds will be injected into the prompt under this variable name: questions_and_answers. It will become longer and longer
-conversational_memory = MementoBufferMemory(
+# the chat history it holds will be injected into the prompt under this variable name: questions_and_answers.
+# the token budget stops it from growing with every rated movie
+conversational_memory = TokenBudgetMemory(
     chat_memory=history,
+    max_token_limit=1500,
+    pinned_messages=len(history.messages),
+    recent_turns=2,
     memory_key="questions_and_answers",
     # The input_key="input" parameter of ConversationSummaryMemory and MementoBufferMemory/ConversationBufferMemory constructor is used by the parent class's _get_input_output method
     # Its presence is a requirement of the parent class method _get_input_output even if you don't use its full result.
@@ -204,9 +95,14 @@ PROMPT = PromptTemplate(
 )
 recommender = ConversationChain(llm=llm, verbose=True, memory=memory, prompt=PROMPT)
 
+# Fetch every plot up front: the searches and page fetches run concurrently
+plot_fetcher = WikipediaPlotFetcher()
+movie_plots = plot_fetcher.fetch_plots(movies)
+plot_fetcher.close()
+
 for movie in movies:
     print("Movie: " + movie)
-    movie_plot = get_movie_plot(movie)
+    movie_plot = movie_plots[movie]
     # print(f"Plot: {movie_plot}")
 
     plot_rating_instructions = f"""
@@ -235,6 +131,7 @@ for movie in movies:
     """
     prediction = recommender.predict(input=plot_rating_instructions)
     print(prediction)
+    print(f"Q&A memory: {conversational_memory.token_count()} tokens")
 
 final_recommendation = """Now that AI has rated all the movies, AI will recommend human the one that human will like the most. 
                             AI will respond with movie recommendation, and short explanation for why human will like it over all other movies. 
@@ -242,5 +139,8 @@ final_recommendation = """Now that AI has rated all the movies, AI will recommen
                             However, the movie you will pick must be one of the movies you rated the highest.
                             For example, if you rated one movie 65, and the other 60, you will recommend the movie with rating 65 because rating 65 
                             is greate than rating of 60 ."""
+# the recommendation has to see every rating in the summary, so wait for the queued updates
+summary_memory.flush()
 prediction = recommender.predict(input=final_recommendation)
-print(prediction)
\ No newline at end of file
+print(prediction)
+summary_memory.close()
\ No newline at end of file
@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+USER_AGENT = "MoviePlotFetcher/1.0"
+# The MediaWiki API accepts at most 50 titles per query
+MAX_TITLES_PER_REQUEST = 50
+FILM_INFOBOX = "Template:Infobox film"
+DEFAULT_CACHE_DIR = os.environ.get("MOVIE_PLOT_CACHE_DIR", os.path.expanduser("~/.cache/movie_plot_fetcher"))
+
+
+def extract_plot_from_text(full_text):
+    try:
+        # Find the start of the Plot section
+        plot_start = full_text.index("== Plot ==") + len("== Plot ==")
+
+        # Find the start of the next section
+        next_section_start = full_text.find("==", plot_start)
+
+        # If no next section is found, use the end of the text
+        if next_section_start == -1:
+            next_section_start = len(full_text)
+
+        # Extract the plot text and strip leading/trailing whitespace
+        return full_text[plot_start:next_section_start].strip()
+
+    except ValueError:
+        # Return a message if the Plot section isn't found
+        return "Plot section not found in the text."
+
+
+def extract_first_paragraph(full_text):
+    # Find the first double newline
+    end_of_first_paragraph = full_text.find("\n\n")
+
+    # If found, slice the string to get the first paragraph
+    if end_of_first_paragraph != -1:
+        return full_text[:end_of_first_paragraph].strip()
+
+    # If not found, return the whole text as it might be just one paragraph
+    return full_text.strip()
+
+
+def format_plot(full_text):
+    return f"""Overview:\n{extract_first_paragraph(full_text)}\nPlot:\n{extract_plot_from_text(full_text)}""".strip()
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses, one JSON file per request.
+
+    Entries younger than ``ttl`` seconds are used without contacting the
+    server. Older ones are revalidated with their ETag / Last-Modified, so an
+    unchanged page costs a 304 instead of a full download, and are still served
+    if the server can't be reached.
+
+    Args:
+        cache_dir (str): Directory holding the entries; created on first write.
+        ttl (float): Seconds an entry is used without revalidation.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=7 * 24 * 60 * 60):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key):
+        """Returns the entry for key (a dict with "data", "fetched_at" and validators), or None."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def set(self, key, data, etag=None, last_modified=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {"fetched_at": time.time(), "etag": etag, "last_modified": last_modified, "data": data}
+        path = self._path(key)
+        # Write then rename, so concurrent readers never see a half-written entry
+        tmp_path = f"{path}.{os.getpid()}.{id(entry)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        return entry
+
+
+class WikipediaPlotFetcher:
+    """
+    Fetches movie plots from Wikipedia for a whole list of movies at once.
+
+    All requests share one keep-alive session. Searches run concurrently, the
+    candidate pages of every movie are checked for being films in batched
+    ``titles=A|B|C`` queries, and the chosen pages' text is fetched concurrently.
+    Every response goes through a ResponseCache, so repeated runs only
+    revalidate what they fetched before.
+
+    Args:
+        api_url (str): MediaWiki API endpoint.
+        cache (ResponseCache): Response cache; None uses a ResponseCache in
+            DEFAULT_CACHE_DIR (set MOVIE_PLOT_CACHE_DIR to move it), False disables caching.
+        max_workers (int): Requests in flight at once (and pooled connections).
+        search_limit (int): Search results considered per movie.
+        timeout (float): Seconds before a request is abandoned.
+        session (requests.Session): Session to use instead of a new pooled one.
+    """
+
+    def __init__(self, api_url=WIKIPEDIA_API_URL, cache=None, max_workers=8, search_limit=5,
+                 timeout=10.0, session=None):
+        self.api_url = api_url
+        if cache is None:
+            cache = ResponseCache()
+        self.cache = cache or None
+        self.max_workers = max_workers
+        self.search_limit = search_limit
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        self.session = session
+        self.requests_sent = 0
+        self.not_modified = 0
+        self._counter_lock = threading.Lock()
+
+    def _get(self, params):
+        params = {"action": "query", "format": "json", **params}
+        key = self.api_url + "?" + "&".join(f"{name}={params[name]}" for name in sorted(params))
+        entry = self.cache.get(key) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            return entry["data"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            with self._counter_lock:
+                self.requests_sent += 1
+            response = self.session.get(self.api_url, params=params, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                with self._counter_lock:
+                    self.not_modified += 1
+                self.cache.set(key, entry["data"], entry.get("etag"), entry.get("last_modified"))
+                return entry["data"]
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            if entry is not None:
+                print(f"Using cached Wikipedia response after error: {e}")
+                return entry["data"]
+            raise
+        if self.cache is not None:
+            self.cache.set(key, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return data
+
+    def _query_pages(self, titles, params):
+        """Runs a prop query for titles, following continuations, and returns pages keyed by requested title."""
+        pages, normalized, redirects = {}, {}, {}
+        continuation = {}
+        while True:
+            data = self._get({**params, "titles": "|".join(titles), "redirects": 1, **continuation})
+            query = data.get("query", {})
+            normalized.update((mapping["from"], mapping["to"]) for mapping in query.get("normalized", []))
+            redirects.update((mapping["from"], mapping["to"]) for mapping in query.get("redirects", []))
+            for page in query.get("pages", {}).values():
+                if "missing" in page or "invalid" in page:
+                    continue
+                merged = pages.setdefault(page.get("title"), {})
+                for field, value in page.items():
+                    if isinstance(value, list):
+                        merged.setdefault(field, []).extend(value)
+                    else:
+                        merged[field] = value
+            if "continue" not in data:
+                break
+            continuation = data["continue"]
+        # Report pages under the titles that were asked for, through normalization and redirects
+        result = {}
+        for title in titles:
+            resolved = normalized.get(title, title)
+            resolved = redirects.get(resolved, resolved)
+            if resolved in pages:
+                result[title] = pages[resolved]
+        return result
+
+    def search(self, movie_name):
+        """Returns the titles of the top search results for a movie name."""
+        data = self._get({"list": "search", "srsearch": movie_name, "utf8": 1, "srlimit": self.search_limit})
+        return [result["title"] for result in data.get("query", {}).get("search", [])]
+
+    def film_titles(self, titles):
+        """
+        Checks which pages are about films, up to MAX_TITLES_PER_REQUEST titles per request.
+
+        A page counts as a film if it uses the film infobox or one of its
+        categories mentions films, as in the single-movie version, which read
+        the infobox from the wikitext; here only the template list is fetched.
+
+        Returns:
+            set: The titles, as given, of the pages about films.
+        """
+        titles = list(dict.fromkeys(titles))
+        films = set()
+        for start in range(0, len(titles), MAX_TITLES_PER_REQUEST):
+            batch = titles[start:start + MAX_TITLES_PER_REQUEST]
+            pages = self._query_pages(batch, {"prop": "categories|templates", "cllimit": "max",
+                                              "tltemplates": FILM_INFOBOX, "tllimit": "max"})
+            for title, page in pages.items():
+                categories = [category["title"].lower() for category in page.get("categories", [])]
+                has_infobox = any(template["title"] == FILM_INFOBOX for template in page.get("templates", []))
+                if has_infobox or any("films" in category for category in categories):
+                    films.add(title)
+        return films
+
+    def page_text(self, title):
+        """Returns the plain text of a page."""
+        # TextExtracts only returns full-page text for one title per request
+        pages = self._query_pages([title], {"prop": "extracts", "explaintext": 1})
+        page = pages.get(title) or next(iter(pages.values()), {})
+        return page.get("extract", "No text...")
+
+    def fetch_plots(self, movies):
+        """
+        Fetches the overview and plot of every movie.
+
+        Args:
+            movies (list): Movie names.
+
+        Returns:
+            dict: Movie name to its formatted plot, or to "Movie not found." /
+            "Error fetching plot." as the single-movie version returned.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            search_results = dict(zip(movies, executor.map(self._safe_search, movies)))
+            films = self._safe_film_titles([title for titles in search_results.values() for title in titles])
+            chosen = {
+                movie: next((title for title in titles if title in films), None)
+                for movie, titles in search_results.items()
+            }
+            found = [movie for movie in movies if chosen[movie]]
+            texts = dict(zip(found, executor.map(self._safe_page_text, (chosen[movie] for movie in found))))
+
+        plots = {}
+        for movie in movies:
+            if not chosen[movie]:
+                plots[movie] = "Movie not found."
+            elif texts[movie] is None:
+                plots[movie] = "Error fetching plot."
+            else:
+                plots[movie] = format_plot(texts[movie])
+        return plots
+
+    def _safe_search(self, movie_name):
+        try:
+            return self.search(movie_name)
+        except Exception as e:
+            print(f"Error searching Wikipedia for {movie_name}: {e}")
+            return []
+
+    def _safe_film_titles(self, titles):
+        try:
+            return self.film_titles(titles)
+        except Exception as e:
+            print(f"Error checking Wikipedia pages for films: {e}")
+            return set()
+
+    def _safe_page_text(self, title):
+        try:
+            return self.page_text(title)
+        except Exception as e:
+            print(f"Error fetching Wikipedia page {title}: {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+def get_movie_plot(movie_name, fetcher=None):
+    """Fetches the plot of a single movie; prefer WikipediaPlotFetcher.fetch_plots for several."""
+    fetcher = fetcher or WikipediaPlotFetcher()
+    return fetcher.fetch_plots([movie_name])[movie_name]
+
+
+if __name__ == "__main__":
+    import sys
+
+    movie_names = sys.argv[1:] or ["Barbie", "Oppenheimer", "The Notebook", "Dumb Money"]
+    plot_fetcher = WikipediaPlotFetcher()
+    started = time.perf_counter()
+    for name, plot in plot_fetcher.fetch_plots(movie_names).items():
+        print(f"=== {name} ===\n{plot[:500]}\n")
+    print(f"Fetched {len(movie_names)} plots in {time.perf_counter() - started:.2f}s "
+          f"({plot_fetcher.requests_sent} requests, {plot_fetcher.not_modified} not modified)")
@@ -1,8 +1,21 @@
+import argparse
+
 from database import HomeMatchDB
+from listing_filters import ListingFilter
+from metrics import metrics
 from preference_parser import PreferenceParser
 from personalizer import ListingPersonalizer
+from reranker import CrossEncoderReranker
+
+def _print_listing_facts(listing):
+    print(f"Neighborhood: {listing['neighborhood']}")
+    print(f"Price: ${listing['price']:,}")
+    print(f"Bedrooms: {listing['bedrooms']}")
+    print(f"Bathrooms: {listing['bathrooms']}")
+    print(f"House Size: {listing['house_size']:,} sqft")
 
-def main():
+
+def main(stream=False, filters=None, reranker=None):
     print("Welcome to HomeMatch - Your Personalized Real Estate Agent!")
 
     # Initialize components
@@ -12,34 +25,79 @@ def main():
 
     # 1. Get buyer preferences
     print("\nFirst, let's understand your preferences.")
-    buyer_query_string = parser.get_query_string()
+    buyer_preferences = parser.extract_preferences()
+    buyer_query_string = buyer_preferences.query_string
 
     print("\nSearching for properties that match your preferences...")
 
     # 2. Search for listings based on preferences
-    search_results = db.search_listings(buyer_query_string, n_results=3)
+    if reranker:
+        # Over-fetch and keep only the listings the cross-encoder rates best, so
+        # the personalization calls below are spent on the strongest matches
+        search_results = reranker.search_by_preferences(db, buyer_preferences, n_results=3, filters=filters)
+    else:
+        search_results = db.search_by_preferences(buyer_preferences, n_results=3, filters=filters)
+    db.close()
 
     if not search_results or not search_results['metadatas'] or not search_results['metadatas'][0]:
         print("No matching listings found. Please try adjusting your preferences.")
         return
 
+    # The metadata contains the original listing details
+    original_listings = search_results['metadatas'][0]
+
+    # 3. Personalize the listing descriptions
+    if stream:
+        # Render each description as the model writes it
+        print("\nHere are some personalized listings for you:")
+        for i, original_listing in enumerate(original_listings):
+            print(f"\n--- Personalized Listing {i+1} ---")
+            _print_listing_facts(original_listing)
+            print("\nPersonalized Description:")
+            for chunk in personalizer.stream_personalized_listing(original_listing, buyer_query_string):
+                print(chunk, end="", flush=True)
+            print()
+            print(f"\nNeighborhood Description:\n{original_listing['neighborhood_description']}")
+        return
+
+    # Otherwise personalize the whole page concurrently
+    personalized_descriptions = personalizer.personalize_many(original_listings, buyer_query_string)
+
     print("\nHere are some personalized listings for you:")
-    for i, listing_metadata in enumerate(search_results['metadatas'][0]):
+    for i, (original_listing, personalized_description) in enumerate(
+            zip(original_listings, personalized_descriptions)):
         print(f"\n--- Personalized Listing {i+1} ---")
-        
-        # The metadata contains the original listing details
-        original_listing = listing_metadata
-
-        # 3. Personalize the listing description
-        personalized_description = personalizer.personalize_listing(original_listing, buyer_query_string)
-
-        print(f"Neighborhood: {original_listing['neighborhood']}")
-        print(f"Price: ${original_listing['price']:,}")
-        print(f"Bedrooms: {original_listing['bedrooms']}")
-        print(f"Bathrooms: {original_listing['bathrooms']}")
-        print(f"House Size: {original_listing['house_size']:,} sqft")
+        _print_listing_facts(original_listing)
         print(f"\nPersonalized Description:\n{personalized_description}")
         print(f"\nNeighborhood Description:\n{original_listing['neighborhood_description']}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="HomeMatch - Your Personalized Real Estate Agent")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="Print personalized descriptions as they are generated.")
+    arg_parser.add_argument("--timings", action="store_true",
+                            help="Print where the time went (parsing, embedding, search, personalization).")
+    arg_parser.add_argument("--rerank", action="store_true",
+                            help="Re-rank the search results with a cross-encoder before personalizing.")
+    arg_parser.add_argument("--min-price", type=int, help="Only show listings at or above this price.")
+    arg_parser.add_argument("--max-price", type=int, help="Only show listings at or below this price.")
+    arg_parser.add_argument("--min-bedrooms", type=int, help="Minimum number of bedrooms.")
+    arg_parser.add_argument("--min-bathrooms", type=int, help="Minimum number of bathrooms.")
+    arg_parser.add_argument("--min-house-size", type=int, help="Minimum house size in sqft.")
+    args = arg_parser.parse_args()
+    listing_filter = ListingFilter(
+        min_price=args.min_price,
+        max_price=args.max_price,
+        min_bedrooms=args.min_bedrooms,
+        min_bathrooms=args.min_bathrooms,
+        min_house_size=args.min_house_size,
+    )
+    main(stream=args.stream, filters=listing_filter,
+         reranker=CrossEncoderReranker() if args.rerank else None)
+    if args.timings:
+        print("\nTime per stage:")
+        for stage in metrics.snapshot()["stages"]:
+            labels = ", ".join(f"{key}={value}" for key, value in stage.items()
+                               if key not in ("stage", "count", "total_seconds", "mean_seconds", "max_seconds"))
+            print(f"  {stage['stage']:<24} {labels:<24} {stage['count']:>4} calls {stage['total_seconds']:>9.3f} s")
+    metrics.close()
@@ -0,0 +1,656 @@
+import heapq
+import json
+import math
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+def _squared_distances(queries, vectors):
+    """Squared L2 distances between every query row and every vector row."""
+    return np.maximum(
+        (queries * queries).sum(axis=1)[:, None]
+        - 2.0 * queries @ vectors.T
+        + (vectors * vectors).sum(axis=1)[None, :],
+        0.0,
+    )
+
+
+def _kmeans(vectors, n_clusters, iterations=20, seed=0):
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _squared_distances(vectors, centroids).argmin(axis=1)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters from random points so every list stays usable
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), empty.sum(), replace=False)]
+    return centroids
+
+
+class SlotIndex:
+    """
+    ID and slot bookkeeping shared by the vector indexes.
+
+    Each stored vector occupies a slot, addressed by insertion position, in
+    the per-slot arrays named by ``slot_arrays``; ``ids`` maps positions back
+    to the caller's IDs (e.g. ChromaDB listing IDs or dataframe row numbers).
+    The arrays are preallocated and grown geometrically. Removed IDs leave a
+    tombstone that searches skip; once tombstones pass ``compact_fraction`` of
+    the slots, the index is compacted, unless ``auto_compact`` is off.
+
+    Args:
+        dim (int): Vector dimension.
+        metric (str): "l2" for squared Euclidean distance, or "cosine" for
+            cosine distance (vectors are normalized on insert).
+    """
+
+    slot_arrays = ()
+    compact_fraction = 0.25
+    auto_compact = True
+
+    def __init__(self, dim, metric="l2"):
+        if metric not in ("l2", "cosine"):
+            raise ValueError(f"Unsupported metric: {metric}")
+        self.dim = dim
+        self.metric = metric
+        self.ids = []
+        self._positions = {}
+        # One flag per slot, grown with the slot arrays, so searches mask tombstones without building sets
+        self._deleted = np.zeros(0, dtype=bool)
+        self._n_deleted = 0
+        self._size = 0
+        # Next ID handed out to vectors added without IDs; compaction doesn't reset it
+        self._next_id = 0
+
+    def __len__(self):
+        return self._size - self._n_deleted
+
+    def _prepare(self, vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+        if self.metric == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def _to_metric(self, squared_distances):
+        # For unit vectors, squared L2 distance is twice the cosine distance
+        return squared_distances / 2.0 if self.metric == "cosine" else squared_distances
+
+    def _grow(self, needed):
+        if needed > len(self._deleted):
+            capacity = max(needed, 2 * len(self._deleted), 1024)
+            for name in self.slot_arrays:
+                array = getattr(self, name)
+                if array is not None:
+                    grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+                    grown[:self._size] = array[:self._size]
+                    setattr(self, name, grown)
+            deleted = np.zeros(capacity, dtype=bool)
+            deleted[:self._size] = self._deleted[:self._size]
+            self._deleted = deleted
+
+    def _latest_rows(self, ids, count):
+        """
+        Pairs each distinct ID of a batch with the row it was given at.
+
+        Args:
+            ids (iterable): IDs for the batch, or None to number the rows after
+                every ID assigned so far.
+            count (int): Number of vectors in the batch.
+
+        Returns:
+            dict: ID -> row; the last occurrence wins when a batch repeats an ID.
+        """
+        if ids is None:
+            ids = range(self._next_id, self._next_id + count)
+            self._next_id += count
+        ids = list(ids)
+        if len(ids) != count:
+            raise ValueError(f"Got {count} vectors but {len(ids)} ids")
+        return {external_id: row for row, external_id in enumerate(ids)}
+
+    def _allocate(self, new_ids):
+        """Appends a slot for each ID and returns their positions; the caller fills the slot arrays."""
+        start = self._size
+        needed = start + len(new_ids)
+        self._grow(needed)
+        self._size = needed
+        for position, external_id in enumerate(new_ids, start):
+            self.ids.append(external_id)
+            self._positions[external_id] = position
+        return np.arange(start, needed)
+
+    def _tombstone(self, positions):
+        for position in positions:
+            if not self._deleted[position]:
+                self._deleted[position] = True
+                self._n_deleted += 1
+
+    def remove(self, ids):
+        """Removes vectors by ID; their slots are skipped by later searches."""
+        self._tombstone([self._positions.pop(external_id) for external_id in ids if external_id in self._positions])
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.auto_compact and self._n_deleted and self._n_deleted > self.compact_fraction * self._size:
+            self.compact()
+
+    def compact(self):
+        """Drops tombstoned slots, renumbering the live vectors and re-indexing them."""
+        live = np.flatnonzero(~self._deleted[:self._size])
+        mapping = np.full(self._size, -1, dtype=np.int64)
+        mapping[live] = np.arange(len(live))
+        for name in self.slot_arrays:
+            array = getattr(self, name)
+            if array is not None:
+                setattr(self, name, np.ascontiguousarray(array[live]))
+        self._deleted = np.zeros(len(live), dtype=bool)
+        self._n_deleted = 0
+        self._size = len(live)
+        self.ids = [self.ids[position] for position in live]
+        self._positions = {external_id: position for position, external_id in enumerate(self.ids)}
+        self._reindex(mapping)
+
+    def _reindex(self, mapping):
+        """Updates the index structure after compact(); mapping gives each old position's new one, or -1."""
+
+    def search_batch(self, queries, k=10):
+        return [self.search(query, k) for query in np.atleast_2d(queries)]
+
+    def _slot_state(self):
+        return {"ids": np.array(self.ids), "deleted": np.flatnonzero(self._deleted[:self._size]),
+                "next_id": np.array(self._next_id)}
+
+    def _restore_slots(self, arrays, size):
+        """Rebuilds the bookkeeping for size loaded slots from the arrays _slot_state saved."""
+        self._size = size
+        # Files saved before next_id was stored don't have it; their slot count is the best guess
+        self._next_id = int(arrays["next_id"]) if "next_id" in arrays else size
+        self.ids = arrays["ids"].tolist()
+        self._deleted = np.zeros(size, dtype=bool)
+        self._deleted[arrays["deleted"]] = True
+        self._n_deleted = int(self._deleted.sum())
+        self._positions = {
+            external_id: position for position, external_id in enumerate(self.ids)
+            if not self._deleted[position]
+        }
+
+
+class ANNIndex(SlotIndex, ABC):
+    """
+    Base class for the approximate nearest neighbour indexes.
+
+    Vectors are kept in a growable float32 matrix, one slot each (see
+    SlotIndex). Re-adding an ID with an unchanged vector is a no-op and a
+    changed vector replaces the old one (in place where the index structure
+    allows it), so repeated syncs of the same listings don't grow the index.
+
+    Args:
+        dim (int): Vector dimension.
+        metric (str): "l2" for squared Euclidean distance, or "cosine" for
+            cosine distance (vectors are normalized on insert).
+    """
+
+    kind = None
+    slot_arrays = ("_data",)
+
+    def __init__(self, dim, metric="l2"):
+        super().__init__(dim, metric)
+        self._data = np.empty((0, dim), dtype=np.float32)
+
+    @property
+    def vectors(self):
+        return self._data[:self._size]
+
+    def _append(self, vectors, ids):
+        """
+        Stores vectors under ids and returns the positions of the new slots to index.
+
+        IDs already present keep their slot when the vector is unchanged; a
+        changed vector goes through _replace.
+        """
+        latest = self._latest_rows(ids, len(vectors))
+        row_ids = {row: external_id for external_id, row in latest.items()}
+        new_rows, replaced_positions, replaced_rows = [], [], []
+        for external_id, row in latest.items():
+            position = self._positions.get(external_id)
+            if position is None:
+                new_rows.append(row)
+            elif not np.array_equal(self._data[position], vectors[row]):
+                replaced_positions.append(position)
+                replaced_rows.append(row)
+        if replaced_rows:
+            new_rows += self._replace(np.array(replaced_positions, dtype=np.int64), replaced_rows,
+                                      vectors[replaced_rows])
+        new_rows.sort()
+
+        positions = self._allocate([row_ids[row] for row in new_rows])
+        self._data[positions] = vectors[new_rows]
+        return positions
+
+    def _replace(self, positions, rows, vectors):
+        """
+        Updates the vectors stored at positions; returns the rows that must be appended instead.
+
+        The default overwrites the slots in place, which suits indexes whose
+        structure doesn't depend on the vector values.
+        """
+        self._data[positions] = vectors
+        return []
+
+    @abstractmethod
+    def add(self, vectors, ids=None):
+        """Adds vectors under ids, replacing the vectors of IDs already present."""
+
+    @abstractmethod
+    def _search_positions(self, query, k):
+        """Returns the positions of the k nearest live slots and their squared L2 distances."""
+
+    def search(self, query, k=10):
+        """
+        Finds approximately the k nearest vectors to the query.
+
+        Returns:
+            tuple: (list of IDs, numpy array of distances), nearest first.
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return [], np.empty(0, dtype=np.float32)
+        query = self._prepare(query)[0]
+        positions, squared = self._search_positions(query, k)
+        return [self.ids[p] for p in positions], self._to_metric(squared)
+
+    def _meta(self):
+        return {"kind": self.kind, "dim": self.dim, "metric": self.metric}
+
+    def _arrays(self):
+        return {"vectors": self.vectors, **self._slot_state()}
+
+    def save(self, path):
+        """Saves the index to a single .npz file."""
+        arrays = self._arrays()
+        np.savez(path, meta=np.array(json.dumps(self._meta())), **arrays)
+
+    def _restore(self, arrays):
+        self._data = np.array(arrays["vectors"], dtype=np.float32)
+        self._restore_slots(arrays, len(self._data))
+
+
+class ExactIndex(ANNIndex):
+    """Brute-force index with the same interface, used as the recall baseline."""
+
+    kind = "exact"
+
+    def add(self, vectors, ids=None):
+        self._append(self._prepare(vectors), ids)
+        self._maybe_compact()
+
+    def _search_positions(self, query, k):
+        squared = _squared_distances(query[None, :], self.vectors)[0]
+        if self._n_deleted:
+            squared[self._deleted[:self._size]] = np.inf
+        top = np.argpartition(squared, k - 1)[:k]
+        top = top[np.argsort(squared[top], kind="stable")]
+        return top.tolist(), squared[top]
+
+
+class IVFFlatIndex(ANNIndex):
+    """
+    Inverted file index with uncompressed vectors.
+
+    k-means partitions the vectors into ``n_lists`` cells; a query only scans
+    the ``n_probe`` cells whose centroids are closest. Raising n_probe trades
+    latency for recall. Vectors added after training go to their nearest cell.
+
+    Args:
+        dim (int): Vector dimension.
+        n_lists (int): Number of k-means cells.
+        n_probe (int): Cells scanned per query.
+        metric (str): "l2" or "cosine".
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim, n_lists=100, n_probe=8, metric="l2"):
+        super().__init__(dim, metric)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids = None
+        self._lists = []
+
+    def train(self, vectors, iterations=20, sample_size=None, seed=0):
+        """Learns the cell centroids from (a sample of) the vectors."""
+        vectors = self._prepare(vectors)
+        sample_size = sample_size or self.n_lists * 256
+        if len(vectors) > sample_size:
+            vectors = vectors[np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)]
+        self.centroids = _kmeans(vectors, self.n_lists, iterations, seed)
+        self.n_lists = len(self.centroids)
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(self.n_lists)]
+
+    def build(self, vectors, ids=None):
+        self.train(vectors)
+        self.add(vectors, ids)
+        return self
+
+    def add(self, vectors, ids=None):
+        if self.centroids is None:
+            raise RuntimeError("IVFFlatIndex must be trained before adding vectors")
+        vectors = self._prepare(vectors)
+        positions = self._append(vectors, ids)
+        assignments = _squared_distances(self._data[positions], self.centroids).argmin(axis=1)
+        for cell in np.unique(assignments):
+            self._lists[cell] = np.concatenate([self._lists[cell], positions[assignments == cell]])
+        self._maybe_compact()
+
+    def _replace(self, positions, rows, vectors):
+        # Centroids are fixed after training, so a slot's cell is its old vector's nearest centroid
+        old_cells = _squared_distances(self._data[positions], self.centroids).argmin(axis=1)
+        new_cells = _squared_distances(vectors, self.centroids).argmin(axis=1)
+        self._data[positions] = vectors
+        moved = old_cells != new_cells
+        for cell in np.unique(old_cells[moved]):
+            leaving = positions[moved & (old_cells == cell)]
+            self._lists[cell] = self._lists[cell][~np.isin(self._lists[cell], leaving)]
+        for cell in np.unique(new_cells[moved]):
+            self._lists[cell] = np.concatenate([self._lists[cell], positions[moved & (new_cells == cell)]])
+        return []
+
+    def _reindex(self, mapping):
+        for cell, positions in enumerate(self._lists):
+            positions = mapping[positions]
+            self._lists[cell] = positions[positions >= 0]
+
+    def _search_positions(self, query, k):
+        centroid_distances = _squared_distances(query[None, :], self.centroids)[0]
+        n_probe = min(self.n_probe, self.n_lists)
+        cells = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+        candidates = np.concatenate([self._lists[cell] for cell in cells])
+        if self._n_deleted:
+            candidates = candidates[~self._deleted[candidates]]
+        if not len(candidates):
+            return [], np.empty(0, dtype=np.float32)
+        squared = _squared_distances(query[None, :], self._data[candidates])[0]
+        k = min(k, len(candidates))
+        top = np.argpartition(squared, k - 1)[:k]
+        top = top[np.argsort(squared[top], kind="stable")]
+        return candidates[top].tolist(), squared[top]
+
+    def _meta(self):
+        return {**super()._meta(), "n_lists": self.n_lists, "n_probe": self.n_probe}
+
+    def _arrays(self):
+        arrays = super()._arrays()
+        arrays["centroids"] = self.centroids
+        arrays["list_offsets"] = np.cumsum([0] + [len(cell) for cell in self._lists])
+        arrays["list_positions"] = np.concatenate(self._lists) if self._lists else np.empty(0, np.int64)
+        return arrays
+
+    def _restore(self, arrays):
+        super()._restore(arrays)
+        self.centroids = arrays["centroids"]
+        offsets = arrays["list_offsets"]
+        positions = arrays["list_positions"]
+        self._lists = [positions[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+class HNSWIndex(ANNIndex):
+    """
+    Hierarchical navigable small world graph index.
+
+    Every vector is a node linked to its ``m`` nearest neighbours on each layer
+    it reaches (``2 * m`` on the bottom layer). Searches descend greedily from
+    the sparse top layers and run a best-first search of width ``ef_search`` on
+    the bottom one; raising ef_search (or m / ef_construction at build time)
+    trades latency for recall. Inserts are incremental.
+
+    Compacting means re-inserting every node, which is far too slow to do
+    inside a sync, so removed (and replaced) nodes stay in the graph as
+    tombstones: searches route through them but never return them. Call
+    compact() offline to rebuild the graph without them.
+
+    Args:
+        dim (int): Vector dimension.
+        m (int): Links per node and layer.
+        ef_construction (int): Search width while inserting.
+        ef_search (int): Search width while querying.
+        metric (str): "l2" or "cosine".
+        seed (int): Seed for the random layer assignment.
+    """
+
+    kind = "hnsw"
+    auto_compact = False
+
+    def __init__(self, dim, m=16, ef_construction=100, ef_search=50, metric="l2", seed=0):
+        super().__init__(dim, metric)
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._level_multiplier = 1.0 / math.log(max(m, 2))
+        self._graph = []  # One {node: [neighbour, ...]} dict per layer
+        self._entry_point = None
+
+    def build(self, vectors, ids=None):
+        self.add(vectors, ids)
+        return self
+
+    def _node_distances(self, query, nodes):
+        diff = self._data[nodes] - query
+        return np.einsum("ij,ij->i", diff, diff)
+
+    def _search_layer(self, query, entry_points, ef, level):
+        layer = self._graph[level]
+        visited = set(entry_points)
+        distances = self._node_distances(query, entry_points)
+        candidates = [(distance, node) for distance, node in zip(distances.tolist(), entry_points)]
+        heapq.heapify(candidates)
+        results = [(-distance, node) for distance, node in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0]:
+                break
+            neighbours = [n for n in layer[node] if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+            for neighbour_distance, neighbour in zip(self._node_distances(query, neighbours).tolist(), neighbours):
+                if len(results) < ef or neighbour_distance < -results[0][0]:
+                    heapq.heappush(candidates, (neighbour_distance, neighbour))
+                    heapq.heappush(results, (-neighbour_distance, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-negative, node) for negative, node in results)
+
+    def _select_neighbours(self, candidates, m):
+        # Keep a candidate only if it is closer to the new node than to every neighbour
+        # already kept, so links spread across clusters; fill up with the nearest rejects
+        if len(candidates) <= m:
+            return [candidate for _, candidate in candidates]
+        nodes = [candidate for _, candidate in candidates]
+        vectors = self._data[nodes]
+        pairwise = _squared_distances(vectors, vectors)
+        selected = []
+        rejected = []
+        for i, (distance, candidate) in enumerate(candidates):
+            if len(selected) == m:
+                break
+            if selected and (pairwise[i, selected] < distance).any():
+                rejected.append(i)
+                continue
+            selected.append(i)
+        return [nodes[i] for i in selected + rejected[:m - len(selected)]]
+
+    def _insert(self, node):
+        query = self._data[node]
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_multiplier)
+        while len(self._graph) <= level:
+            self._graph.append({})
+        for layer in range(level + 1):
+            self._graph[layer][node] = []
+        if self._entry_point is None:
+            self._entry_point = node
+            return
+
+        top_level = len(self._graph) - 1
+        entry_level = max(l for l in range(top_level + 1) if self._entry_point in self._graph[l])
+        entry_points = [self._entry_point]
+        for layer in range(entry_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        for layer in range(min(level, entry_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, layer)
+            neighbours = self._select_neighbours([(d, n) for d, n in found if n != node], self.m)
+            self._graph[layer][node] = neighbours
+            max_links = 2 * self.m if layer == 0 else self.m
+            for neighbour in neighbours:
+                links = self._graph[layer][neighbour]
+                links.append(node)
+                if len(links) > max_links:
+                    distances = self._node_distances(self._data[neighbour], links)
+                    order = np.argsort(distances, kind="stable")
+                    self._graph[layer][neighbour] = self._select_neighbours(
+                        [(distances[i], links[i]) for i in order], max_links
+                    )
+            entry_points = [n for _, n in found]
+        if level > entry_level:
+            self._entry_point = node
+
+    def add(self, vectors, ids=None):
+        for node in self._append(self._prepare(vectors), ids).tolist():
+            self._insert(node)
+        self._maybe_compact()
+
+    def _replace(self, positions, rows, vectors):
+        # A node's links were chosen for its old vector, so a changed vector becomes a new node
+        self._tombstone(positions)
+        return list(rows)
+
+    def _reindex(self, mapping):
+        self._graph = []
+        self._entry_point = None
+        for node in range(self._size):
+            self._insert(node)
+
+    def _search_positions(self, query, k):
+        entry_points = [self._entry_point]
+        entry_level = max(l for l in range(len(self._graph)) if self._entry_point in self._graph[l])
+        for layer in range(entry_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        # Widen the search to make up for tombstoned nodes, at most doubling it
+        width = max(self.ef_search, k)
+        ef = width + min(self._n_deleted, width)
+        found = [(d, n) for d, n in self._search_layer(query, entry_points, ef, 0) if not self._deleted[n]]
+        found = found[:k]
+        return [n for _, n in found], np.array([d for d, _ in found], dtype=np.float32)
+
+    def _meta(self):
+        return {**super()._meta(), "m": self.m, "ef_construction": self.ef_construction,
+                "ef_search": self.ef_search, "seed": self.seed, "entry_point": self._entry_point,
+                "levels": len(self._graph)}
+
+    def _arrays(self):
+        arrays = super()._arrays()
+        for level, layer in enumerate(self._graph):
+            nodes = sorted(layer)
+            arrays[f"level{level}_nodes"] = np.array(nodes, dtype=np.int64)
+            arrays[f"level{level}_offsets"] = np.cumsum([0] + [len(layer[n]) for n in nodes])
+            arrays[f"level{level}_links"] = np.array(
+                [link for n in nodes for link in layer[n]], dtype=np.int64
+            )
+        return arrays
+
+    def _restore(self, arrays):
+        super()._restore(arrays)
+        meta = json.loads(str(arrays["meta"]))
+        self._entry_point = meta["entry_point"]
+        self._graph = []
+        for level in range(meta["levels"]):
+            nodes = arrays[f"level{level}_nodes"].tolist()
+            offsets = arrays[f"level{level}_offsets"]
+            links = arrays[f"level{level}_links"]
+            self._graph.append({
+                node: links[offsets[i]:offsets[i + 1]].tolist() for i, node in enumerate(nodes)
+            })
+
+
+INDEX_TYPES = {index_type.kind: index_type for index_type in (ExactIndex, IVFFlatIndex, HNSWIndex)}
+
+
+def load_index(path):
+    """Loads an index saved with ANNIndex.save() or QuantizedIndex.save()."""
+    with np.load(path, allow_pickle=False) as arrays:
+        arrays = dict(arrays)
+    meta = json.loads(str(arrays["meta"]))
+    kind = meta.pop("kind")
+    if kind == "quantized":
+        from quantization import QuantizedIndex
+        return QuantizedIndex.load(path)
+    params = {key: value for key, value in meta.items() if key not in ("entry_point", "levels")}
+    index = INDEX_TYPES[kind](**params)
+    index._restore(arrays)
+    return index
+
+
+def recall_at_k(index, vectors, queries, k=10):
+    """
+    Measures how many of the exact k nearest neighbours the index returns.
+
+    Returns:
+        dict: Mean recall@k and mean / p95 query latency in milliseconds.
+    """
+    exact = ExactIndex(index.dim, metric=index.metric)
+    exact.add(vectors, ids=range(len(vectors)))
+    recalls = []
+    latencies = []
+    for query in queries:
+        expected, _ = exact.search(query, k)
+        started = time.perf_counter()
+        found, _ = index.search(query, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(set(expected) & set(found)) / len(expected))
+    return {
+        "recall": float(np.mean(recalls)),
+        "mean_ms": float(np.mean(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+if __name__ == "__main__":
+    # Recall@k benchmark against exact search on clustered synthetic embeddings
+    rng = np.random.default_rng(42)
+    n, dim, k = 20_000, 64, 10
+    centers = rng.normal(size=(200, dim)).astype(np.float32)
+    data = (centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+    queries = data[rng.choice(n, 100, replace=False)] + 0.05 * rng.normal(size=(100, dim)).astype(np.float32)
+
+    exact_index = ExactIndex(dim)
+    exact_index.add(data)
+    print(f"exact              : {recall_at_k(exact_index, data, queries, k)}")
+
+    started = time.perf_counter()
+    ivf = IVFFlatIndex(dim, n_lists=int(math.sqrt(n))).build(data, ids=range(n))
+    print(f"IVF-flat built in {time.perf_counter() - started:.1f}s")
+    for n_probe in (1, 4, 16):
+        ivf.n_probe = n_probe
+        print(f"ivf n_probe={n_probe:<3}    : {recall_at_k(ivf, data, queries, k)}")
+
+    hnsw_n = 5_000
+    started = time.perf_counter()
+    hnsw = HNSWIndex(dim, m=12, ef_construction=64).build(data[:hnsw_n], ids=range(hnsw_n))
+    print(f"HNSW built over {hnsw_n} vectors in {time.perf_counter() - started:.1f}s")
+    for ef_search in (16, 64, 128):
+        hnsw.ef_search = ef_search
+        print(f"hnsw ef_search={ef_search:<4}: {recall_at_k(hnsw, data[:hnsw_n], queries, k)}")
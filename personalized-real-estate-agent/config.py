@@ -6,3 +6,28 @@ load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+
+# Optional on-disk embedding cache shared by the HomeMatch database and scripts
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+# Optional SQLite cache of personalized descriptions, shareable across worker processes
+PERSONALIZATION_CACHE_PATH = os.getenv("PERSONALIZATION_CACHE_PATH")
+PERSONALIZATION_CACHE_TTL = float(os.getenv("PERSONALIZATION_CACHE_TTL", str(24 * 60 * 60)))
+
+# Optional approximate nearest neighbour index (see ann_index.py) loaded by HomeMatchDB
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH")
+
+# Query encoder runtime: "torch", or "onnx" / "openvino" for faster CPU inference;
+# EMBEDDING_ONNX_FILE selects e.g. a quantized model such as "onnx/model_qint8_avx512_vnni.onnx"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE")
+
+# Optional cross-encoder re-ranking of search results (see reranker.py)
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "250"))
+
+# Pipeline timing spans and counters (see metrics.py); METRICS_JSON_LOG appends one JSON line per span
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+METRICS_JSON_LOG = os.getenv("METRICS_JSON_LOG")
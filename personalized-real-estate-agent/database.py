@@ -1,19 +1,240 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
-import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ann_index import INDEX_TYPES, load_index
+from config import (
+    ANN_INDEX_PATH, EMBEDDING_BACKEND, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_ONNX_FILE,
+)
+from embedding_cache import EmbeddingCache
+from listing_filters import NumericFieldIndex
+from listing_io import bounded_prefetch, iter_listings
+from listing_utils import listing_content_hash, validate_listing
+from metrics import metrics
+from quantization import QUANTIZER_TYPES, QuantizedIndex
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Models loaded by this process, kept warm for every later HomeMatchDB
+_warm_models = {}
+
+
+def __getattr__(name):
+    # sentence-transformers pulls in torch and transformers, which take seconds to
+    # import; it is only imported when a model is actually needed
+    if name == "SentenceTransformer":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load_embedding_model(model_name=EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND, onnx_file=EMBEDDING_ONNX_FILE):
+    """
+    Returns the sentence-transformers model, loading it at most once per process.
+
+    Args:
+        model_name (str): The sentence-transformers model to load.
+        backend (str): "torch", or "onnx" / "openvino" for the lighter CPU
+            runtimes (needs ``pip install sentence-transformers[onnx]``).
+        onnx_file (str): Optional model file inside the repository, such as
+            "onnx/model_qint8_avx512_vnni.onnx" for a quantized model.
+
+    Returns:
+        SentenceTransformer: The loaded model.
+    """
+    model_class = getattr(sys.modules[__name__], "SentenceTransformer")
+    key = (model_class, model_name, backend, onnx_file)
+    if key not in _warm_models:
+        kwargs = {}
+        if backend != "torch":
+            kwargs["backend"] = backend
+            if onnx_file:
+                kwargs["model_kwargs"] = {"file_name": onnx_file}
+        _warm_models[key] = model_class(model_name, **kwargs)
+    return _warm_models[key]
+
+
+def embedding_model_key(model_name=EMBEDDING_MODEL_NAME, backend=EMBEDDING_BACKEND, onnx_file=EMBEDDING_ONNX_FILE):
+    """Name under which embeddings are cached; quantized backends don't share torch's vectors."""
+    if backend == "torch":
+        return model_name
+    return ":".join(part for part in (model_name, backend, onnx_file) if part)
+
+
+class IngestStats:
+    """Progress and throughput counters for a streaming ingestion run."""
+
+    def __init__(self, total=None):
+        self.total = total
+        self.listings = 0
+        self.chunks = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.embed_seconds = 0.0
+        self.upsert_seconds = 0.0
+        self.started_at = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    @property
+    def throughput(self):
+        """Listings ingested per second of wall-clock time."""
+        elapsed = self.elapsed
+        return self.listings / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "listings": self.listings,
+            "chunks": self.chunks,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "embed_seconds": round(self.embed_seconds, 3),
+            "upsert_seconds": round(self.upsert_seconds, 3),
+            "listings_per_second": round(self.throughput, 1),
+        }
+
+    def __str__(self):
+        total = f"/{self.total}" if self.total is not None else ""
+        return (f"Ingested {self.listings}{total} listings in {self.chunks} chunks "
+                f"({self.throughput:.1f} listings/s, embed {self.embed_seconds:.1f}s, "
+                f"upsert {self.upsert_seconds:.1f}s)")
+
+
+def _iter_chunks(items, chunk_size):
+    """Yields (offset, chunk) pairs of at most chunk_size consecutive items."""
+    chunk = []
+    offset = 0
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield offset, chunk
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        yield offset, chunk
+
 
 class HomeMatchDB:
-    def __init__(self, path="./chroma_db"):
-        self.client = chromadb.PersistentClient(path=path)
-        self.collection = self.client.get_or_create_collection(name="real_estate_listings")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    # Filtered searches with at most this many candidates are ranked exactly in NumPy
+    EXACT_SEARCH_THRESHOLD = 5000
+
+    def __init__(self, path="./chroma_db", embedding_cache=None, ann_index=None):
+        # The ChromaDB client and the encoder are created on first use, so runs that
+        # only need one of them don't pay for the other
+        self.path = path
+        self._client = None
+        self._collection = None
+        self._model = None
+        self.model_key = embedding_model_key()
+        if embedding_cache is None and EMBEDDING_CACHE_PATH:
+            embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+        self.embedding_cache = embedding_cache
+        # File the ANN index is loaded from or saved to; re-saved whenever this instance changes the index.
+        # Like the model, an index at ANN_INDEX_PATH is only read when first needed
+        self._ann_index = None
+        self._ann_index_pending = ann_index is None and bool(ANN_INDEX_PATH)
+        self.ann_index_path = ANN_INDEX_PATH if self._ann_index_pending else None
+        if ann_index is not None:
+            self.ann_index = ann_index
+        self._numeric_index = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import chromadb
+            self._client = chromadb.PersistentClient(path=self.path)
+        return self._client
 
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = self.client.get_or_create_collection(name="real_estate_listings")
+        return self._collection
+
+    @property
+    def ann_index(self):
+        """Optional approximate index answering unfiltered searches instead of ChromaDB."""
+        if self._ann_index_pending:
+            self._ann_index_pending = False
+            if os.path.exists(self.ann_index_path):
+                self.ann_index = load_index(self.ann_index_path)
+        return self._ann_index
+
+    @ann_index.setter
+    def ann_index(self, index):
+        if isinstance(index, QuantizedIndex) and index.exact_vectors is None:
+            index.exact_vectors = self._embeddings_for
+        self._ann_index = index
+        self._ann_index_pending = False
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_embedding_model()
+        return self._model
+
+    def warm_up(self):
+        """Loads the encoder and opens the collection up front, e.g. when a long-lived process starts."""
+        self.model.encode(["warm up"])
+        self.collection.count()
+        return self
+
+    def close(self):
+        """Persists any pending embedding cache entries."""
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+
+    def _save_ann_index(self):
+        """Writes the ANN index back to ann_index_path, so the next process doesn't load a stale copy."""
+        if self.ann_index is None or not self.ann_index_path:
+            return
+        # Write next to the target and swap it in, so a crash mid-save never leaves a truncated index
+        temporary_path = f"{self.ann_index_path}.tmp.npz"
+        self.ann_index.save(temporary_path)
+        os.replace(temporary_path, self.ann_index_path)
+
+    def _cached_embeddings(self, texts, encode):
+        cache = self.embedding_cache
+        hits, misses = cache.hits, cache.misses
+        embeddings = cache.get_or_compute(self.model_key, texts, encode)
+        metrics.record_cache("embedding", cache.hits - hits, cache.misses - misses)
+        return embeddings
+
+    @metrics.timed("embedding", kind="query")
     def _generate_embedding(self, text):
+        if self.embedding_cache is not None:
+            return self._cached_embeddings([text], self.model.encode)[0].tolist()
         return self.model.encode(text).tolist()
 
+    @metrics.timed("embedding", kind="query")
+    def _generate_embeddings(self, texts):
+        """Embeds several texts in one encoder batch, via the embedding cache if there is one."""
+        if self.embedding_cache is not None:
+            return self._cached_embeddings(texts, self.model.encode)
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+    @staticmethod
+    def _build_document(listing):
+        # Create a document string for embedding
+        document_text = f"Neighborhood: {listing['neighborhood']}\n"
+        document_text += f"Price: ${listing['price']}\n"
+        document_text += f"Bedrooms: {listing['bedrooms']}\n"
+        document_text += f"Bathrooms: {listing['bathrooms']}\n"
+        document_text += f"House Size: {listing['house_size']} sqft\n"
+        document_text += f"Description: {listing['description']}\n"
+        document_text += f"Neighborhood Description: {listing['neighborhood_description']}"
+        return document_text
+
     def add_listings(self, listings_file="listings.json"):
-        with open(listings_file, "r") as f:
-            listings = json.load(f)
+        listings = list(iter_listings(listings_file))
 
         documents = []
         metadatas = []
@@ -23,16 +244,7 @@ class HomeMatchDB:
             # Create a unique ID for each listing
             listing_id = f"listing_{i}"
             ids.append(listing_id)
-
-            # Create a document string for embedding
-            document_text = f"Neighborhood: {listing['neighborhood']}\n"
-            document_text += f"Price: ${listing['price']}\n"
-            document_text += f"Bedrooms: {listing['bedrooms']}\n"
-            document_text += f"Bathrooms: {listing['bathrooms']}\n"
-            document_text += f"House Size: {listing['house_size']} sqft\n"
-            document_text += f"Description: {listing['description']}\n"
-            document_text += f"Neighborhood Description: {listing['neighborhood_description']}"
-            documents.append(document_text)
+            documents.append(self._build_document(listing))
 
             # Store original listing data as metadata
             metadatas.append(listing)
@@ -44,20 +256,480 @@ class HomeMatchDB:
             metadatas=metadatas,
             ids=ids
         )
+        self._numeric_index = None
+        if self.ann_index is not None and ids:
+            # ChromaDB embedded the documents itself, so read the vectors back for the index
+            records = self.collection.get(ids=ids, include=['embeddings'])
+            self.ann_index.add(np.asarray(records['embeddings'], dtype=np.float32), ids=records['ids'])
+            self._save_ann_index()
         print(f"Added {len(listings)} listings to ChromaDB.")
 
-    def search_listings(self, query, n_results=5):
-        query_embedding = self._generate_embedding(query)
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            include=['documents', 'metadatas']
+    @metrics.timed("embedding", kind="documents")
+    def _encode_documents(self, documents, batch_size, pool=None):
+        def encode(texts):
+            if pool is not None:
+                return self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+            return self.model.encode(texts, batch_size=batch_size)
+
+        if self.embedding_cache is not None:
+            embeddings = self._cached_embeddings(documents, encode)
+        else:
+            embeddings = encode(documents)
+        return [embedding.tolist() for embedding in embeddings]
+
+    def ingest_listings(self, listings_file="listings.json", chunk_size=1000, batch_size=64,
+                        num_workers=None, progress=True, prefetch_chunks=2):
+        """
+        Streams listings into the collection chunk by chunk.
+
+        The file is parsed incrementally (see listing_io.iter_listings) and each
+        listing validated; listings that don't match the schema are skipped.
+        Parsing and document building run on a background thread at most
+        ``prefetch_chunks`` chunks ahead of the encoder, so memory stays bounded
+        by the chunk size rather than the file size. Each chunk is encoded with
+        the already-loaded SentenceTransformer, fanned out over a pool of worker
+        processes, and upserted together with its embeddings, so ChromaDB never
+        has to run its own single-threaded embedder.
+
+        Args:
+            listings_file (str): Path to a JSON array or JSONL / NDJSON file of
+                listings, optionally gzip-compressed.
+            chunk_size (int): Number of listings encoded and upserted per chunk.
+            batch_size (int): Encoder batch size used inside each worker.
+            num_workers (int): Encoder processes to start. Defaults to the CPU
+                count; 1 encodes in-process without starting a pool.
+            progress (bool): Print the running counters after every chunk.
+            prefetch_chunks (int): Parsed chunks allowed to wait for the encoder.
+
+        Returns:
+            IngestStats: Progress and throughput counters for the run.
+        """
+        stats = IngestStats()
+        records = (
+            (f"listing_{i}", listing, listing)
+            for i, listing in self._validated_listings(listings_file, stats)
         )
+        self._upsert_records(records, stats, chunk_size, batch_size, num_workers, progress, prefetch_chunks)
+        return stats
+
+    @staticmethod
+    def _validated_listings(listings_file, stats=None):
+        """Yields (position in file, listing) for every listing that passes validate_listing."""
+        for i, listing in enumerate(iter_listings(listings_file)):
+            validated = validate_listing(listing)
+            if validated is None:
+                if stats is not None:
+                    stats.skipped += 1
+                continue
+            yield i, {**listing, **validated}
+
+    def sync_listings(self, listings_file="listings.json", chunk_size=1000, batch_size=64,
+                      num_workers=None, progress=True, prefetch_chunks=2):
+        """
+        Incrementally syncs the collection with a listings file.
+
+        Every listing is keyed by its content hash, which is also stored in its
+        metadata as ``content_hash``. Only listings that are new or changed are
+        embedded and upserted; listings that are no longer in the file (including
+        position-keyed ones from add_listings or ingest_listings) are deleted.
+
+        The file is streamed twice: once to collect the content hashes, and once
+        to embed the listings that changed, so only the hashes are held in memory.
+
+        Args:
+            listings_file (str): Path to a JSON array or JSONL / NDJSON file of
+                listings, optionally gzip-compressed.
+            chunk_size (int): Number of listings encoded and upserted per chunk.
+            batch_size (int): Encoder batch size used inside each worker.
+            num_workers (int): Encoder processes to start, see ingest_listings.
+            progress (bool): Print the running counters after every chunk.
+            prefetch_chunks (int): Parsed chunks allowed to wait for the encoder.
+
+        Returns:
+            IngestStats: Counters for the run; ``listings`` counts the embedded
+            listings, ``unchanged`` and ``deleted`` the rest of the diff.
+        """
+        stats = IngestStats()
+        current = {
+            listing_content_hash(listing) for _, listing in self._validated_listings(listings_file, stats)
+        }
+        existing = set(self.collection.get(include=[])["ids"])
+
+        changed = current - existing
+        stale = [listing_id for listing_id in existing if listing_id not in current]
+        stats.total = len(changed)
+        stats.unchanged = len(current) - len(changed)
+
+        def changed_records():
+            emitted = set()
+            for _, listing in self._validated_listings(listings_file):
+                content_hash = listing_content_hash(listing)
+                if content_hash in changed and content_hash not in emitted:
+                    emitted.add(content_hash)
+                    yield content_hash, listing, {**listing, "content_hash": content_hash}
+
+        self._upsert_records(changed_records(), stats, chunk_size, batch_size, num_workers, progress,
+                             prefetch_chunks)
+
+        for _, stale_chunk in _iter_chunks(stale, chunk_size):
+            self.collection.delete(ids=stale_chunk)
+            self._numeric_index = None
+            if self.ann_index is not None:
+                self.ann_index.remove(stale_chunk)
+            stats.deleted += len(stale_chunk)
+        if stale:
+            self._save_ann_index()
+        if progress:
+            print(f"Sync complete: {stats.listings} embedded, {stats.unchanged} unchanged, "
+                  f"{stats.deleted} deleted.")
+        return stats
+
+    def _upsert_records(self, records, stats, chunk_size, batch_size, num_workers, progress,
+                        prefetch_chunks=2):
+        """Embeds and upserts (id, listing, metadata) records chunk by chunk."""
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+
+        # Parsing, validation and document building run ahead on a background thread
+        prepared = (
+            (
+                [listing_id for listing_id, _, _ in chunk],
+                [self._build_document(listing) for _, listing, _ in chunk],
+                [metadata for _, _, metadata in chunk],
+            )
+            for _, chunk in _iter_chunks(records, chunk_size)
+        )
+        pool = None
+        chunks_before = stats.chunks
+        try:
+            for ids, documents, metadatas in bounded_prefetch(prepared, max_pending=prefetch_chunks):
+                if pool is None and num_workers > 1:
+                    pool = self.model.start_multi_process_pool(target_devices=["cpu"] * num_workers)
+
+                started = time.perf_counter()
+                embeddings = self._encode_documents(documents, batch_size, pool)
+                stats.embed_seconds += time.perf_counter() - started
+
+                started = time.perf_counter()
+                self.collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas
+                )
+                self._numeric_index = None
+                if self.ann_index is not None:
+                    self.ann_index.add(embeddings, ids=ids)
+                stats.upsert_seconds += time.perf_counter() - started
+
+                stats.listings += len(ids)
+                stats.chunks += 1
+                if progress:
+                    print(stats)
+        finally:
+            if pool is not None:
+                self.model.stop_multi_process_pool(pool)
+            if stats.chunks > chunks_before:
+                self._save_ann_index()
+            if self.embedding_cache is not None:
+                self.embedding_cache.flush()
+
+    def numeric_index(self):
+        """
+        Returns the columnar index over the numeric listing fields.
+
+        The index is built on first use and rebuilt after this instance writes to
+        the collection; call refresh_numeric_index() if another process did.
+        """
+        if self._numeric_index is None:
+            records = self.collection.get(include=['metadatas'])
+            self._numeric_index = NumericFieldIndex(records['ids'], records['metadatas'])
+        return self._numeric_index
+
+    def refresh_numeric_index(self):
+        self._numeric_index = None
+
+    def build_ann_index(self, kind="hnsw", path=None, **params):
+        """
+        Builds an approximate nearest neighbour index over the collection's embeddings.
+
+        Once built, unfiltered searches are answered by the index; later
+        add/ingest/sync runs through this instance keep it up to date, and
+        re-save it when it was saved to (or loaded from) a file.
+
+        Args:
+            kind (str): "hnsw", "ivf" or "exact", see ann_index.py.
+            path (str): Optional .npz file to save the index to, e.g. ANN_INDEX_PATH
+                so that later HomeMatchDB instances load it on startup.
+            **params: Index parameters such as m / ef_search or n_lists / n_probe.
+
+        Returns:
+            ANNIndex: The new index.
+
+        Raises:
+            ValueError: For kind="ivf" on an empty collection, since the IVF
+                cells are trained on the embeddings already stored.
+        """
+        records = self.collection.get(include=['embeddings'])
+        embeddings = np.asarray(records['embeddings'], dtype=np.float32)
+        if kind == "ivf" and not len(embeddings):
+            raise ValueError("An IVF index is trained on the stored embeddings, but the collection is empty; "
+                             "ingest listings first or use kind=\"hnsw\", which builds incrementally")
+        if len(embeddings):
+            dim = embeddings.shape[1]
+        else:
+            dim = self.model.get_sentence_embedding_dimension()
+        # Squared L2, like ChromaDB's default space, so distances stay comparable
+        index = INDEX_TYPES[kind](dim, metric="l2", **params)
+        if kind == "ivf":
+            index.train(embeddings)
+        if len(embeddings):
+            index.add(embeddings, ids=records['ids'])
+        self.ann_index = index
+        self.ann_index_path = path
+        self._save_ann_index()
+        return index
+
+    def build_quantized_index(self, quantizer="sq8", rerank=50, path=None, **params):
+        """
+        Builds a compressed index over the collection's embeddings.
+
+        Only int8 / product-quantized codes are kept in memory (4x to 32x+
+        smaller than float32); the ``rerank`` best candidates of each search
+        are re-scored with their exact embeddings read back from ChromaDB.
+        Like build_ann_index, the result answers unfiltered searches.
+
+        Args:
+            quantizer (str): "sq8" for scalar int8, or "pq" for product quantization.
+            rerank (int): Candidates re-scored exactly per search; 0 disables it.
+            path (str): Optional .npz file to save the index to.
+            **params: Quantizer parameters, e.g. n_subvectors for "pq".
+
+        Returns:
+            QuantizedIndex: The new index.
+        """
+        records = self.collection.get(include=['embeddings'])
+        embeddings = np.asarray(records['embeddings'], dtype=np.float32)
+        if len(embeddings):
+            dim = embeddings.shape[1]
+        else:
+            dim = self.model.get_sentence_embedding_dimension()
+        index = QuantizedIndex(QUANTIZER_TYPES[quantizer](dim, **params), metric="l2",
+                               rerank=rerank, exact_vectors=self._embeddings_for)
+        if len(embeddings):
+            index.build(embeddings, ids=records['ids'])
+        self.ann_index = index
+        self.ann_index_path = path
+        self._save_ann_index()
+        return index
+
+    def _embeddings_for(self, ids):
+        """
+        Returns the stored embeddings of the given listing IDs, in the same order.
+
+        IDs deleted from the collection since the index was saved get a row of
+        NaN, which QuantizedIndex drops from its re-ranked results.
+        """
+        records = self.collection.get(ids=list(ids), include=['embeddings'])
+        by_id = dict(zip(records['ids'], records['embeddings']))
+        embeddings = np.full((len(ids), self.ann_index.dim), np.nan, dtype=np.float32)
+        for row, listing_id in enumerate(ids):
+            if listing_id in by_id:
+                embeddings[row] = by_id[listing_id]
+        return embeddings
+
+    def _search_ann(self, query_embedding, n_results):
+        ids, distances = self.ann_index.search(query_embedding, n_results)
+        results = {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        if ids:
+            records = self.collection.get(ids=ids, include=['documents', 'metadatas'])
+            by_id = {listing_id: i for i, listing_id in enumerate(records['ids'])}
+            # Skip IDs deleted from the collection since the index was saved, e.g. by another process
+            for listing_id, distance in zip(ids, distances.tolist()):
+                if listing_id in by_id:
+                    results['ids'][0].append(listing_id)
+                    results['documents'][0].append(records['documents'][by_id[listing_id]])
+                    results['metadatas'][0].append(records['metadatas'][by_id[listing_id]])
+                    results['distances'][0].append(distance)
+        return results
+
+    @metrics.timed("search")
+    def search_listings(self, query, n_results=5, filters=None):
+        """
+        Searches for the listings closest to a query.
+
+        Args:
+            query (str): Free-text description of what the buyer is looking for.
+            n_results (int): Maximum number of listings to return.
+            filters (ListingFilter): Optional numeric constraints. Listings that
+                don't satisfy them are excluded before the vector ranking; small
+                candidate sets are ranked exactly, larger ones by ChromaDB with
+                the equivalent ``where`` clause. Unfiltered searches go through
+                ann_index when one is set.
+
+        Returns:
+            dict: ChromaDB query results with ``ids``, ``documents``,
+            ``metadatas`` and ``distances`` for the single query.
+        """
+        return self._search_embedding(self._generate_embedding(query), n_results, filters)
+
+    @metrics.timed("search_batch")
+    def search_listings_batch(self, queries, n_results=5, filters=None):
+        """
+        Runs several searches with a single encoder call.
+
+        Unfiltered queries are also answered by a single ChromaDB query (or the
+        ANN index); filtered ones go through search_listings' candidate path
+        with their precomputed embedding.
+
+        Args:
+            queries (list): Free-text queries.
+            n_results (int): Maximum number of listings per query.
+            filters (list): Optional ListingFilter (or None) per query.
+
+        Returns:
+            list: One result dictionary per query, shaped like search_listings'.
+        """
+        if not queries:
+            return []
+        filters = filters or [None] * len(queries)
+        embeddings = self._generate_embeddings(list(queries))
+        results = [None] * len(queries)
+        unfiltered = [i for i, listing_filter in enumerate(filters) if not listing_filter]
+        if unfiltered and self.ann_index is None:
+            with metrics.span("vector_query", backend="chroma"):
+                batch = self.collection.query(
+                    query_embeddings=np.asarray(embeddings, dtype=np.float32)[unfiltered].tolist(),
+                    n_results=n_results,
+                    include=['documents', 'metadatas', 'distances']
+                )
+            for row, i in enumerate(unfiltered):
+                results[i] = {key: [batch[key][row]] for key in ('ids', 'documents', 'metadatas', 'distances')}
+        for i, embedding in enumerate(embeddings):
+            if results[i] is None:
+                results[i] = self._search_embedding(np.asarray(embedding).tolist(), n_results, filters[i])
+        return results
+
+    def _search_embedding(self, query_embedding, n_results, filters):
+        if not filters and self.ann_index is not None:
+            with metrics.span("vector_query", backend="ann"):
+                return self._search_ann(query_embedding, n_results)
+        if not filters:
+            with metrics.span("vector_query", backend="chroma"):
+                return self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=n_results,
+                    include=['documents', 'metadatas', 'distances']
+                )
+
+        candidate_ids = self.numeric_index().candidate_ids(filters)
+        if len(candidate_ids) <= self.EXACT_SEARCH_THRESHOLD:
+            with metrics.span("vector_query", backend="exact"):
+                return self._rank_candidates(query_embedding, candidate_ids, n_results)
+        with metrics.span("vector_query", backend="chroma"):
+            return self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=filters.to_where(),
+                include=['documents', 'metadatas', 'distances']
+            )
+
+    @metrics.timed("search_by_preferences")
+    def search_by_preferences(self, preferences, n_results=5, filters=None, candidates_per_facet=20):
+        """
+        Searches with structured preferences instead of one long query string.
+
+        Hard constraints narrow the candidate set first. Each soft-preference facet
+        is embedded on its own (once per facet, then reused) and every candidate is
+        scored by the weighted mean of its cosine similarity to the facets.
+
+        Args:
+            preferences (BuyerPreferences): Output of PreferenceParser.extract_preferences().
+            n_results (int): Maximum number of listings to return.
+            filters (ListingFilter): Optional extra constraints; bounds set here
+                override the ones extracted from the preferences.
+            candidates_per_facet (int): When the filtered candidate set is too
+                large to score exhaustively, how many nearest neighbours of each
+                facet to collect as candidates.
+
+        Returns:
+            dict: Results in the same shape as search_listings, with ``distances``
+            holding one minus the combined facet similarity.
+        """
+        facets = [facet for facet in preferences.facets if facet.weight > 0]
+        if not facets:
+            return self.search_listings(preferences.query_string, n_results=n_results,
+                                        filters=preferences.filters.merged(filters))
+
+        pending = [facet for facet in facets if facet.embedding is None]
+        if pending:
+            for facet, embedding in zip(pending, self._generate_embeddings([f.text for f in pending])):
+                facet.embedding = np.asarray(embedding, dtype=np.float32)
+        facet_matrix = np.vstack([facet.embedding for facet in facets])
+        weights = np.array([facet.weight for facet in facets], dtype=np.float32)
+
+        listing_filter = preferences.filters.merged(filters)
+        include = ['embeddings', 'documents', 'metadatas']
+        candidate_ids = self.numeric_index().candidate_ids(listing_filter) if listing_filter else None
+        if candidate_ids is not None and len(candidate_ids) <= self.EXACT_SEARCH_THRESHOLD:
+            with metrics.span("vector_query", backend="chroma_get"):
+                candidates = self.collection.get(ids=candidate_ids, include=include) if candidate_ids else None
+        else:
+            # Too many candidates to score them all: pool each facet's nearest neighbours
+            with metrics.span("vector_query", backend="chroma"):
+                per_facet = self.collection.query(
+                    query_embeddings=facet_matrix.tolist(),
+                    n_results=max(n_results, candidates_per_facet),
+                    where=listing_filter.to_where() if listing_filter else None,
+                    include=include
+                )
+            candidates = {'ids': [], 'embeddings': [], 'documents': [], 'metadatas': []}
+            seen = set()
+            for f in range(len(facets)):
+                for i, listing_id in enumerate(per_facet['ids'][f]):
+                    if listing_id not in seen:
+                        seen.add(listing_id)
+                        for field in candidates:
+                            candidates[field].append(per_facet[field][f][i])
+
+        results = {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        if not candidates or not candidates['ids']:
+            return results
+
+        embeddings = np.asarray(candidates['embeddings'], dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        facet_matrix /= np.maximum(np.linalg.norm(facet_matrix, axis=1, keepdims=True), 1e-12)
+        scores = weights @ (facet_matrix @ embeddings.T) / weights.sum()
+
+        k = min(n_results, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results['ids'][0] = [candidates['ids'][i] for i in top]
+        results['documents'][0] = [candidates['documents'][i] for i in top]
+        results['metadatas'][0] = [candidates['metadatas'][i] for i in top]
+        results['distances'][0] = (1.0 - scores[top]).tolist()
+        return results
+
+    def _rank_candidates(self, query_embedding, candidate_ids, n_results):
+        """Ranks a small candidate set by exact squared L2 distance, like ChromaDB's default space."""
+        results = {'ids': [[]], 'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
+        if not candidate_ids:
+            return results
+        candidates = self.collection.get(ids=candidate_ids, include=['embeddings', 'documents', 'metadatas'])
+        embeddings = np.asarray(candidates['embeddings'], dtype=np.float32)
+        distances = ((embeddings - np.asarray(query_embedding, dtype=np.float32)) ** 2).sum(axis=1)
+        k = min(n_results, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        results['ids'][0] = [candidates['ids'][i] for i in top]
+        results['documents'][0] = [candidates['documents'][i] for i in top]
+        results['metadatas'][0] = [candidates['metadatas'][i] for i in top]
+        results['distances'][0] = distances[top].tolist()
         return results
 
 if __name__ == "__main__":
     db = HomeMatchDB()
-    db.add_listings()
+    db.ingest_listings()
 
     # Example search
     # query = "I am looking for a family home with a big backyard in a quiet neighborhood."
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text):
+    """Collapses runs of whitespace so trivially different strings share a cache entry."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Persistent, size-capped LRU cache of embeddings.
+
+    Entries are keyed by (model name, hash of the normalized text), so the same
+    cache directory can serve several models as long as they share a dimension.
+    Vectors live in a memory-mapped float32 matrix (``vectors.f32``) with one row
+    per slot, grown by doubling up to ``max_entries`` rows; ``index.json`` maps
+    keys to slots in least- to most-recently-used order. Lookups only touch the
+    rows they need. Index changes are appended to ``index.log`` on flush() or
+    close(), and folded back into ``index.json`` once the log outgrows the index.
+    A slot freed by an eviction is only reused once the eviction is on disk, so
+    a process that dies before flushing never leaves a key mapped to another
+    text's vector.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.json"
+    LOG_FILE = "index.log"
+    MIN_CAPACITY = 1024
+
+    def __init__(self, path, max_entries=100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.dim = None
+        self.capacity = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._free_slots = []
+        # Slots evicted since the last flush; the index on disk may still map their keys to them
+        self._evicted_slots = []
+        self._vectors = None
+        # Index changes since the last flush, as ["put", key, slot], ["touch", key],
+        # ["evict", key] and ["capacity", rows] records
+        self._changes = []
+        self._logged = 0
+        # Bumped on every index rewrite; the log starts with the generation it extends
+        self._generation = 0
+
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, self.INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.capacity = index["capacity"]
+            self._entries = OrderedDict((key, slot) for key, slot in index["entries"])
+            self._generation = index.get("generation", 0)
+            self._replay_log()
+            self._open_vectors()
+            used = set(self._entries.values())
+            self._free_slots = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+            self._evict_to(self.max_entries)
+
+    @staticmethod
+    def make_key(model_name, text):
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _open_vectors(self):
+        vectors_path = os.path.join(self.path, self.VECTORS_FILE)
+        size = self.capacity * self.dim * np.dtype(np.float32).itemsize
+        with open(vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self.capacity, self.dim))
+
+    def _replay_log(self):
+        log_path = os.path.join(self.path, self.LOG_FILE)
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "rb") as f:
+            lines = f.read().split(b"\n")
+        changes, intact = [], 0
+        # The last piece is whatever followed the final newline: empty, or a torn write
+        for line in lines[:-1]:
+            try:
+                changes.append(json.loads(line))
+            except ValueError:
+                # A write cut short by a crash; everything before it is intact
+                break
+            intact += len(line) + 1
+        if not changes or changes[0] != ["generation", self._generation]:
+            # Left over from before the index was last rewritten
+            os.remove(log_path)
+            return
+        if intact < os.path.getsize(log_path):
+            # Drop the torn tail so later appends start on a fresh line
+            os.truncate(log_path, intact)
+        self._logged = len(changes)
+        for change in changes:
+            if change[0] == "put":
+                self._entries[change[1]] = change[2]
+                self._entries.move_to_end(change[1])
+            elif change[0] == "touch" and change[1] in self._entries:
+                self._entries.move_to_end(change[1])
+            elif change[0] == "evict":
+                self._entries.pop(change[1], None)
+            elif change[0] == "capacity":
+                self.capacity = max(self.capacity, change[1])
+
+    def _ensure_capacity(self, dim):
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} does not match cache dimension {self.dim}")
+        if self._free_slots or self.capacity >= self.max_entries:
+            return
+        capacity = min(self.max_entries, max(2 * self.capacity, self.MIN_CAPACITY))
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        self._free_slots = list(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+        self._changes.append(["capacity", capacity])
+        self._open_vectors()
+
+    def _evict_to(self, size):
+        while len(self._entries) > size:
+            key, slot = self._entries.popitem(last=False)
+            self._evicted_slots.append(slot)
+            self._changes.append(["evict", key])
+
+    def get(self, model_name, text):
+        """Returns the cached embedding as a float32 array, or None on a miss."""
+        key = self.make_key(model_name, text)
+        slot = self._entries.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._changes.append(["touch", key])
+        self.hits += 1
+        return np.array(self._vectors[slot])
+
+    def put(self, model_name, text, embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        self._ensure_capacity(embedding.shape[0])
+        key = self.make_key(model_name, text)
+        slot = self._entries.get(key)
+        if slot is None:
+            self._evict_to(self.max_entries - 1)
+            if not self._free_slots:
+                # Record the evictions before their slots get overwritten
+                self._write_index_changes()
+            slot = self._free_slots.pop()
+        self._vectors[slot] = embedding
+        self._entries[key] = slot
+        self._entries.move_to_end(key)
+        self._changes.append(["put", key, slot])
+
+    def get_or_compute(self, model_name, texts, compute_fn, batch_size=None):
+        """
+        Returns embeddings for texts, computing and caching only the misses.
+
+        Args:
+            model_name (str): Name of the model that produces the embeddings.
+            texts (list): The texts to embed.
+            compute_fn (callable): Takes a list of texts and returns one
+                embedding per text. Only called with texts that missed.
+            batch_size (int): If set, misses are passed to compute_fn in
+                batches of at most this many texts.
+
+        Returns:
+            numpy.ndarray: A (len(texts), dim) float32 matrix.
+        """
+        results = [self.get(model_name, text) for text in texts]
+
+        missing = OrderedDict()
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                missing.setdefault(self.make_key(model_name, text), []).append(i)
+
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            step = batch_size or len(miss_texts)
+            computed = []
+            for start in range(0, len(miss_texts), step):
+                computed.extend(compute_fn(miss_texts[start:start + step]))
+            for text, positions, embedding in zip(miss_texts, missing.values(), computed):
+                embedding = np.asarray(embedding, dtype=np.float32)
+                self.put(model_name, text, embedding)
+                for i in positions:
+                    results[i] = embedding
+
+        if not results:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.vstack(results)
+
+    def flush(self):
+        """
+        Writes dirty vectors and the index changes back to disk.
+
+        Changes are appended to the log; the whole index is only rewritten
+        when there is none on disk yet or the log has grown longer than it.
+        """
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._write_index_changes()
+
+    def _write_index_changes(self):
+        """Appends the pending index changes to the log (or rewrites the index), then frees evicted slots."""
+        if not self._changes or self.dim is None:
+            self._release_evicted_slots()
+            return
+        index_path = os.path.join(self.path, self.INDEX_FILE)
+        log_path = os.path.join(self.path, self.LOG_FILE)
+        if not os.path.exists(index_path) or self._logged + len(self._changes) > max(len(self._entries), 64):
+            self._generation += 1
+            index = {
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "generation": self._generation,
+                "entries": list(self._entries.items()),
+            }
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
+            if os.path.exists(log_path):
+                os.remove(log_path)
+            self._logged = 0
+        else:
+            if not self._logged:
+                self._changes.insert(0, ["generation", self._generation])
+            with open(log_path, "a") as f:
+                f.writelines(json.dumps(change) + "\n" for change in self._changes)
+            self._logged += len(self._changes)
+        self._changes = []
+        self._release_evicted_slots()
+
+    def _release_evicted_slots(self):
+        self._free_slots.extend(self._evicted_slots)
+        self._evicted_slots = []
+
+    def close(self):
+        self.flush()
+        self._vectors = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    # Example usage with a stand-in encoder
+    def slow_encode(texts):
+        time.sleep(0.01 * len(texts))
+        return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with EmbeddingCache(cache_dir, max_entries=2) as cache:
+            cache.get_or_compute("demo-model", ["a quiet street", "a  quiet street", "downtown loft"], slow_encode)
+            cache.get_or_compute("demo-model", ["a quiet street"], slow_encode)
+        reopened = EmbeddingCache(cache_dir, max_entries=2)
+        print(f"Entries after reopening: {len(reopened)}")
+        print(f"Cached vector: {reopened.get('demo-model', 'a quiet street')}")
@@ -0,0 +1,265 @@
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def default_responder(messages):
+    return f"Personalized: {messages[-1]['content'].strip()[:80]}"
+
+
+def _usage(messages, content):
+    # Word counts stand in for token counts, enough to exercise usage tracking
+    prompt_tokens = sum(len(message.get("content", "").split()) for message in messages)
+    completion_tokens = len(content.split())
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+_token_buckets = {}
+
+
+def hashing_embeddings(texts, dim=1536):
+    """
+    Deterministic bag-of-words embeddings for offline tests and benchmarks.
+
+    Every word is hashed to a signed bucket, so texts sharing words are close
+    in cosine distance and search results stay meaningful without a model.
+
+    Args:
+        texts (list): Texts to embed.
+        dim (int): Embedding dimension.
+
+    Returns:
+        np.ndarray: A (len(texts), dim) float32 matrix of unit-length rows.
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            bucket = _token_buckets.get((word, dim))
+            if bucket is None:
+                digest = zlib.crc32(word.encode("utf-8"))
+                bucket = _token_buckets[(word, dim)] = (digest % dim, 1.0 if digest >> 31 else -1.0)
+            matrix[row, bucket[0]] += bucket[1]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class FakeOpenAIServer:
+    """
+    A local, OpenAI-compatible API server for tests and benchmarks.
+
+    Answers chat completions, legacy completions and embeddings (see
+    hashing_embeddings).
+
+    Point ``openai.api_base`` (or ``OPENAI_API_BASE``) at ``server.api_base`` to
+    exercise the real client code without network access or API spend.
+
+    Args:
+        latency (float or callable): Seconds to wait before answering. A callable
+            receives the request's messages and returns the delay.
+        responder (callable): Maps the request's messages to the reply content.
+        fail_first (int): Number of initial requests answered with HTTP 429.
+        retry_after (float): Value of the Retry-After header sent with a 429.
+        stream_chunk_delay (float): Seconds between chunks of a streamed reply.
+        fail_stream_after (int): If set, streamed replies send an error event
+            after this many content chunks.
+        embedding_latency (float): Seconds to wait before answering an
+            embeddings request.
+        embedding_dim (int): Dimension of the returned embeddings.
+    """
+
+    def __init__(self, latency=0.0, responder=default_responder, fail_first=0, retry_after=0,
+                 stream_chunk_delay=0.0, fail_stream_after=None, embedding_latency=0.0, embedding_dim=1536):
+        self.latency = latency
+        self.responder = responder
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.stream_chunk_delay = stream_chunk_delay
+        self.fail_stream_after = fail_stream_after
+        self.embedding_latency = embedding_latency
+        self.embedding_dim = embedding_dim
+        self.requests = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def api_base(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def _delay(self, messages):
+        return self.latency(messages) if callable(self.latency) else self.latency
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    request_number = server.requests
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    if request_number <= server.fail_first:
+                        self._send_json(
+                            429,
+                            {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            headers={"Retry-After": str(server.retry_after)},
+                        )
+                        return
+                    if self.path.endswith("/chat/completions"):
+                        self._chat_completion(request)
+                    elif self.path.endswith("/completions"):
+                        self._completion(request)
+                    elif self.path.endswith("/embeddings"):
+                        self._embeddings(request)
+                    else:
+                        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def _send_event(self, payload):
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def _stream_chat_completion(self, request, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                # Stream word by word, keeping the separating whitespace with each word
+                pieces = [piece + " " for piece in content.split(" ")]
+                pieces[-1] = pieces[-1][:-1]
+                for i, piece in enumerate(pieces):
+                    if server.fail_stream_after is not None and i == server.fail_stream_after:
+                        self._send_event({"error": {"message": "Stream interrupted", "type": "server_error"}})
+                        return
+                    if i:
+                        time.sleep(server.stream_chunk_delay)
+                    self._send_event({
+                        "id": f"chatcmpl-fake-{server.requests}",
+                        "object": "chat.completion.chunk",
+                        "model": request.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                    })
+                self._send_event({
+                    "id": f"chatcmpl-fake-{server.requests}",
+                    "object": "chat.completion.chunk",
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                })
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def _chat_completion(self, request):
+                messages = request.get("messages", [])
+                time.sleep(server._delay(messages))
+                content = server.responder(messages)
+                if request.get("stream"):
+                    self._stream_chat_completion(request, content)
+                    return
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{server.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": _usage(messages, content),
+                })
+
+            def _completion(self, request):
+                prompt = request.get("prompt", "")
+                messages = [{"role": "user", "content": prompt if isinstance(prompt, str) else prompt[0]}]
+                time.sleep(server._delay(messages))
+                text = server.responder(messages)
+                self._send_json(200, {
+                    "id": f"cmpl-fake-{server.requests}",
+                    "object": "text_completion",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "text": text, "finish_reason": "stop"}],
+                    "usage": _usage(messages, text),
+                })
+
+            def _embeddings(self, request):
+                texts = request.get("input", [])
+                if isinstance(texts, str):
+                    texts = [texts]
+                time.sleep(server.embedding_latency)
+                embeddings = hashing_embeddings(texts, server.embedding_dim)
+                self._send_json(200, {
+                    "object": "list",
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": embedding.tolist()}
+                        for i, embedding in enumerate(embeddings)
+                    ],
+                    "model": request.get("model") or request.get("engine"),
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Run a fake OpenAI-compatible API server.")
+    arg_parser.add_argument("--latency", type=float, default=0.5, help="Seconds to wait per request.")
+    arg_parser.add_argument("--embedding-latency", type=float, default=0.05,
+                            help="Seconds to wait per embeddings request.")
+    arg_parser.add_argument("--embedding-dim", type=int, default=1536)
+    args = arg_parser.parse_args()
+
+    fake_server = FakeOpenAIServer(latency=args.latency, embedding_latency=args.embedding_latency,
+                                   embedding_dim=args.embedding_dim)
+    print(f"Serving fake OpenAI API at {fake_server.api_base} (Ctrl+C to stop)")
+    fake_server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake_server.stop()
@@ -0,0 +1,119 @@
+import numpy as np
+
+NUMERIC_FIELDS = ("price", "bedrooms", "bathrooms", "house_size")
+
+
+class ListingFilter:
+    """
+    Inclusive numeric range constraints on listing fields.
+
+    Args:
+        min_price, max_price, min_bedrooms, max_bedrooms, min_bathrooms,
+        max_bathrooms, min_house_size, max_house_size (int or float): Optional
+            bounds; None leaves that side of the range open.
+    """
+
+    def __init__(self, min_price=None, max_price=None, min_bedrooms=None, max_bedrooms=None,
+                 min_bathrooms=None, max_bathrooms=None, min_house_size=None, max_house_size=None):
+        self.ranges = {}
+        for field, low, high in (
+            ("price", min_price, max_price),
+            ("bedrooms", min_bedrooms, max_bedrooms),
+            ("bathrooms", min_bathrooms, max_bathrooms),
+            ("house_size", min_house_size, max_house_size),
+        ):
+            if low is not None or high is not None:
+                self.ranges[field] = (low, high)
+
+    def __bool__(self):
+        return bool(self.ranges)
+
+    def __repr__(self):
+        return f"ListingFilter({self.ranges})"
+
+    def merged(self, other):
+        """Returns a filter with this filter's bounds, overridden by any bound set on other."""
+        merged = ListingFilter()
+        merged.ranges = dict(self.ranges)
+        for field, (low, high) in (other.ranges if other else {}).items():
+            current_low, current_high = merged.ranges.get(field, (None, None))
+            merged.ranges[field] = (
+                low if low is not None else current_low,
+                high if high is not None else current_high,
+            )
+        return merged
+
+    def matches(self, listing):
+        for field, (low, high) in self.ranges.items():
+            value = listing.get(field)
+            if value is None:
+                return False
+            if low is not None and value < low:
+                return False
+            if high is not None and value > high:
+                return False
+        return True
+
+    def to_where(self):
+        """Returns the equivalent ChromaDB ``where`` clause, or None if unconstrained."""
+        clauses = []
+        for field, (low, high) in self.ranges.items():
+            if low is not None:
+                clauses.append({field: {"$gte": low}})
+            if high is not None:
+                clauses.append({field: {"$lte": high}})
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+
+class NumericFieldIndex:
+    """
+    Sorted columnar arrays over the numeric listing fields.
+
+    Each field is stored as its values in ascending order next to the row
+    positions they came from, so a range predicate is two binary searches and
+    a slice. Predicates on several fields are intersected, smallest first.
+
+    Args:
+        ids (list): Listing IDs, one per row.
+        metadatas (list): Listing metadata dictionaries, aligned with ids.
+    """
+
+    def __init__(self, ids, metadatas):
+        self.ids = np.asarray(ids, dtype=object)
+        self._columns = {}
+        for field in NUMERIC_FIELDS:
+            values = np.array([metadata.get(field, np.nan) for metadata in metadatas], dtype=np.float64)
+            present = np.flatnonzero(~np.isnan(values))
+            order = present[np.argsort(values[present], kind="stable")]
+            self._columns[field] = (values[order], order)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _positions(self, field, low, high):
+        values, order = self._columns[field]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return order[start:stop]
+
+    def candidate_positions(self, listing_filter):
+        """Returns the sorted row positions that satisfy every constraint of the filter."""
+        if not listing_filter:
+            return np.arange(len(self.ids))
+        matches = sorted(
+            (self._positions(field, low, high) for field, (low, high) in listing_filter.ranges.items()),
+            key=len,
+        )
+        positions = np.sort(matches[0])
+        for other in matches[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def candidate_ids(self, listing_filter):
+        return self.ids[self.candidate_positions(listing_filter)].tolist()
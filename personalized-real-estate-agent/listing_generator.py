@@ -1,21 +1,29 @@
+import argparse
 import json
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import openai
 from config import OPENAI_API_KEY, OPENAI_API_BASE
+from listing_io import ListingWriter
+from listing_utils import validate_listing
+from metrics import metrics
 
 openai.api_key = OPENAI_API_KEY
 openai.api_base = OPENAI_API_BASE
 
-def generate_listings(num_listings=10):
-    """
-    Generates a specified number of real estate listings using the OpenAI API.
+# Rotated across chunks so parallel requests don't all return the same few listings
+CHUNK_THEMES = [
+    "suburban family homes", "downtown condos and lofts", "rural properties and farmhouses",
+    "waterfront and lakeside homes", "starter homes and townhouses", "luxury estates",
+    "historic homes", "mountain and forest cabins", "eco-friendly new builds", "college-town rentals",
+]
 
-    Args:
-        num_listings (int): The number of listings to generate.
 
-    Returns:
-        list: A list of generated real estate listings.
-    """
-    prompt = f"""
+def _build_prompt(num_listings, theme=None):
+    theme_line = f"Focus this batch on {theme}, with varied neighborhoods and prices." if theme else ""
+    return f"""
     Generate {num_listings} diverse real estate listings in valid JSON format. Each listing should be an object with the following fields:
     - "neighborhood": string
     - "price": integer
@@ -24,6 +32,7 @@ def generate_listings(num_listings=10):
     - "house_size": integer (in square feet)
     - "description": string
     - "neighborhood_description": string
+    {theme_line}
 
     Example:
     {{
@@ -37,25 +46,265 @@ def generate_listings(num_listings=10):
     }}
     """
 
+
+def parse_listings(text):
+    """
+    Extracts the listings from a model reply.
+
+    Accepts a bare JSON array, an object wrapping one (e.g. {"listings": [...]})
+    or either inside a Markdown code fence.
+
+    Returns:
+        tuple: (valid listings, number of invalid entries). A reply that isn't
+        JSON at all counts as one invalid entry.
+    """
+    text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text.strip())
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a real estate listing generator. Your output should be a valid JSON array of listings."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
+        data = json.loads(text)
+    except ValueError:
+        start, end = text.find("["), text.rfind("]")
+        try:
+            data = json.loads(text[start:end + 1]) if 0 <= start < end else None
+        except ValueError:
+            data = None
+    if isinstance(data, dict):
+        data = next((value for value in data.values() if isinstance(value, list)), [data])
+    if not isinstance(data, list):
+        return [], 1
+    listings = [validate_listing(item) for item in data]
+    valid = [listing for listing in listings if listing is not None]
+    return valid, len(listings) - len(valid)
+
+
+def _normalize_words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class ListingDeduplicator:
+    """
+    Drops listings that are near-identical to one already accepted.
+
+    Two listings count as duplicates if their descriptions are the same after
+    lowercasing and stripping punctuation, or if they share the neighborhood,
+    bedroom and bathroom counts, roughly the same size and price, and the same
+    opening words of the description.
+    """
+
+    def __init__(self, prefix_words=8):
+        self.prefix_words = prefix_words
+        self._seen = set()
+
+    def _keys(self, listing):
+        words = _normalize_words(listing["description"])
+        return (
+            ("description", " ".join(words)),
+            ("facts", listing["neighborhood"].lower(), listing["bedrooms"], listing["bathrooms"],
+             round(listing["house_size"], -2), round(listing["price"], -4),
+             " ".join(words[:self.prefix_words])),
         )
-        listings_text = response.choices[0].message['content']
-        listings = json.loads(listings_text)
-        return listings
-    except Exception as e:
-        print(f"Error generating listings: {e}")
-        return None
+
+    def add(self, listing):
+        """Records the listing and returns True, or returns False if it is a duplicate."""
+        keys = self._keys(listing)
+        if any(key in self._seen for key in keys):
+            return False
+        self._seen.update(keys)
+        return True
+
+
+class GenerationStats:
+    """Counters for a generation run, including token usage for cost tracking."""
+
+    def __init__(self, requested):
+        self.requested = requested
+        self.written = 0
+        self.requests = 0
+        self.failed_requests = 0
+        self.retried_chunks = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started_at = time.perf_counter()
+
+    def as_dict(self):
+        return {
+            "requested": self.requested,
+            "written": self.written,
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "retried_chunks": self.retried_chunks,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "elapsed_seconds": round(time.perf_counter() - self.started_at, 3),
+        }
+
+    def __str__(self):
+        return (f"Generated {self.written}/{self.requested} listings with {self.requests} requests "
+                f"({self.failed_requests} failed, {self.invalid} invalid and {self.duplicates} duplicate "
+                f"listings dropped, {self.prompt_tokens + self.completion_tokens} tokens)")
+
+
+@metrics.timed("generate_chunk")
+def _request_chunk(num_listings, theme, model, temperature):
+    response = openai.ChatCompletion.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a real estate listing generator. Your output should be a valid JSON array of listings."},
+            {"role": "user", "content": _build_prompt(num_listings, theme)}
+        ],
+        temperature=temperature,
+    )
+    listings, invalid = parse_listings(response.choices[0].message['content'])
+    metrics.record_tokens("generate_listings", response.get("usage"), model)
+    return listings, invalid, response.get("usage") or {}
+
+
+@metrics.timed("generate_listings")
+def generate_listings_streaming(num_listings, on_listing, chunk_size=10, max_workers=8, max_attempts=3,
+                                model="gpt-3.5-turbo", temperature=0.8, progress=False):
+    """
+    Generates listings with parallel chunked requests.
+
+    The target count is split into requests of ``chunk_size`` listings, run
+    ``max_workers`` at a time. At most ``2 * max_workers`` chunks are queued
+    at once and the next one is submitted as each completes, so memory and
+    the request queue stay flat however many listings are asked for. Each reply is validated listing by listing;
+    whatever a chunk failed to deliver (an API error, malformed JSON, invalid
+    or duplicate listings) is requested again as a new chunk, up to
+    ``max_attempts`` times, so one bad reply never discards the others.
+
+    Args:
+        num_listings (int): Number of listings to generate.
+        on_listing (callable): Called with each valid, unique listing as soon as
+            it arrives.
+        chunk_size (int): Listings requested per API call.
+        max_workers (int): API calls in flight at once.
+        max_attempts (int): Attempts per chunk before its shortfall is given up.
+        model (str): Chat model to use.
+        temperature (float): Sampling temperature.
+        progress (bool): Print the running counters after every chunk.
+
+    Returns:
+        GenerationStats: Counters for the run; ``written`` may fall short of
+        num_listings if chunks kept failing.
+    """
+    stats = GenerationStats(num_listings)
+    deduplicator = ListingDeduplicator()
+    chunk_counter = 0
+
+    def submit(executor, count, attempt):
+        nonlocal chunk_counter
+        theme = CHUNK_THEMES[chunk_counter % len(CHUNK_THEMES)]
+        chunk_counter += 1
+        future = executor.submit(_request_chunk, count, theme, model, temperature)
+        pending[future] = (count, attempt)
+
+    def top_up(executor):
+        while len(pending) < max_in_flight:
+            start = next(fresh_chunks, None)
+            if start is None:
+                return
+            submit(executor, min(chunk_size, num_listings - start), 1)
+
+    pending = {}
+    max_in_flight = 2 * max_workers
+    fresh_chunks = iter(range(0, num_listings, chunk_size))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        top_up(executor)
+        while pending and stats.written < num_listings:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                count, attempt = pending.pop(future)
+                stats.requests += 1
+                try:
+                    listings, invalid, usage = future.result()
+                except Exception as e:
+                    print(f"Error generating listings: {e}")
+                    metrics.record_error("generate", e)
+                    stats.failed_requests += 1
+                    listings, invalid, usage = [], 0, {}
+                stats.invalid += invalid
+                stats.prompt_tokens += usage.get("prompt_tokens", 0)
+                stats.completion_tokens += usage.get("completion_tokens", 0)
+
+                delivered = 0
+                for listing in listings:
+                    if delivered == count or stats.written >= num_listings:
+                        break
+                    if not deduplicator.add(listing):
+                        stats.duplicates += 1
+                        continue
+                    on_listing(listing)
+                    stats.written += 1
+                    delivered += 1
+
+                shortfall = count - delivered
+                if shortfall > 0 and attempt < max_attempts and stats.written < num_listings:
+                    stats.retried_chunks += 1
+                    submit(executor, shortfall, attempt + 1)
+                if progress:
+                    print(stats)
+            if stats.written < num_listings:
+                top_up(executor)
+        for future in pending:
+            future.cancel()
+    return stats
+
+
+def generate_listings_to_file(num_listings, output_path="listings.jsonl", append=False, **kwargs):
+    """
+    Generates listings and writes each one to a file as it arrives.
+
+    Takes the same keyword arguments as generate_listings_streaming. The file
+    is JSONL (gzip-compressed for ``.gz``), or a JSON array for ``.json``
+    paths; see listing_io.ListingWriter. Listings are flushed as they are
+    written, so an interrupted JSONL run keeps what it paid for.
+
+    Args:
+        num_listings (int): Number of listings to generate.
+        output_path (str): Output file.
+        append (bool): Add to an existing JSONL file instead of replacing it.
+
+    Returns:
+        GenerationStats: Counters for the run.
+    """
+    with ListingWriter(output_path, append=append, flush=True) as writer:
+        return generate_listings_streaming(num_listings, writer.write, **kwargs)
+
+
+def generate_listings(num_listings=10, **kwargs):
+    """
+    Generates a specified number of real estate listings using the OpenAI API.
+
+    Args:
+        num_listings (int): The number of listings to generate.
+        **kwargs: Options of generate_listings_streaming, such as chunk_size.
+
+    Returns:
+        list: A list of generated real estate listings, or None if none could
+        be generated.
+    """
+    listings = []
+    generate_listings_streaming(num_listings, listings.append, **kwargs)
+    return listings or None
+
 
 if __name__ == "__main__":
-    generated_listings = generate_listings(10)
-    if generated_listings:
-        with open("listings.json", "w") as f:
-            json.dump(generated_listings, f, indent=4)
-        print("Successfully generated and saved 10 real estate listings to listings.json.")
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic real estate listings.")
+    arg_parser.add_argument("--count", type=int, default=10)
+    arg_parser.add_argument("--output", default="listings.json",
+                            help="A .json file receives one JSON array; other paths (e.g. .jsonl, "
+                                 ".jsonl.gz) one listing per line. Listings are written as they arrive.")
+    arg_parser.add_argument("--append", action="store_true", help="Append to an existing JSONL file.")
+    arg_parser.add_argument("--chunk-size", type=int, default=10)
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--max-attempts", type=int, default=3)
+    args = arg_parser.parse_args()
+    stats = generate_listings_to_file(
+        args.count, args.output, append=args.append, chunk_size=args.chunk_size,
+        max_workers=args.workers, max_attempts=args.max_attempts, progress=True,
+    )
+    print(f"{stats}. Saved to {args.output}.")
@@ -0,0 +1,231 @@
+import gzip
+import json
+import queue
+import re
+import threading
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = re.compile(r"[-+.0-9eE]*")
+# What the buffer may still hold after a decode error if the element was merely cut short
+_PARTIAL_TAIL = re.compile(r"[\w+\-.\s]*")
+
+
+def _open_text(path, mode="r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _iter_lines(f, path):
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"{path}:{line_number}: invalid JSON line: {e}") from None
+
+
+def _iter_array(f, path, read_size, max_element_size):
+    """Decodes the elements of a top-level JSON array one at a time."""
+    buffer = f.read(read_size).lstrip(_WHITESPACE)
+    if not buffer.startswith("["):
+        raise ValueError(f"{path}: expected a JSON array or one JSON object per line")
+    position = 1
+    eof = False
+    expect_value = True
+    while True:
+        # Skip whitespace and the comma between elements, refilling the buffer as needed
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+        if position >= len(buffer):
+            raise ValueError(f"{path}: unterminated JSON array")
+        if buffer[position] == "]":
+            return
+        if not expect_value:
+            if buffer[position] != ",":
+                raise ValueError(f"{path}: expected ',' between array elements")
+            position += 1
+            expect_value = True
+            continue
+
+        # A number is only complete once something other than a number character follows it
+        number_end = _NUMBER_CHARS.match(buffer, position).end()
+        truncated = number_end == len(buffer) and number_end > position
+        if not truncated:
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # Fail now if the error sits before a tail that can't be the start of a cut-off token
+                cut_string = e.msg.startswith(("Unterminated string", "Invalid \\uXXXX"))
+                if eof or not (cut_string or _PARTIAL_TAIL.fullmatch(buffer, e.pos)):
+                    raise ValueError(f"{path}: invalid JSON array element: {e.msg}") from None
+                truncated = True
+        if truncated:
+            if eof and number_end == len(buffer):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if len(buffer) - position > max_element_size:
+                raise ValueError(f"{path}: array element longer than {max_element_size} characters")
+            chunk = f.read(read_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield value
+        expect_value = False
+        position = end
+
+
+def iter_listings(path, read_size=1 << 16, max_element_size=1 << 24):
+    """
+    Streams listings from a file without loading it into memory.
+
+    Reads JSONL / NDJSON (one listing per line) or a JSON array of listings,
+    either optionally gzip-compressed (``.gz``). The format is detected from
+    the content, so ``listings.json`` holding JSONL also works. Arrays are
+    decoded incrementally, one element at a time.
+
+    Args:
+        path (str): The listings file.
+        read_size (int): Characters read per chunk when decoding an array.
+        max_element_size (int): Longest array element, in characters, to
+            buffer while waiting for it to decode.
+
+    Yields:
+        dict: One listing at a time.
+    """
+    with _open_text(path) as f:
+        head = f.read(read_size)
+        stripped = head.lstrip(_WHITESPACE)
+        if stripped.startswith("["):
+            f.seek(0)
+            yield from _iter_array(f, path, read_size, max_element_size)
+        else:
+            f.seek(0)
+            yield from _iter_lines(f, path)
+
+
+class ListingWriter:
+    """
+    Writes listings one at a time as JSONL, or as a JSON array for ``.json`` paths.
+
+    Paths ending in ``.gz`` are gzip-compressed. Use as a context manager; the
+    array's closing bracket is written on exit.
+
+    Args:
+        path (str): Output file.
+        append (bool): Append to an existing JSONL file instead of replacing it.
+            Not supported for JSON arrays.
+        flush (bool): Flush after every listing, so an interrupted run keeps
+            everything written so far.
+    """
+
+    def __init__(self, path, append=False, flush=False):
+        self.line_format = not (path[:-3] if path.endswith(".gz") else path).endswith(".json")
+        if append and not self.line_format:
+            raise ValueError(f"Can't append to the JSON array in {path}; use a .jsonl file")
+        self.path = path
+        self.flush = flush
+        self.count = 0
+        self._file = _open_text(path, "a" if append else "w")
+        if not self.line_format:
+            self._file.write("[")
+
+    def write(self, listing):
+        text = json.dumps(listing, ensure_ascii=False)
+        if self.line_format:
+            self._file.write(text + "\n")
+        else:
+            self._file.write(("," if self.count else "") + "\n    " + text)
+        self.count += 1
+        if self.flush:
+            self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        if not self.line_format:
+            self._file.write("\n]\n" if self.count else "]\n")
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_listings(path, listings, append=False):
+    """Writes an iterable of listings to path (see ListingWriter) and returns how many were written."""
+    with ListingWriter(path, append=append) as writer:
+        for listing in listings:
+            writer.write(listing)
+    return writer.count
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+def bounded_prefetch(items, max_pending=2):
+    """
+    Runs an iterator on a background thread, at most max_pending items ahead.
+
+    The producer blocks once max_pending items are waiting, so a slow consumer
+    (e.g. embedding) holds back a fast producer (e.g. parsing) instead of letting
+    it fill memory, while the two still overlap. Exceptions raised by the
+    producer are re-raised in the consumer.
+
+    Args:
+        items (iterable): The upstream pipeline stage.
+        max_pending (int): Queue size between the two threads.
+
+    Yields:
+        The items of the iterable, in order.
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as e:
+            put(_Failure(e))
+
+    producer = threading.Thread(target=produce, name="listing-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
@@ -0,0 +1,66 @@
+import hashlib
+import json
+
+# Required fields and their types; integers may also arrive as whole floats or "1,200"-style strings
+LISTING_SCHEMA = {
+    "neighborhood": str,
+    "price": int,
+    "bedrooms": int,
+    "bathrooms": int,
+    "house_size": int,
+    "description": str,
+    "neighborhood_description": str,
+}
+
+
+def listing_content_hash(listing):
+    """
+    Returns a stable hash of a listing's content.
+
+    The hash only depends on the listing's fields and values, not on key order
+    or its position in the listings file, so it can be used as a key that
+    survives re-generation and re-ordering of the catalog. A ``content_hash``
+    field (as stored in the collection metadata) is ignored.
+
+    Args:
+        listing (dict): The listing dictionary.
+
+    Returns:
+        str: A 32 character hex digest.
+    """
+    listing = {key: value for key, value in listing.items() if key != "content_hash"}
+    canonical = json.dumps(listing, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def validate_listing(listing):
+    """
+    Checks a generated listing against LISTING_SCHEMA.
+
+    Args:
+        listing (dict): A listing parsed from the model's reply.
+
+    Returns:
+        dict: The listing with only the schema fields, integers coerced, or
+        None if a field is missing, empty, of the wrong type or negative.
+    """
+    if not isinstance(listing, dict):
+        return None
+    validated = {}
+    for field, field_type in LISTING_SCHEMA.items():
+        value = listing.get(field)
+        if field_type is str:
+            if not isinstance(value, str) or not value.strip():
+                return None
+            validated[field] = value.strip()
+            continue
+        if isinstance(value, str):
+            value = value.replace(",", "").replace("$", "").strip()
+            try:
+                value = float(value)
+            except ValueError:
+                return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) or value < 0:
+            return None
+        validated[field] = int(value)
+    return validated
@@ -0,0 +1,250 @@
+import functools
+import json
+import threading
+import time
+
+from config import METRICS_ENABLED, METRICS_JSON_LOG
+
+# Upper bounds (seconds) of the stage duration histogram buckets, from a cached
+# embedding lookup up to a slow LLM call
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "homematch_"
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, registry, stage, labels):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self._started
+        self.registry._finish_span(self.stage, self.labels, seconds, exc)
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process timing spans and counters for the HomeMatch pipeline.
+
+    Spans time a pipeline stage into a duration histogram, and count the
+    exceptions that escape it. Counters track token usage, cache lookups and
+    handled errors. Everything can be exported as Prometheus text or JSON, and
+    every finished span can also be appended to a JSON-lines log.
+
+    When disabled, span() returns a shared no-op context manager and the
+    counters return immediately, so instrumented code pays one attribute check.
+
+    Args:
+        enabled (bool): Record anything at all.
+        json_log_path (str): Optional file receiving one JSON line per span.
+    """
+
+    def __init__(self, enabled=True, json_log_path=None):
+        self.enabled = enabled
+        self.json_log_path = json_log_path
+        self._lock = threading.Lock()
+        self._log_file = None
+        self.reset()
+
+    def reset(self):
+        """Forgets everything recorded so far."""
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+    def span(self, stage, **labels):
+        """Context manager timing one run of a pipeline stage."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, labels)
+
+    def timed(self, stage, **labels):
+        """Decorator running every call of the function inside span(stage)."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Span(self, stage, labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def inc(self, name, value=1, **labels):
+        """Adds value to a counter."""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_tokens(self, stage, usage, model=None):
+        """Counts the prompt and completion tokens of an OpenAI response's ``usage``."""
+        if not self.enabled or not usage:
+            return
+        for kind in ("prompt", "completion"):
+            tokens = usage.get(f"{kind}_tokens") or 0
+            if tokens:
+                self.inc("tokens_total", tokens, stage=stage, kind=kind, model=model or "")
+
+    def record_cache(self, cache, hits=0, misses=0):
+        """Counts cache lookups by outcome."""
+        if not self.enabled:
+            return
+        if hits:
+            self.inc("cache_lookups_total", hits, cache=cache, result="hit")
+        if misses:
+            self.inc("cache_lookups_total", misses, cache=cache, result="miss")
+
+    def record_error(self, stage, error):
+        """Counts an error that was handled (and printed) instead of raised."""
+        self.inc("errors_total", stage=stage, error=type(error).__name__)
+
+    def _finish_span(self, stage, labels, seconds, error):
+        key = _label_key({"stage": stage, **labels})
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(seconds)
+        # GeneratorExit and KeyboardInterrupt end a span without being errors of the stage
+        failed = isinstance(error, Exception)
+        if failed:
+            self.record_error(stage, error)
+        if self.json_log_path:
+            self._log({"time": time.time(), "stage": stage, **labels, "seconds": round(seconds, 6),
+                       "error": type(error).__name__ if failed else None})
+
+    def _log(self, event):
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            if self._log_file is None:
+                self._log_file = open(self.json_log_path, "a", encoding="utf-8", buffering=1)
+            self._log_file.write(line)
+
+    def close(self):
+        """Closes the JSON log, if one is open."""
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+
+    def snapshot(self):
+        """
+        Returns everything recorded so far as plain data.
+
+        Returns:
+            dict: ``stages`` with count, total, mean and max seconds per stage
+            (and label set), ``counters`` per name and label set, and
+            ``cache_hit_rates`` per cache.
+        """
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        stages = []
+        for key, histogram in histograms:
+            stages.append({
+                **dict(key),
+                "count": histogram.count,
+                "total_seconds": round(histogram.sum, 6),
+                "mean_seconds": round(histogram.sum / histogram.count, 6),
+                "max_seconds": round(histogram.max, 6),
+            })
+        lookups = {}
+        for (name, key), value in counters:
+            if name == "cache_lookups_total":
+                labels = dict(key)
+                hits, total = lookups.get(labels["cache"], (0, 0))
+                lookups[labels["cache"]] = (hits + (value if labels["result"] == "hit" else 0), total + value)
+        return {
+            "stages": sorted(stages, key=lambda stage: -stage["total_seconds"]),
+            "counters": [{"name": name, **dict(key), "value": value} for (name, key), value in sorted(counters)],
+            "cache_hit_rates": {cache: round(hits / total, 4) for cache, (hits, total) in lookups.items() if total},
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Renders the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        if histograms:
+            name = f"{PREFIX}stage_duration_seconds"
+            lines += [f"# HELP {name} Time spent in each pipeline stage.", f"# TYPE {name} histogram"]
+            for key, histogram in histograms:
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {histogram.count}')
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum!r}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        declared = set()
+        for (counter, key), value in counters:
+            name = PREFIX + counter
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every module of the pipeline; configure with METRICS_ENABLED / METRICS_JSON_LOG
+metrics = MetricsRegistry(enabled=METRICS_ENABLED, json_log_path=METRICS_JSON_LOG)
+
+
+if __name__ == "__main__":
+    with metrics.span("demo"):
+        time.sleep(0.01)
+    metrics.record_tokens("demo", {"prompt_tokens": 120, "completion_tokens": 40}, model="gpt-3.5-turbo")
+    metrics.record_cache("embedding", hits=3, misses=1)
+    print(metrics.to_prometheus())
+    print(metrics.to_json())
@@ -0,0 +1,198 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from listing_utils import listing_content_hash
+
+
+def preference_fingerprint(buyer_preferences_string):
+    """
+    Fingerprints a preference string so near-identical phrasings share a key.
+
+    Case, punctuation and whitespace differences are ignored; the wording and
+    word order are not.
+    """
+    normalized = " ".join(re.sub(r"[^a-z0-9$]+", " ", buyer_preferences_string.lower()).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def make_cache_key(listing, buyer_preferences_string, model, temperature):
+    return ":".join([
+        listing_content_hash(listing),
+        preference_fingerprint(buyer_preferences_string),
+        model,
+        repr(float(temperature)),
+    ])
+
+
+class PersonalizationCache(ABC):
+    """
+    Base class for caches of personalized descriptions.
+
+    Subclasses implement ``_get`` and ``_set``; this class builds the keys and
+    keeps the hit/miss counters. Every hit is one LLM call that was not made.
+    """
+
+    def __init__(self, ttl=24 * 60 * 60, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @abstractmethod
+    def _get(self, key):
+        """Returns the stored value for key, or None if it is missing or expired."""
+
+    @abstractmethod
+    def _set(self, key, value):
+        """Stores value under key."""
+
+    def get(self, listing, buyer_preferences_string, model, temperature):
+        """Returns the cached description, or None if it is missing or expired."""
+        value = self._get(make_cache_key(listing, buyer_preferences_string, model, temperature))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, listing, buyer_preferences_string, model, temperature, description):
+        self._set(make_cache_key(listing, buyer_preferences_string, model, temperature), description)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hit_rate, 4),
+            "llm_calls_saved": self.hits,
+        }
+
+
+class MemoryPersonalizationCache(PersonalizationCache):
+    """In-process cache with a TTL and least-recently-used eviction."""
+
+    def __init__(self, ttl=24 * 60 * 60, max_entries=10_000):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLitePersonalizationCache(PersonalizationCache):
+    """
+    SQLite-backed cache that several worker processes can share.
+
+    The database runs in WAL mode so readers don't block the writer. Expired
+    entries and entries beyond ``max_entries`` (least recently used first) are
+    pruned once every ``PRUNE_SLACK * max_entries`` writes of each process
+    rather than on every write, so the table can briefly hold that many extra
+    entries per writer.
+    """
+
+    PRUNE_SLACK = 0.1
+
+    def __init__(self, path, ttl=24 * 60 * 60, max_entries=100_000):
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        self._prune_interval = max(1, int(self.PRUNE_SLACK * max_entries))
+        self._writes_since_prune = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS personalizations (
+                key TEXT PRIMARY KEY,
+                description TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS personalizations_last_access ON personalizations (last_access)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS personalizations_expires_at ON personalizations (expires_at)"
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM personalizations").fetchone()[0]
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT description, expires_at FROM personalizations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            description, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM personalizations WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE personalizations SET last_access = ? WHERE key = ?", (now, key))
+            return description
+
+    def _set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO personalizations (key, description, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now + self.ttl, now),
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self._prune_interval:
+                    self._prune(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _prune(self, now):
+        # The LRU delete walks the whole last_access index, so it only runs every _prune_interval writes
+        self._conn.execute("DELETE FROM personalizations WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM personalizations WHERE key IN ("
+            "SELECT key FROM personalizations ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._writes_since_prune = 0
+
+    def close(self):
+        self._conn.close()
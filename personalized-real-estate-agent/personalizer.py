@@ -1,24 +1,40 @@
+import asyncio
+import random
+import time
+
 import openai
 
-from config import OPENAI_API_KEY, OPENAI_API_BASE
+from config import OPENAI_API_KEY, OPENAI_API_BASE, PERSONALIZATION_CACHE_PATH, PERSONALIZATION_CACHE_TTL
+from metrics import metrics
+from personalization_cache import SQLitePersonalizationCache
+
+# Errors worth retrying: the request itself was fine, the service just couldn't serve it right now
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.APIError,
+)
 
 
 class ListingPersonalizer:
-    def __init__(self):
+    def __init__(self, model="gpt-3.5-turbo", temperature=0.7, max_concurrency=4, max_retries=3,
+                 backoff_base=1.0, cache=None):
         openai.api_key = OPENAI_API_KEY
         openai.api_base = OPENAI_API_BASE
+        self.model = model
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        # Monotonic time before which no new request is sent, set when the API rate limits us
+        self._resume_at = 0.0
+        if cache is None and PERSONALIZATION_CACHE_PATH:
+            cache = SQLitePersonalizationCache(PERSONALIZATION_CACHE_PATH, ttl=PERSONALIZATION_CACHE_TTL)
+        self.cache = cache
 
-    def personalize_listing(self, listing, buyer_preferences_string):
-        """
-        Personalizes a real estate listing description based on buyer preferences.
-
-        Args:
-            listing (dict): The original listing dictionary.
-            buyer_preferences_string (str): A string summarizing the buyer's preferences.
-
-        Returns:
-            str: The personalized listing description.
-        """
+    def _build_messages(self, listing, buyer_preferences_string):
         original_description = listing['description']
         neighborhood_description = listing['neighborhood_description']
 
@@ -38,21 +54,242 @@ class ListingPersonalizer:
         The personalized description should be engaging and persuasive.
         """
 
+        return [
+            {"role": "system", "content": "You are a helpful real estate agent."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @metrics.timed("personalize", mode="sync")
+    def personalize_listing(self, listing, buyer_preferences_string):
+        """
+        Personalizes a real estate listing description based on buyer preferences.
+
+        Args:
+            listing (dict): The original listing dictionary.
+            buyer_preferences_string (str): A string summarizing the buyer's preferences.
+
+        Returns:
+            str: The personalized listing description.
+        """
+        original_description = listing['description']
+
+        cached = self._cache_get(listing, buyer_preferences_string)
+        if cached is not None:
+            return cached
+
         try:
             response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful real estate agent."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
+                model=self.model,
+                messages=self._build_messages(listing, buyer_preferences_string),
+                temperature=self.temperature,
             )
+            metrics.record_tokens("personalize", response.get("usage"), self.model)
             personalized_description = response.choices[0].message['content']
+            self._cache_set(listing, buyer_preferences_string, personalized_description)
             return personalized_description
         except Exception as e:
             print(f"Error personalizing listing: {e}")
+            metrics.record_error("personalize", e)
             return original_description  # Return original if personalization fails
 
+    def stream_personalized_listing(self, listing, buyer_preferences_string):
+        """
+        Personalizes a listing description, yielding it chunk by chunk as the model produces it.
+
+        If the stream fails before producing anything, the original description is
+        yielded instead, as personalize_listing does. If it fails partway, a short
+        notice followed by the original description is yielded after the partial text.
+
+        Args:
+            listing (dict): The original listing dictionary.
+            buyer_preferences_string (str): A string summarizing the buyer's preferences.
+
+        Yields:
+            str: Consecutive chunks of the personalized listing description.
+        """
+        original_description = listing['description']
+
+        cached = self._cache_get(listing, buyer_preferences_string)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        with metrics.span("personalize", mode="stream"):
+            try:
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=self._build_messages(listing, buyer_preferences_string),
+                    temperature=self.temperature,
+                    stream=True,
+                )
+                for event in response:
+                    content = event.choices[0].delta.get('content')
+                    if content:
+                        chunks.append(content)
+                        yield content
+            except Exception as e:
+                print(f"\nError personalizing listing: {e}")
+                metrics.record_error("personalize", e)
+                if chunks:
+                    yield "\n\n(Personalization was interrupted, here is the original description.)\n"
+                yield original_description  # Return original if personalization fails
+                return
+
+        if not chunks:
+            yield original_description
+            return
+        self._cache_set(listing, buyer_preferences_string, "".join(chunks))
+
+    def _cache_get(self, listing, buyer_preferences_string):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(listing, buyer_preferences_string, self.model, self.temperature)
+        metrics.record_cache("personalization", hits=cached is not None, misses=cached is None)
+        return cached
+
+    async def _acache_get(self, listing, buyer_preferences_string):
+        if self.cache is None:
+            return None
+        # The SQLite cache can wait out another process's write, so it runs off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._cache_get, listing, buyer_preferences_string
+        )
+
+    async def _acache_set(self, listing, buyer_preferences_string, personalized_description):
+        if self.cache is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._cache_set, listing, buyer_preferences_string, personalized_description
+            )
+
+    def _cache_set(self, listing, buyer_preferences_string, personalized_description):
+        # Only successful personalizations are cached, never the fallback
+        if self.cache is not None:
+            self.cache.set(listing, buyer_preferences_string, self.model, self.temperature,
+                           personalized_description)
+
+    def _retry_delay(self, error, attempt):
+        retry_after = (getattr(error, "headers", None) or {}).get("Retry-After")
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Exponential backoff with jitter so concurrent retries don't arrive in lockstep
+        return self.backoff_base * 2 ** attempt + random.uniform(0, self.backoff_base)
+
+    async def apersonalize_listing(self, listing, buyer_preferences_string, semaphore=None):
+        """
+        Async version of personalize_listing with retries and backoff.
+
+        Rate limit responses pause every request sharing this personalizer until
+        the Retry-After delay (or the backoff delay) has passed.
+
+        Args:
+            listing (dict): The original listing dictionary.
+            buyer_preferences_string (str): A string summarizing the buyer's preferences.
+            semaphore (asyncio.Semaphore): Optional limit on requests in flight.
+
+        Returns:
+            str: The personalized listing description, or the original one if
+            every attempt failed.
+        """
+        with metrics.span("personalize", mode="async"):
+            return await self._apersonalize_listing(listing, buyer_preferences_string, semaphore)
+
+    async def _apersonalize_listing(self, listing, buyer_preferences_string, semaphore):
+        cached = await self._acache_get(listing, buyer_preferences_string)
+        if cached is not None:
+            return cached
+
+        semaphore = semaphore or asyncio.Semaphore(1)
+        messages = self._build_messages(listing, buyer_preferences_string)
+        error = None
+        for attempt in range(self.max_retries + 1):
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                async with semaphore:
+                    response = await openai.ChatCompletion.acreate(
+                        model=self.model,
+                        messages=messages,
+                        temperature=self.temperature,
+                    )
+                metrics.record_tokens("personalize", response.get("usage"), self.model)
+                personalized_description = response.choices[0].message['content']
+                await self._acache_set(listing, buyer_preferences_string, personalized_description)
+                return personalized_description
+            except RETRYABLE_ERRORS as e:
+                error = e
+                if attempt == self.max_retries:
+                    break
+                delay = self._retry_delay(e, attempt)
+                metrics.inc("retries_total", stage="personalize", error=type(e).__name__)
+                if isinstance(e, openai.error.RateLimitError):
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                else:
+                    await asyncio.sleep(delay)
+            except Exception as e:
+                error = e
+                break
+        print(f"Error personalizing listing: {error}")
+        metrics.record_error("personalize", error)
+        return listing['description']  # Return original if personalization fails
+
+    async def apersonalize_many(self, listings, buyer_preferences_string):
+        """Personalizes listings concurrently and returns descriptions in input order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(
+            self.apersonalize_listing(listing, buyer_preferences_string, semaphore)
+            for listing in listings
+        ))
+
+    async def apersonalize_as_completed(self, listings, buyer_preferences_string):
+        """
+        Personalizes listings concurrently, yielding results as soon as they finish.
+
+        Yields:
+            tuple: (index into listings, personalized description), in completion order.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def personalize(index, listing):
+            return index, await self.apersonalize_listing(listing, buyer_preferences_string, semaphore)
+
+        tasks = [asyncio.ensure_future(personalize(i, listing)) for i, listing in enumerate(listings)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def personalize_many(self, listings, buyer_preferences_string):
+        """
+        Personalizes several listings concurrently.
+
+        Up to ``max_concurrency`` requests are in flight at once, so a page of
+        results costs roughly the latency of the slowest call instead of the sum.
+
+        Args:
+            listings (list): The original listing dictionaries.
+            buyer_preferences_string (str): A string summarizing the buyer's preferences.
+
+        Returns:
+            list: The personalized descriptions, in the same order as listings.
+
+        Raises:
+            RuntimeError: If called from inside a running event loop (e.g. the
+                aiohttp service or a notebook); await apersonalize_many there.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.apersonalize_many(listings, buyer_preferences_string))
+        raise RuntimeError("personalize_many() can't run inside a running event loop; "
+                           "await apersonalize_many() instead")
+
 
 if __name__ == "__main__":
     # Example Usage (for testing the personalizer independently)
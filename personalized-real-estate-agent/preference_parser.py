@@ -1,3 +1,74 @@
+import re
+
+from listing_filters import ListingFilter
+from metrics import metrics
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_COUNT = r"\b(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r")"
+_AMOUNT = r"\$\s*([\d,]+(?:\.\d+)?)\s*(k|m|million|thousand)?\b"
+# Words that turn the amount after them into an upper or a lower bound
+_AT_MOST = r"under|below|less than|up to|at most|no more than|max(?:imum)?(?: of)?"
+_AT_LEAST = r"over|above|more than|at least|min(?:imum)?(?: of)?"
+
+BEDROOMS_PATTERN = re.compile(_COUNT + r"[\s-]*(?:bed(?:room)?s?|br)\b", re.IGNORECASE)
+BATHROOMS_PATTERN = re.compile(_COUNT + r"[\s-]*(?:bath(?:room)?s?|ba)\b", re.IGNORECASE)
+MAX_PRICE_PATTERN = re.compile(r"(?:" + _AT_MOST + r"|budget(?: of| is)?)\s*" + _AMOUNT, re.IGNORECASE)
+MIN_PRICE_PATTERN = re.compile(r"(?:" + _AT_LEAST + r")\s*" + _AMOUNT, re.IGNORECASE)
+# The optional first group is the qualifier; a size without one counts as a minimum
+HOUSE_SIZE_PATTERN = re.compile(
+    r"(?:(" + _AT_MOST + r"|" + _AT_LEAST + r")\s*)?([\d,]+)\s*(?:sq\.?\s*ft|sqft|square[\s-]+feet)",
+    re.IGNORECASE,
+)
+
+
+def _parse_count(token):
+    token = token.lower()
+    return NUMBER_WORDS[token] if token in NUMBER_WORDS else float(token)
+
+
+def _parse_amount(number, suffix):
+    amount = float(number.replace(",", ""))
+    suffix = (suffix or "").lower()
+    if suffix in ("k", "thousand"):
+        amount *= 1_000
+    elif suffix in ("m", "million"):
+        amount *= 1_000_000
+    return int(amount)
+
+
+class PreferenceFacet:
+    """One soft preference (e.g. amenities) to be embedded and scored on its own."""
+
+    def __init__(self, name, text, weight=1.0):
+        self.name = name
+        self.text = text
+        self.weight = weight
+        # Filled in by the first search that embeds this facet and reused afterwards
+        self.embedding = None
+
+    def __repr__(self):
+        return f"PreferenceFacet({self.name!r}, weight={self.weight})"
+
+
+class BuyerPreferences:
+    """
+    Buyer preferences split into hard numeric constraints and weighted soft facets.
+
+    Attributes:
+        filters (ListingFilter): Constraints that every result must satisfy.
+        facets (list): PreferenceFacet objects for similarity scoring.
+        query_string (str): The combined preference string, as used for personalization.
+    """
+
+    def __init__(self, filters, facets, query_string):
+        self.filters = filters
+        self.facets = facets
+        self.query_string = query_string
+
+
 class PreferenceParser:
     def __init__(self):
         self.questions = [
@@ -14,12 +85,21 @@ class PreferenceParser:
             "Easy access to a reliable bus line, proximity to a major highway, and bike-friendly roads.",
             "A balance between suburban tranquility and access to urban amenities like restaurants and theaters."
         ]
+        # Facet name and weight for each question, in the same order
+        self.facets = [
+            ("size", 1.0),
+            ("priorities", 1.5),
+            ("amenities", 1.0),
+            ("transportation", 1.0),
+            ("urbanity", 0.75),
+        ]
 
     def get_preferences(self):
         # In a real application, this would be interactive input from the user.
         # For now, we use hardcoded answers as per the project description.
         return dict(zip(self.questions, self.answers))
 
+    @metrics.timed("preference_parsing", step="query_string")
     def get_query_string(self):
         preferences = self.get_preferences()
         query_parts = []
@@ -27,6 +107,63 @@ class PreferenceParser:
             query_parts.append(f"{q} {a}")
         return " ".join(query_parts)
 
+    def extract_filters(self, text):
+        """
+        Extracts hard numeric constraints from free text.
+
+        Bedroom, bathroom and square footage mentions become minimums
+        ("three-bedroom", "2 baths", "1,500 sq ft"); dollar amounts become a
+        maximum or minimum price when introduced by words like "under" or "over",
+        and square footage after "under" or "at most" a maximum house size.
+
+        Args:
+            text (str): The buyer's answers.
+
+        Returns:
+            ListingFilter: The extracted constraints; empty if none were found.
+        """
+        bounds = {}
+        bedrooms = [_parse_count(match) for match in BEDROOMS_PATTERN.findall(text)]
+        if bedrooms:
+            bounds["min_bedrooms"] = max(bedrooms)
+        bathrooms = [_parse_count(match) for match in BATHROOMS_PATTERN.findall(text)]
+        if bathrooms:
+            bounds["min_bathrooms"] = max(bathrooms)
+        max_prices = [_parse_amount(*match) for match in MAX_PRICE_PATTERN.findall(text)]
+        if max_prices:
+            bounds["max_price"] = min(max_prices)
+        min_prices = [_parse_amount(*match) for match in MIN_PRICE_PATTERN.findall(text)]
+        if min_prices:
+            bounds["min_price"] = max(min_prices)
+        min_sizes, max_sizes = [], []
+        for qualifier, number in HOUSE_SIZE_PATTERN.findall(text):
+            is_upper_bound = qualifier and re.fullmatch(_AT_MOST, qualifier, re.IGNORECASE)
+            (max_sizes if is_upper_bound else min_sizes).append(int(number.replace(",", "")))
+        if min_sizes:
+            bounds["min_house_size"] = max(min_sizes)
+        if max_sizes:
+            bounds["max_house_size"] = min(max_sizes)
+        return ListingFilter(**bounds)
+
+    @metrics.timed("preference_parsing", step="extract")
+    def extract_preferences(self):
+        """
+        Turns the answers into hard constraints plus one weighted facet per question.
+
+        Returns:
+            BuyerPreferences: The structured preferences.
+        """
+        facets = [
+            PreferenceFacet(name, answer, weight)
+            for (name, weight), answer in zip(self.facets, self.answers)
+            if answer.strip()
+        ]
+        return BuyerPreferences(
+            filters=self.extract_filters(" ".join(self.answers)),
+            facets=facets,
+            query_string=self.get_query_string(),
+        )
+
 
 if __name__ == "__main__":
     parser = PreferenceParser()
@@ -37,3 +174,7 @@ if __name__ == "__main__":
 
     query_string = parser.get_query_string()
     print(f"\nCombined Query String: {query_string}")
+
+    structured = parser.extract_preferences()
+    print(f"\nHard Constraints: {structured.filters}")
+    print(f"Soft Preference Facets: {structured.facets}")
@@ -0,0 +1,318 @@
+import json
+import time
+
+import numpy as np
+
+from ann_index import ExactIndex, SlotIndex, _kmeans, _squared_distances
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension 8-bit scalar quantizer.
+
+    Each dimension's training range is split into 256 steps, so a vector costs
+    one byte per dimension (4x smaller than float32).
+    """
+
+    kind = "sq8"
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.low = None
+        self.scale = None
+
+    @property
+    def code_size(self):
+        return self.dim
+
+    def train(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.low = vectors.min(axis=0)
+        self.scale = np.maximum(vectors.max(axis=0) - self.low, 1e-12) / 255.0
+        return self
+
+    def encode(self, vectors):
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.low) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        return self.low + codes.astype(np.float32) * self.scale
+
+    def distance_table(self, query):
+        """Precomputes what asymmetric_distances needs for one float query."""
+        weights = self.scale * self.scale
+        shifted = (query - self.low) / self.scale
+        return weights, weights * shifted, float((weights * shifted * shifted).sum())
+
+    def asymmetric_distances(self, table, codes, code_norms):
+        # ||q - (low + scale * c)||^2 expanded so only a codes @ vector product touches every row
+        _, weighted_query, query_norm = table
+        return np.maximum(code_norms - 2.0 * (codes @ weighted_query) + query_norm, 0.0)
+
+    def code_norms(self, codes):
+        weights = self.scale * self.scale
+        return (codes.astype(np.float32) ** 2) @ weights
+
+    def state(self):
+        return {"low": self.low, "scale": self.scale}
+
+    def restore(self, arrays):
+        self.low = arrays["low"]
+        self.scale = arrays["scale"]
+
+
+class ProductQuantizer:
+    """
+    Product quantizer with 256 centroids per subspace.
+
+    Vectors are split into ``n_subvectors`` contiguous subvectors, each encoded
+    as the ID of its nearest k-means centroid, so a vector costs
+    ``n_subvectors`` bytes. Distances to a query are sums over per-subspace
+    lookup tables (asymmetric distance computation).
+
+    Args:
+        dim (int): Vector dimension; must be divisible by n_subvectors.
+        n_subvectors (int): Number of subspaces, i.e. bytes per vector.
+        iterations (int): k-means iterations per subspace.
+    """
+
+    kind = "pq"
+
+    def __init__(self, dim, n_subvectors=8, iterations=20):
+        if dim % n_subvectors:
+            raise ValueError(f"Dimension {dim} is not divisible by {n_subvectors} subvectors")
+        self.dim = dim
+        self.n_subvectors = n_subvectors
+        self.iterations = iterations
+        self.sub_dim = dim // n_subvectors
+        self.codebooks = None
+
+    @property
+    def code_size(self):
+        return self.n_subvectors
+
+    def _split(self, vectors):
+        return np.asarray(vectors, dtype=np.float32).reshape(-1, self.n_subvectors, self.sub_dim)
+
+    def train(self, vectors, seed=0):
+        subvectors = self._split(vectors)
+        codebooks = np.zeros((self.n_subvectors, 256, self.sub_dim), dtype=np.float32)
+        for j in range(self.n_subvectors):
+            centroids = _kmeans(np.ascontiguousarray(subvectors[:, j]), 256, self.iterations, seed + j)
+            codebooks[j, :len(centroids)] = centroids
+            # Fewer training points than centroids: repeat the last one so unused codes stay harmless
+            codebooks[j, len(centroids):] = centroids[-1]
+        self.codebooks = codebooks
+        return self
+
+    def encode(self, vectors):
+        subvectors = self._split(vectors)
+        codes = np.empty((len(subvectors), self.n_subvectors), dtype=np.uint8)
+        for j in range(self.n_subvectors):
+            codes[:, j] = _squared_distances(subvectors[:, j], self.codebooks[j]).argmin(axis=1)
+        return codes
+
+    def decode(self, codes):
+        return self.codebooks[np.arange(self.n_subvectors), codes].reshape(len(codes), self.dim)
+
+    def distance_table(self, query):
+        """(n_subvectors, 256) squared distances from each query subvector to each centroid."""
+        diff = self.codebooks - query.reshape(self.n_subvectors, 1, self.sub_dim)
+        return np.einsum("jkd,jkd->jk", diff, diff)
+
+    def asymmetric_distances(self, table, codes, code_norms=None):
+        return table[np.arange(self.n_subvectors), codes].sum(axis=1)
+
+    def code_norms(self, codes):
+        return None
+
+    def state(self):
+        return {"codebooks": self.codebooks}
+
+    def restore(self, arrays):
+        self.codebooks = arrays["codebooks"]
+
+
+QUANTIZER_TYPES = {quantizer.kind: quantizer for quantizer in (ScalarQuantizer, ProductQuantizer)}
+
+
+class QuantizedIndex(SlotIndex):
+    """
+    Brute-force index over quantized codes, with optional exact re-ranking.
+
+    Only the uint8 codes are kept in memory, one slot each (see
+    ann_index.SlotIndex). Every search scores all codes against the float
+    query; with ``rerank`` set, the best ``rerank`` candidates are then
+    re-scored with their full-precision vectors, fetched through
+    ``exact_vectors`` (e.g. rows of a memory-mapped EmbeddingStore, or
+    embeddings read back from ChromaDB).
+
+    Searches return the same (ids, distances) pair as the ann_index classes,
+    so a QuantizedIndex can be used as HomeMatchDB.ann_index or
+    VectorRetriever.index.
+
+    Args:
+        quantizer (ScalarQuantizer or ProductQuantizer): The quantizer; trained
+            on the first vectors added if it isn't trained yet.
+        metric (str): "l2" or "cosine".
+        rerank (int): Number of top candidates to re-score exactly; 0 disables it.
+        exact_vectors (callable): Takes a list of IDs and returns their float
+            vectors as a matrix, with a row of NaN for IDs it no longer has;
+            those are dropped from the results. Required when rerank is set.
+    """
+
+    kind = "quantized"
+    BLOCK_ROWS = 65536
+    slot_arrays = ("_codes", "_code_norms")
+
+    def __init__(self, quantizer, metric="l2", rerank=0, exact_vectors=None):
+        super().__init__(quantizer.dim, metric)
+        self.quantizer = quantizer
+        self.rerank = rerank
+        self.exact_vectors = exact_vectors
+        self._codes = np.empty((0, quantizer.code_size), dtype=np.uint8)
+        # Only quantizers with a norm term in their distances (sq8) keep per-code norms
+        self._code_norms = None
+        self._trained = False
+
+    @property
+    def codes(self):
+        return self._codes[:self._size]
+
+    def train(self, vectors, sample_size=50_000, seed=0):
+        """Trains the quantizer on (a random sample of) the vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) > sample_size:
+            vectors = vectors[np.sort(np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False))]
+        self.quantizer.train(self._prepare(vectors))
+        self._trained = True
+        return self
+
+    def build(self, vectors, ids=None):
+        return self.train(vectors).add(vectors, ids)
+
+    def add(self, vectors, ids=None):
+        """Encodes and appends vectors; re-adding an ID overwrites its previous code in place."""
+        vectors = self._prepare(vectors)
+        if not self._trained:
+            self.train(vectors)
+        latest = self._latest_rows(ids, len(vectors))
+
+        codes = self.quantizer.encode(vectors)
+        norms = self.quantizer.code_norms(codes)
+        if norms is not None and self._code_norms is None:
+            self._code_norms = np.empty(len(self._codes), dtype=np.float32)
+        new_ids = [external_id for external_id in latest if external_id not in self._positions]
+        self._allocate(new_ids)
+        positions = np.array([self._positions[external_id] for external_id in latest], dtype=np.int64)
+        rows = np.fromiter(latest.values(), dtype=np.int64, count=len(latest))
+        self._codes[positions] = codes[rows]
+        if norms is not None:
+            self._code_norms[positions] = norms[rows]
+        return self
+
+    @property
+    def memory_bytes(self):
+        """Bytes used by the codes, versus 4 * dim per vector for float32."""
+        return self.codes.nbytes + (4 * self._size if self._code_norms is not None else 0)
+
+    @property
+    def compression_ratio(self):
+        return 4 * self.dim * self._size / max(self.memory_bytes, 1)
+
+    def search(self, query, k=10):
+        """
+        Finds approximately the k nearest vectors to the query.
+
+        Returns:
+            tuple: (list of IDs, numpy array of distances), nearest first.
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return [], np.empty(0, dtype=np.float32)
+        query = self._prepare(query)[0]
+        table = self.quantizer.distance_table(query)
+        distances = np.empty(self._size, dtype=np.float32)
+        # Score in blocks so the float temporaries stay small next to the codes
+        for start in range(0, self._size, self.BLOCK_ROWS):
+            stop = min(start + self.BLOCK_ROWS, self._size)
+            norms = self._code_norms[start:stop] if self._code_norms is not None else None
+            distances[start:stop] = self.quantizer.asymmetric_distances(table, self._codes[start:stop], norms)
+        if self._n_deleted:
+            distances[self._deleted[:self._size]] = np.inf
+
+        shortlist = min(max(k, self.rerank), len(self))
+        top = np.argpartition(distances, shortlist - 1)[:shortlist]
+        top_ids = [self.ids[p] for p in top]
+        if self.rerank and self.exact_vectors is not None:
+            exact = self._prepare(self.exact_vectors(top_ids))
+            top_distances = ((exact - query) ** 2).sum(axis=1)
+        else:
+            top_distances = distances[top]
+        order = np.argsort(top_distances, kind="stable")
+        # Drop candidates whose exact vector is gone (their NaN distances sort last)
+        order = order[np.isfinite(top_distances[order])][:k]
+        return [top_ids[i] for i in order], self._to_metric(np.asarray(top_distances[order], dtype=np.float32))
+
+    def save(self, path):
+        """Saves the codes and quantizer to a single .npz file (exact_vectors is not saved)."""
+        meta = {
+            "kind": self.kind, "quantizer": self.quantizer.kind, "dim": self.dim,
+            "metric": self.metric, "rerank": self.rerank,
+        }
+        if isinstance(self.quantizer, ProductQuantizer):
+            meta["n_subvectors"] = self.quantizer.n_subvectors
+        np.savez(
+            path,
+            meta=np.array(json.dumps(meta)),
+            codes=self.codes,
+            **self._slot_state(),
+            **self.quantizer.state(),
+        )
+
+    @classmethod
+    def load(cls, path, exact_vectors=None):
+        with np.load(path, allow_pickle=False) as arrays:
+            arrays = dict(arrays)
+        meta = json.loads(str(arrays["meta"]))
+        params = {"n_subvectors": meta["n_subvectors"]} if "n_subvectors" in meta else {}
+        quantizer = QUANTIZER_TYPES[meta["quantizer"]](meta["dim"], **params)
+        quantizer.restore(arrays)
+        index = cls(quantizer, metric=meta["metric"], rerank=meta["rerank"], exact_vectors=exact_vectors)
+        index._trained = True
+        index._codes = arrays["codes"]
+        index._code_norms = quantizer.code_norms(index._codes)
+        index._restore_slots(arrays, len(index._codes))
+        return index
+
+
+if __name__ == "__main__":
+    # Memory and recall@10 of each quantizer, with and without exact re-ranking
+    rng = np.random.default_rng(42)
+    n, dim, k = 20_000, 384, 10
+    centers = rng.normal(size=(200, dim)).astype(np.float32)
+    data = (centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+    queries = data[rng.choice(n, 100, replace=False)] + 0.05 * rng.normal(size=(100, dim)).astype(np.float32)
+
+    exact = ExactIndex(dim, metric="cosine")
+    exact.add(data)
+    expected = [set(exact.search(query, k)[0]) for query in queries]
+    print(f"float32: {data.nbytes / 1e6:.1f} MB")
+
+    for name, quantizer in (
+        ("sq8", ScalarQuantizer(dim)),
+        ("pq48", ProductQuantizer(dim, n_subvectors=48)),
+        ("pq12", ProductQuantizer(dim, n_subvectors=12)),
+    ):
+        started = time.perf_counter()
+        index = QuantizedIndex(quantizer, metric="cosine", exact_vectors=lambda ids: data[ids]).build(data)
+        build_seconds = time.perf_counter() - started
+        for rerank in (0, 100):
+            index.rerank = rerank
+            started = time.perf_counter()
+            recall = np.mean([len(expected[i] & set(index.search(query, k)[0])) / k
+                              for i, query in enumerate(queries)])
+            latency = (time.perf_counter() - started) * 1000 / len(queries)
+            print(f"{name:<5} rerank={rerank:<4}: {index.memory_bytes / 1e6:5.1f} MB "
+                  f"({index.compression_ratio:4.1f}x), recall@{k} {recall:.3f}, "
+                  f"{latency:.2f} ms/query, built in {build_seconds:.1f}s")
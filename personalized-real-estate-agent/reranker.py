@@ -0,0 +1,262 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from config import RERANK_CANDIDATES, RERANK_LATENCY_BUDGET_MS, RERANKER_MODEL
+from metrics import metrics
+
+RESULT_KEYS = ('ids', 'documents', 'metadatas', 'distances')
+
+_warm_models = {}
+
+# Default for latency_budget arguments: use the reranker's own budget (None means no limit)
+_DEFAULT = object()
+
+
+def __getattr__(name):
+    # Imported on first use, like database.SentenceTransformer, so that importing
+    # this module stays cheap when re-ranking is switched off
+    if name == "CrossEncoder":
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load_cross_encoder(model_name=RERANKER_MODEL, max_length=512):
+    """Returns the cross-encoder, loading it at most once per process."""
+    model_class = getattr(sys.modules[__name__], "CrossEncoder")
+    key = (model_class, model_name, max_length)
+    if key not in _warm_models:
+        _warm_models[key] = model_class(model_name, max_length=max_length, device="cpu")
+    return _warm_models[key]
+
+
+class RerankStats:
+    """What the last re-ranking call did, for logging and benchmarks."""
+
+    def __init__(self, candidates=0):
+        self.candidates = candidates
+        self.scored = 0
+        self.batches = 0
+        self.truncated = False
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "candidates": self.candidates,
+            "scored": self.scored,
+            "batches": self.batches,
+            "truncated": self.truncated,
+            "latency_ms": round(self.seconds * 1000, 3),
+        }
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage re-ranker for search results.
+
+    The bi-encoder search over-fetches ``candidates`` listings; this scores each
+    (query, listing document) pair with a small cross-encoder on the CPU and
+    keeps the best ``n_results``. Candidates are scored in first-stage order,
+    ``batch_size`` at a time. Once the next batch would overrun the latency
+    budget, scoring stops: the scored candidates are ordered by their
+    cross-encoder score and the unscored ones follow in their original order.
+
+    Args:
+        model_name (str): sentence-transformers CrossEncoder model.
+        candidates (int): How many first-stage results to fetch and re-rank.
+        batch_size (int): Pairs per cross-encoder forward pass.
+        latency_budget (float): Seconds allowed for scoring; None for no limit.
+        max_length (int): Token limit per (query, document) pair.
+    """
+
+    def __init__(self, model_name=RERANKER_MODEL, candidates=RERANK_CANDIDATES, batch_size=16,
+                 latency_budget=RERANK_LATENCY_BUDGET_MS / 1000, max_length=512):
+        self.model_name = model_name
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.latency_budget = latency_budget
+        self.max_length = max_length
+        self.last_stats = RerankStats()
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = load_cross_encoder(self.model_name, self.max_length)
+        return self._model
+
+    def score(self, query, documents, latency_budget=_DEFAULT):
+        """
+        Scores documents against a query in batches, within a time budget.
+
+        Args:
+            query (str): The buyer's query.
+            documents (list): Listing documents, most promising first.
+            latency_budget (float): Seconds allowed; None for no limit. Defaults
+                to the reranker's latency_budget. The first batch is always scored.
+
+        Returns:
+            np.ndarray: One score per document (higher is more relevant), NaN
+            for documents left unscored when the budget ran out.
+        """
+        if latency_budget is _DEFAULT:
+            latency_budget = self.latency_budget
+        stats = RerankStats(len(documents))
+        started = time.perf_counter()
+        scores = np.full(len(documents), np.nan, dtype=np.float32)
+        batch_seconds = 0.0
+        for start in range(0, len(documents), self.batch_size):
+            elapsed = time.perf_counter() - started
+            # The previous batch's duration stands in for the next one's
+            if latency_budget is not None and stats.batches and elapsed + batch_seconds > latency_budget:
+                stats.truncated = True
+                break
+            batch_started = time.perf_counter()
+            batch = documents[start:start + self.batch_size]
+            scores[start:start + len(batch)] = self.model.predict(
+                [(query, document) for document in batch], batch_size=len(batch), show_progress_bar=False
+            )
+            batch_seconds = time.perf_counter() - batch_started
+            stats.batches += 1
+            stats.scored += len(batch)
+        stats.seconds = time.perf_counter() - started
+        self.last_stats = stats
+        if stats.truncated:
+            metrics.inc("rerank_truncated_total")
+        return scores
+
+    @metrics.timed("rerank")
+    def rerank(self, query, results, n_results=3, latency_budget=_DEFAULT):
+        """
+        Re-orders search results by cross-encoder score and keeps the top n_results.
+
+        Args:
+            query (str): The query the results were retrieved for.
+            results (dict): Single-query results as returned by
+                HomeMatchDB.search_listings or search_by_preferences.
+            n_results (int): Number of listings to keep.
+            latency_budget (float): Seconds allowed for scoring in this call;
+                None for no limit. Defaults to the reranker's latency_budget.
+
+        Returns:
+            dict: Results in the same shape, plus ``rerank_scores`` (NaN for
+            candidates the budget didn't reach). ``distances`` keep their
+            first-stage values.
+        """
+        if not results or not results.get('ids') or not results['ids'][0]:
+            self.last_stats = RerankStats()
+            return results
+        scores = self.score(query, results['documents'][0], latency_budget)
+        scored = np.flatnonzero(~np.isnan(scores))
+        unscored = np.flatnonzero(np.isnan(scores))
+        # Stable sort keeps first-stage order between equal scores
+        order = np.concatenate([scored[np.argsort(-scores[scored], kind="stable")], unscored])[:n_results]
+        reranked = {key: [[results[key][0][i] for i in order]] for key in RESULT_KEYS if results.get(key)}
+        reranked['rerank_scores'] = [[float(scores[i]) for i in order]]
+        return reranked
+
+    def search(self, db, query, n_results=3, filters=None):
+        """Over-fetches candidates with db.search_listings and re-ranks them."""
+        results = db.search_listings(query, n_results=max(self.candidates, n_results), filters=filters)
+        return self.rerank(query, results, n_results)
+
+    def search_by_preferences(self, db, preferences, n_results=3, filters=None):
+        """Over-fetches candidates with db.search_by_preferences and re-ranks them against the query string."""
+        results = db.search_by_preferences(preferences, n_results=max(self.candidates, n_results), filters=filters)
+        return self.rerank(preferences.query_string, results, n_results)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_reranking(db, labelled_queries, reranker, n_results=3, candidate_counts=(10, 20, 50),
+                        latency_budgets=(None,)):
+    """
+    Measures precision@n_results and latency with and without re-ranking.
+
+    Args:
+        db (HomeMatchDB): Database to search.
+        labelled_queries (list): (query, relevant listing ids) pairs.
+        reranker (CrossEncoderReranker): Re-ranker to evaluate.
+        n_results (int): Cut-off for precision.
+        candidate_counts (iterable): First-stage candidate counts to try.
+        latency_budgets (iterable): Budgets in seconds to try (None: unlimited).
+
+    Returns:
+        list: One dict per configuration, the bi-encoder baseline first, with
+        ``precision``, ``p50_ms`` / ``p95_ms`` end-to-end search latency and the
+        fraction of queries whose re-ranking was ``truncated`` by the budget.
+    """
+    def evaluate(label, search):
+        hits, latencies, truncated = [], [], 0
+        for query, relevant in labelled_queries:
+            started = time.perf_counter()
+            results, was_truncated = search(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            truncated += was_truncated
+            top = results['ids'][0][:n_results] if results and results['ids'] else []
+            hits.append(len(set(top) & set(relevant)) / n_results)
+        return {
+            **label,
+            "precision": round(statistics.mean(hits), 4),
+            "p50_ms": round(_percentile(latencies, 0.5), 3),
+            "p95_ms": round(_percentile(latencies, 0.95), 3),
+            "truncated": round(truncated / len(labelled_queries), 4),
+        }
+
+    # Load both models before timing anything
+    db.warm_up()
+    reranker.model.predict([("warm up", "warm up")], show_progress_bar=False)
+
+    rows = [evaluate({"candidates": n_results, "latency_budget_ms": None, "reranked": False},
+                     lambda query: (db.search_listings(query, n_results=n_results), False))]
+    for candidates in candidate_counts:
+        for budget in latency_budgets:
+            def search(query):
+                results = db.search_listings(query, n_results=candidates)
+                reranked = reranker.rerank(query, results, n_results, latency_budget=budget)
+                return reranked, reranker.last_stats.truncated
+            rows.append(evaluate({
+                "candidates": candidates,
+                "latency_budget_ms": budget * 1000 if budget else None,
+                "reranked": True,
+            }, search))
+    return rows
+
+
+if __name__ == "__main__":
+    from database import HomeMatchDB
+
+    arg_parser = argparse.ArgumentParser(description="Compare search quality and latency with cross-encoder re-ranking.")
+    arg_parser.add_argument("labels", help='JSON file of [{"query": str, "relevant": [listing ids]}, ...]')
+    arg_parser.add_argument("--db-path", default="./chroma_db")
+    arg_parser.add_argument("--model", default=RERANKER_MODEL)
+    arg_parser.add_argument("--n-results", type=int, default=3)
+    arg_parser.add_argument("--candidates", type=int, nargs="+", default=[10, 20, 50])
+    arg_parser.add_argument("--budget-ms", type=float, nargs="+", default=[0.0, RERANK_LATENCY_BUDGET_MS],
+                            help="Latency budgets to try; 0 means unlimited.")
+    arg_parser.add_argument("--batch-size", type=int, default=16)
+    args = arg_parser.parse_args()
+
+    with open(args.labels) as f:
+        labelled = [(item["query"], item["relevant"]) for item in json.load(f)]
+    database = HomeMatchDB(path=args.db_path)
+    rows = benchmark_reranking(
+        database, labelled, CrossEncoderReranker(args.model, batch_size=args.batch_size),
+        n_results=args.n_results, candidate_counts=args.candidates,
+        latency_budgets=[budget / 1000 if budget else None for budget in args.budget_ms],
+    )
+    database.close()
+    print(f"{'candidates':>10} {'budget_ms':>10} {'P@' + str(args.n_results):>8} {'p50_ms':>9} {'p95_ms':>9} {'truncated':>9}")
+    for row in rows:
+        budget = "-" if row["latency_budget_ms"] is None else f"{row['latency_budget_ms']:.0f}"
+        candidates = row["candidates"] if row["reranked"] else "bi-enc"
+        print(f"{candidates:>10} {budget:>10} {row['precision']:>8.3f} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['truncated']:>9.2%}")
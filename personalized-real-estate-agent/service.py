@@ -0,0 +1,307 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from database import HomeMatchDB
+from listing_filters import ListingFilter
+from metrics import metrics
+from personalizer import ListingPersonalizer
+from preference_parser import PreferenceParser
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batches for a blocking batch handler.
+
+    The first waiting item opens a batch; items arriving within ``max_wait``
+    seconds (or while the previous batch is still running) join it, up to
+    ``max_batch_size``. The handler runs on the given executor. If it fails on
+    a batch of several items, each item is retried on its own, so only the
+    items that cause the failure get the error.
+
+    Args:
+        handler (callable): Takes a list of items and returns a list of results
+            in the same order.
+        max_batch_size (int): Largest batch passed to the handler.
+        max_wait (float): Seconds to wait for more items after the first one.
+        executor (Executor): Where the handler runs; the loop's default if None.
+    """
+
+    def __init__(self, handler, max_batch_size=32, max_wait=0.005, executor=None):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._task = None
+
+    @property
+    def mean_batch_size(self):
+        return self.items / self.batches if self.batches else 0.0
+
+    async def submit(self, item):
+        """Queues an item and waits for its result."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            self.batches += 1
+            self.items += len(items)
+            try:
+                results = await loop.run_in_executor(self.executor, self.handler, items)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._settle(batch[0][1], error=e)
+                    continue
+                for item, future in batch:
+                    try:
+                        [result] = await loop.run_in_executor(self.executor, self.handler, [item])
+                    except Exception as item_error:
+                        self._settle(future, error=item_error)
+                    else:
+                        self._settle(future, result)
+                continue
+            for (_, future), result in zip(batch, results):
+                self._settle(future, result)
+
+    @staticmethod
+    def _settle(future, result=None, error=None):
+        # The request may have been cancelled while its batch was running
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+DB = web.AppKey("db", HomeMatchDB)
+PERSONALIZER = web.AppKey("personalizer", ListingPersonalizer)
+EXECUTOR = web.AppKey("executor", ThreadPoolExecutor)
+SEARCH_BATCHER = web.AppKey("search_batcher", MicroBatcher)
+LLM_SEMAPHORE = web.AppKey("llm_semaphore", asyncio.Semaphore)
+
+
+def _format_results(results):
+    return [
+        {"id": listing_id, "distance": distance, "listing": metadata, "document": document}
+        for listing_id, distance, metadata, document in zip(
+            results['ids'][0], results['distances'][0], results['metadatas'][0], results['documents'][0]
+        )
+    ]
+
+
+def _parse_n_results(body, default):
+    n_results = body.get("n_results", default)
+    # bool is an int subclass, but true/false is no count
+    if isinstance(n_results, bool) or not isinstance(n_results, int) or n_results < 1:
+        raise web.HTTPBadRequest(text="'n_results' must be a positive integer")
+    return n_results
+
+
+def _parse_filter(body):
+    filters = body.get("filters") or {}
+    if not isinstance(filters, dict):
+        raise web.HTTPBadRequest(text="Invalid filters: 'filters' must be a JSON object")
+    for name, bound in filters.items():
+        # A string or object bound would only fail later, inside the shared search batch
+        if bound is not None and (isinstance(bound, bool) or not isinstance(bound, (int, float))):
+            raise web.HTTPBadRequest(text=f"Invalid filters: {name!r} must be a number")
+    try:
+        return ListingFilter(**filters)
+    except TypeError as e:
+        raise web.HTTPBadRequest(text=f"Invalid filters: {e}")
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
+
+
+def _search_batch(db, items):
+    # One encoder call and one collection query for every search in the batch
+    queries = [query for query, _, _ in items]
+    filters = [listing_filter for _, _, listing_filter in items]
+    results = db.search_listings_batch(queries, n_results=max(n for _, n, _ in items), filters=filters)
+    return [
+        {key: [result[key][0][:n_results]] for key in ('ids', 'documents', 'metadatas', 'distances')}
+        for result, (_, n_results, _) in zip(results, items)
+    ]
+
+
+async def search(request):
+    """POST /search {"query": str, "n_results": int, "filters": {...}}"""
+    body = await _read_json(request)
+    query = body.get("query")
+    if not query:
+        raise web.HTTPBadRequest(text="'query' is required")
+    n_results = _parse_n_results(body, 5)
+    results = await request.app[SEARCH_BATCHER].submit((query, n_results, _parse_filter(body)))
+    return web.json_response({"results": _format_results(results)})
+
+
+async def personalize(request):
+    """POST /personalize {"listing": {...}, "preferences": str}"""
+    body = await _read_json(request)
+    listing = body.get("listing")
+    preferences = body.get("preferences")
+    if not isinstance(listing, dict) or not preferences:
+        raise web.HTTPBadRequest(text="'listing' and 'preferences' are required")
+    missing = [field for field in ("description", "neighborhood_description") if field not in listing]
+    if missing:
+        raise web.HTTPBadRequest(text=f"'listing' is missing {', '.join(missing)}")
+    description = await request.app[PERSONALIZER].apersonalize_listing(
+        listing, preferences, request.app[LLM_SEMAPHORE]
+    )
+    return web.json_response({"description": description})
+
+
+async def match(request):
+    """POST /match {"answers": [str, ...], "n_results": int, "filters": {...}}: search then personalize."""
+    body = await _read_json(request)
+    parser = PreferenceParser()
+    answers = body.get("answers")
+    if answers is not None:
+        if not isinstance(answers, list) or len(answers) != len(parser.questions):
+            raise web.HTTPBadRequest(text=f"'answers' must list one answer per question: {parser.questions}")
+        parser.answers = [str(answer) for answer in answers]
+    preferences = parser.extract_preferences()
+    n_results = _parse_n_results(body, 3)
+
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(
+        request.app[EXECUTOR], request.app[DB].search_by_preferences,
+        preferences, n_results, _parse_filter(body),
+    )
+    matches = _format_results(results)
+    personalizer = request.app[PERSONALIZER]
+    descriptions = await asyncio.gather(*(
+        personalizer.apersonalize_listing(item["listing"], preferences.query_string, request.app[LLM_SEMAPHORE])
+        for item in matches
+    ))
+    for item, description in zip(matches, descriptions):
+        item["personalized_description"] = description
+    return web.json_response({"preferences": preferences.query_string, "results": matches})
+
+
+async def health(request):
+    batcher = request.app[SEARCH_BATCHER]
+    return web.json_response({
+        "status": "ok",
+        "search_batches": batcher.batches,
+        "mean_search_batch_size": round(batcher.mean_batch_size, 2),
+    })
+
+
+async def metrics_endpoint(request):
+    """GET /metrics: Prometheus text, or JSON with ?format=json."""
+    if request.query.get("format") == "json":
+        return web.json_response(metrics.snapshot())
+    return web.Response(text=metrics.to_prometheus(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Metrics-Enabled": str(metrics.enabled).lower()})
+
+
+def create_app(db=None, personalizer=None, max_batch_size=32, max_wait=0.005, warm_up=True):
+    """
+    Builds the HomeMatch web application.
+
+    The database, encoder and personalizer are created once and shared by
+    every request. All database and encoder work runs on a single worker
+    thread, fed by a MicroBatcher so that concurrent searches share one
+    ``model.encode`` call and one collection query.
+
+    Args:
+        db (HomeMatchDB): Database to serve; a default HomeMatchDB if None.
+        personalizer (ListingPersonalizer): Personalizer to use; a default one if None.
+        max_batch_size (int): Most searches answered by one batch.
+        max_wait (float): Seconds a search waits for others to batch with.
+        warm_up (bool): Load the encoder and open the collection at startup
+            instead of on the first request.
+
+    Returns:
+        web.Application: The application, ready for web.run_app.
+    """
+    app = web.Application()
+    app[DB] = db or HomeMatchDB()
+    app[PERSONALIZER] = personalizer or ListingPersonalizer()
+    app[EXECUTOR] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="homematch-db")
+    app[SEARCH_BATCHER] = MicroBatcher(
+        lambda items: _search_batch(app[DB], items),
+        max_batch_size=max_batch_size, max_wait=max_wait, executor=app[EXECUTOR],
+    )
+
+    async def on_startup(app):
+        app[LLM_SEMAPHORE] = asyncio.Semaphore(app[PERSONALIZER].max_concurrency)
+        if warm_up:
+            await asyncio.get_running_loop().run_in_executor(app[EXECUTOR], app[DB].warm_up)
+
+    async def on_cleanup(app):
+        await app[SEARCH_BATCHER].close()
+        await asyncio.get_running_loop().run_in_executor(app[EXECUTOR], app[DB].close)
+        app[EXECUTOR].shutdown()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/search", search)
+    app.router.add_post("/personalize", personalize)
+    app.router.add_post("/match", match)
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve HomeMatch search and personalization over HTTP.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--max-batch-size", type=int, default=32)
+    arg_parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                            help="How long a search waits for others to share its encoder batch.")
+    args = arg_parser.parse_args()
+    web.run_app(
+        create_app(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000),
+        host=args.host, port=args.port,
+    )
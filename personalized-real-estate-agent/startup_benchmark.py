@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Each stage runs in a fresh interpreter and prints its own timings, so import
+# caches from earlier stages can't flatter later ones
+STAGE_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+import database
+import HomeMatch
+imported = time.perf_counter()
+db = database.HomeMatchDB(path=sys.argv[1])
+constructed = time.perf_counter()
+db.model.encode(["warm up"])
+model_loaded = time.perf_counter()
+db.model.encode(["three-bedroom family home near good schools"])
+first_query = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "construct_s": constructed - imported,
+    "model_load_s": model_loaded - constructed,
+    "query_s": first_query - model_loaded,
+    "total_s": first_query - started,
+}))
+"""
+
+# Constructs a HomeMatchDB with ANN_INDEX_PATH pointing at an unreadable file and
+# counts index loads; the index should only be read by the first search
+LAZY_INDEX_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import database
+loads = []
+load_index = database.load_index
+database.load_index = lambda path: loads.append(path) or load_index(path)
+imported = time.perf_counter()
+db = database.HomeMatchDB(path=sys.argv[1])
+constructed = time.perf_counter()
+print(json.dumps({"construct_s": constructed - imported, "index_loads": len(loads)}))
+"""
+
+
+def run_stage(backend, onnx_file, db_path):
+    env = dict(os.environ, EMBEDDING_BACKEND=backend)
+    if onnx_file:
+        env["EMBEDDING_ONNX_FILE"] = onnx_file
+    output = subprocess.run(
+        [sys.executable, "-c", STAGE_SCRIPT, db_path], cwd=HERE, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_lazy_ann_index(db_path):
+    """
+    Checks that constructing a HomeMatchDB does no ANN index I/O.
+
+    ANN_INDEX_PATH points at a file that isn't a valid index, so construction
+    would fail if it read it.
+
+    Returns:
+        dict: Construction time in seconds and the number of index loads (expected 0).
+
+    Raises:
+        RuntimeError: If the constructor loaded the index.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = os.path.join(tmp_dir, "ann.npz")
+        with open(index_path, "wb") as f:
+            f.write(b"not an index")
+        output = subprocess.run(
+            [sys.executable, "-c", LAZY_INDEX_SCRIPT, db_path], cwd=HERE,
+            env=dict(os.environ, ANN_INDEX_PATH=index_path), capture_output=True, text=True, check=True,
+        ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    if result["index_loads"]:
+        raise RuntimeError("HomeMatchDB() loaded the ANN index at construction")
+    return result
+
+
+def benchmark(backends, repeat=3, db_path="./chroma_db"):
+    """
+    Measures cold-start time per encoder backend, in fresh processes.
+
+    Args:
+        backends (list): (backend, onnx_file) pairs, e.g. ("torch", None) or
+            ("onnx", "onnx/model_qint8_avx512_vnni.onnx").
+        repeat (int): Runs per backend; the median of each stage is reported.
+        db_path (str): ChromaDB directory the HomeMatchDB points at.
+
+    Returns:
+        dict: Median stage timings in seconds, keyed by backend label.
+    """
+    results = {}
+    for backend, onnx_file in backends:
+        label = f"{backend}:{onnx_file}" if onnx_file else backend
+        try:
+            runs = [run_stage(backend, onnx_file, db_path) for _ in range(repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"Skipping {label}: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        results[label] = {stage: statistics.median(run[stage] for run in runs) for stage in runs[0]}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure HomeMatch cold-start time.")
+    parser.add_argument("--backend", action="append", default=None,
+                        help="Encoder backend to measure, optionally as backend:onnx_file "
+                             "(repeatable; default: torch and onnx).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db-path", default="./chroma_db")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    lazy_index = check_lazy_ann_index(args.db_path)
+    if not args.json:
+        print(f"HomeMatchDB() with ANN_INDEX_PATH set: {lazy_index['index_loads']} index loads, "
+              f"constructed in {lazy_index['construct_s'] * 1000:.1f} ms")
+
+    backends = [tuple((spec.split(":", 1) + [None])[:2]) for spec in (args.backend or ["torch", "onnx"])]
+    results = benchmark(backends, repeat=args.repeat, db_path=args.db_path)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for label, stages in results.items():
+            print(f"{label:<40} " + "  ".join(f"{stage} {seconds:6.2f}" for stage, seconds in stages.items()))
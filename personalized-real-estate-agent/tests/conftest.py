@@ -0,0 +1,83 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from database import HomeMatchDB
+from metrics import metrics
+from personalizer import ListingPersonalizer
+
+
+@pytest.fixture(scope="module")
+def listings_file(tmp_path_factory):
+    # The two listings of test_database.py's setup_test_listings, as a file path for the newer test modules
+    test_data = [
+        {
+            "neighborhood": "Quiet Meadows",
+            "price": 500000,
+            "bedrooms": 3,
+            "bathrooms": 2,
+            "house_size": 1800,
+            "description": "A cozy family home in a peaceful neighborhood with a large backyard.",
+            "neighborhood_description": "Quiet Meadows is known for its excellent schools and family-friendly parks."
+        },
+        {
+            "neighborhood": "City Central",
+            "price": 750000,
+            "bedrooms": 2,
+            "bathrooms": 2,
+            "house_size": 1200,
+            "description": "Modern downtown apartment with great city views, perfect for urban living.",
+            "neighborhood_description": "City Central offers vibrant nightlife, restaurants, and easy access to public transport."
+        }
+    ]
+    path = tmp_path_factory.mktemp("listings") / "test_listings.json"
+    path.write_text(json.dumps(test_data, indent=4))
+    return str(path)
+
+
+def _fake_encode(texts, **kwargs):
+    # Deterministic stand-in for SentenceTransformer.encode
+    import numpy as np
+    if isinstance(texts, str):
+        return _fake_encode([texts])[0]
+    return np.array([[len(text) % 7 + 1.0, text.count("e") + 1.0, 1.0] for text in texts])
+
+
+@pytest.fixture
+def fake_model_db(tmp_path):
+    with patch('database.SentenceTransformer') as mock_sentence_transformer:
+        mock_sentence_transformer.return_value.encode.side_effect = _fake_encode
+        mock_sentence_transformer.return_value.get_sentence_embedding_dimension.return_value = 3
+        mock_sentence_transformer.return_value.encode_multi_process.side_effect = \
+            lambda texts, pool, **kwargs: _fake_encode(texts)
+        yield HomeMatchDB(path=str(tmp_path / "chroma_db"))
+
+
+def _echo_description(messages):
+    prompt = messages[-1]['content']
+    return "Personalized " + prompt.split("Original description ")[1].split(".")[0]
+
+
+@pytest.fixture
+def fake_server_personalizer(monkeypatch):
+    from fake_openai_server import FakeOpenAIServer
+
+    def make(**server_kwargs):
+        server = FakeOpenAIServer(responder=_echo_description, **server_kwargs).start()
+        servers.append(server)
+        monkeypatch.setattr('personalizer.OPENAI_API_BASE', server.api_base)
+        monkeypatch.setattr('personalizer.OPENAI_API_KEY', "test-key")
+        return server, ListingPersonalizer(max_concurrency=4, backoff_base=0.01)
+
+    servers = []
+    yield make
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def fresh_metrics():
+    metrics.reset()
+    yield metrics
+    metrics.reset()
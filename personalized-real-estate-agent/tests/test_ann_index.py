@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+import pytest
+
+from ann_index import ANNIndex, ExactIndex, HNSWIndex, IVFFlatIndex, load_index, recall_at_k
+
+
+@pytest.fixture(scope="module")
+def clustered_vectors():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 16))
+    vectors = centers[rng.integers(0, len(centers), 1000)] + 0.2 * rng.normal(size=(1000, 16))
+    queries = vectors[:50] + 0.01 * rng.normal(size=(50, 16))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+@pytest.mark.parametrize("make_index", [
+    lambda dim: IVFFlatIndex(dim, n_lists=16, n_probe=4),
+    lambda dim: HNSWIndex(dim, m=8, ef_construction=64, ef_search=64),
+])
+def test_recall_against_exact_search(clustered_vectors, make_index):
+    vectors, queries = clustered_vectors
+    index = make_index(vectors.shape[1]).build(vectors, ids=range(len(vectors)))
+
+    report = recall_at_k(index, vectors, queries, k=10)
+
+    assert report["recall"] >= 0.9
+    ids, distances = index.search(queries[0], k=5)
+    assert len(ids) == 5
+    assert list(distances) == sorted(distances)
+
+
+@pytest.mark.parametrize("make_index", [
+    lambda dim: ExactIndex(dim, metric="cosine"),
+    lambda dim: IVFFlatIndex(dim, n_lists=8, n_probe=8, metric="cosine"),
+    lambda dim: HNSWIndex(dim, m=8, metric="cosine"),
+])
+def test_incremental_add_remove_and_save_load(clustered_vectors, make_index, tmp_path):
+    vectors, _ = clustered_vectors
+    ids = [f"listing_{i}" for i in range(200)]
+    index = make_index(vectors.shape[1])
+    if isinstance(index, IVFFlatIndex):
+        index.train(vectors[:200])
+    index.add(vectors[:100], ids=ids[:100])
+    index.add(vectors[100:200], ids=ids[100:])
+    assert len(index) == 200
+
+    found, distances = index.search(vectors[150], k=1)
+    assert found == ["listing_150"]
+    assert distances[0] == pytest.approx(0.0, abs=1e-5)
+
+    # Removing or re-adding an ID hides its old vector from searches
+    index.remove(["listing_150"])
+    index.add(vectors[7:8], ids=["listing_3"])
+    assert len(index) == 199
+    assert "listing_150" not in index.search(vectors[150], k=5)[0]
+    assert index.search(vectors[7], k=2)[0][:2] in (["listing_7", "listing_3"], ["listing_3", "listing_7"])
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = load_index(path)
+    assert type(loaded) is type(index)
+    assert len(loaded) == 199
+    assert loaded.search(vectors[42], k=3)[0] == index.search(vectors[42], k=3)[0]
+
+
+def test_index_missing_a_method_fails_on_construction():
+    class AddOnlyIndex(ANNIndex):
+        def add(self, vectors, ids=None):
+            self._append(self._prepare(vectors), ids)
+
+    with pytest.raises(TypeError):
+        ANNIndex(4)
+    with pytest.raises(TypeError):
+        AddOnlyIndex(4)
+
+
+def test_auto_assigned_ids_stay_unique_after_compaction(clustered_vectors, tmp_path):
+    vectors, _ = clustered_vectors
+    index = ExactIndex(vectors.shape[1])
+    index.add(vectors[:10])
+    index.remove([0])
+    index.compact()
+    index.add(vectors[10:15])
+
+    assert len(index) == 14
+    assert sorted(index.ids) == list(range(1, 15))
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = load_index(path)
+    loaded.add(vectors[15:16])
+    assert loaded.search(vectors[15], k=1)[0] == [15]
+
+
+@pytest.mark.parametrize("make_index", [
+    lambda dim: ExactIndex(dim),
+    lambda dim: IVFFlatIndex(dim, n_lists=16, n_probe=4),
+    lambda dim: HNSWIndex(dim, m=8, ef_construction=32, ef_search=32),
+])
+def test_resyncing_the_same_ids_keeps_the_index_flat(clustered_vectors, make_index):
+    vectors, queries = clustered_vectors
+    vectors, queries = vectors[:300], queries[:20]
+    ids = [f"listing_{i}" for i in range(len(vectors))]
+    index = make_index(vectors.shape[1])
+    if isinstance(index, IVFFlatIndex):
+        index.train(vectors)
+
+    def search_seconds():
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query, k=5)
+        return time.perf_counter() - started
+
+    index.add(vectors, ids=ids)
+    first_search_seconds = min(search_seconds() for _ in range(3))
+    expected = [index.search(query, k=5)[0] for query in queries]
+
+    # Every sync re-upserts the same IDs chunk by chunk, unchanged
+    for _ in range(10):
+        for start in range(0, len(ids), 50):
+            index.add(vectors[start:start + 50], ids=ids[start:start + 50])
+    assert len(index) == len(vectors)
+    assert index._size == len(vectors)
+    assert index._n_deleted == 0
+    assert [index.search(query, k=5)[0] for query in queries] == expected
+    assert min(search_seconds() for _ in range(3)) < 3 * first_search_seconds + 0.01
+
+    # Changed vectors replace the old ones, and tombstones get compacted away
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        index.add(vectors + 0.01 * rng.normal(size=vectors.shape).astype(np.float32), ids=ids)
+    assert len(index) == len(vectors)
+    if not index.auto_compact:
+        # HNSW keeps its tombstones until compacted offline
+        assert index._n_deleted == 5 * len(vectors)
+        index.compact()
+    assert index._size <= (1 + index.compact_fraction) * len(vectors)
+    assert index._n_deleted <= index.compact_fraction * index._size
+    assert index.search(index.vectors[index._positions["listing_7"]], k=1)[0] == ["listing_7"]
@@ -89,3 +89,285 @@ def test_search_listings(mock_sentence_transformer, homedb_instance, setup_test_
 
     assert len(search_results['metadatas'][0]) == 1
     assert search_results['metadatas'][0][0]['neighborhood'] == "Quiet Meadows"
+
+
+def test_ingest_listings_in_chunks(fake_model_db, setup_test_listings):
+    stats = fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, chunk_size=1,
+                                          num_workers=1, progress=False)
+
+    assert stats.listings == 2
+    assert stats.chunks == 2
+    assert fake_model_db.collection.count() == 2
+    results = fake_model_db.collection.get(ids=["listing_1"], include=['metadatas', 'embeddings'])
+    assert results['metadatas'][0]['neighborhood'] == "City Central"
+    assert len(results['embeddings'][0]) == 3
+
+    # Re-ingesting upserts in place instead of colliding with existing IDs
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    assert fake_model_db.collection.count() == 2
+
+
+def test_ingest_listings_uses_process_pool(fake_model_db, setup_test_listings):
+    model = fake_model_db.model
+    stats = fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=2,
+                                          progress=False)
+
+    model.start_multi_process_pool.assert_called_once_with(target_devices=["cpu", "cpu"])
+    model.encode_multi_process.assert_called_once()
+    model.stop_multi_process_pool.assert_called_once()
+    assert stats.as_dict()["listings"] == 2
+
+
+def test_sync_listings_only_touches_changes(fake_model_db, setup_test_listings, tmp_path):
+    stats = fake_model_db.sync_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    assert (stats.listings, stats.unchanged, stats.deleted) == (2, 0, 0)
+
+    with open(TEST_LISTINGS_FILE) as f:
+        listings = json.load(f)
+    listings[1]["price"] = 725000
+    listings.append(dict(listings[0], neighborhood="Pine Hollow"))
+    updated_file = tmp_path / "updated_listings.json"
+    updated_file.write_text(json.dumps(listings))
+
+    fake_model_db.model.encode.reset_mock()
+    stats = fake_model_db.sync_listings(listings_file=str(updated_file), num_workers=1, progress=False)
+
+    assert (stats.listings, stats.unchanged, stats.deleted) == (2, 1, 1)
+    assert len(fake_model_db.model.encode.call_args[0][0]) == 2
+    results = fake_model_db.collection.get(include=['metadatas'])
+    assert len(results['ids']) == 3
+    for listing_id, metadata in zip(results['ids'], results['metadatas']):
+        assert metadata['content_hash'] == listing_id
+    assert sorted(m['price'] for m in results['metadatas']) == [500000, 500000, 725000]
+
+
+def test_search_uses_embedding_cache(fake_model_db, tmp_path):
+    from embedding_cache import EmbeddingCache
+
+    fake_model_db.embedding_cache = EmbeddingCache(str(tmp_path / "embedding_cache"))
+    fake_model_db._generate_embedding("family home")
+    fake_model_db.model.encode.reset_mock()
+
+    embedding = fake_model_db._generate_embedding("family  home")
+
+    fake_model_db.model.encode.assert_not_called()
+    assert len(embedding) == 3
+
+
+def test_listing_filter_where_clause_and_index():
+    from listing_filters import ListingFilter, NumericFieldIndex
+
+    listing_filter = ListingFilter(max_price=600000, min_bedrooms=3)
+    assert listing_filter.to_where() == {"$and": [{"price": {"$lte": 600000}}, {"bedrooms": {"$gte": 3}}]}
+    assert ListingFilter(min_bedrooms=2).to_where() == {"bedrooms": {"$gte": 2}}
+    assert ListingFilter().to_where() is None
+
+    metadatas = [
+        {"price": 500000, "bedrooms": 3},
+        {"price": 550000, "bedrooms": 2},
+        {"price": 600000, "bedrooms": 4},
+        {"price": 650000, "bedrooms": 5},
+    ]
+    index = NumericFieldIndex(["a", "b", "c", "d"], metadatas)
+    assert index.candidate_ids(listing_filter) == ["a", "c"]
+    assert index.candidate_ids(ListingFilter(min_price=700000)) == []
+    assert [m for m in metadatas if listing_filter.matches(m)] == [metadatas[0], metadatas[2]]
+
+
+@pytest.mark.parametrize("exact_search_threshold", [5000, 0])
+def test_search_listings_with_filters(fake_model_db, setup_test_listings, exact_search_threshold):
+    from listing_filters import ListingFilter
+
+    fake_model_db.EXACT_SEARCH_THRESHOLD = exact_search_threshold
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+
+    results = fake_model_db.search_listings("family home", n_results=2,
+                                            filters=ListingFilter(min_price=600000))
+    assert [m['neighborhood'] for m in results['metadatas'][0]] == ["City Central"]
+
+    results = fake_model_db.search_listings("family home", n_results=2,
+                                            filters=ListingFilter(min_bedrooms=3, max_price=500000))
+    assert [m['neighborhood'] for m in results['metadatas'][0]] == ["Quiet Meadows"]
+
+
+def test_search_listings_filter_without_candidates(fake_model_db, setup_test_listings):
+    from listing_filters import ListingFilter
+
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    results = fake_model_db.search_listings("family home", filters=ListingFilter(min_bedrooms=10))
+
+    assert results['metadatas'] == [[]]
+
+
+def test_search_by_preferences_filters_and_scores_facets(fake_model_db, setup_test_listings):
+    from listing_filters import ListingFilter
+    from preference_parser import BuyerPreferences, PreferenceFacet
+
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    preferences = BuyerPreferences(
+        filters=ListingFilter(min_bedrooms=2),
+        facets=[PreferenceFacet("priorities", "good schools", 2.0), PreferenceFacet("urbanity", "city views")],
+        query_string="good schools, city views",
+    )
+
+    results = fake_model_db.search_by_preferences(preferences, n_results=2)
+    assert len(results['metadatas'][0]) == 2
+    assert results['distances'][0] == sorted(results['distances'][0])
+
+    # Facet embeddings are computed once and reused by later searches
+    fake_model_db.model.encode.reset_mock()
+    results = fake_model_db.search_by_preferences(preferences, n_results=2,
+                                                  filters=ListingFilter(min_price=600000))
+    fake_model_db.model.encode.assert_not_called()
+    assert [m['neighborhood'] for m in results['metadatas'][0]] == ["City Central"]
+
+    # Large candidate sets pool each facet's nearest neighbours instead
+    fake_model_db.EXACT_SEARCH_THRESHOLD = 0
+    results = fake_model_db.search_by_preferences(preferences, n_results=2,
+                                                  filters=ListingFilter(min_price=600000))
+    assert [m['neighborhood'] for m in results['metadatas'][0]] == ["City Central"]
+
+
+@pytest.mark.parametrize("kind", ["hnsw", "ivf"])
+def test_search_listings_uses_ann_index(fake_model_db, setup_test_listings, tmp_path, kind):
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    expected = fake_model_db.search_listings("family home", n_results=2)
+
+    params = {"n_lists": 2, "n_probe": 2} if kind == "ivf" else {}
+    index = fake_model_db.build_ann_index(kind=kind, path=str(tmp_path / "ann.npz"), **params)
+    results = fake_model_db.search_listings("family home", n_results=2)
+
+    assert results['ids'] == expected['ids']
+    assert results['metadatas'] == expected['metadatas']
+    assert results['distances'][0] == pytest.approx(expected['distances'][0], rel=1e-4)
+
+    # Later ingests keep the index in step with the collection
+    fake_model_db.sync_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    assert len(index) == fake_model_db.collection.count()
+    assert os.path.exists(tmp_path / "ann.npz")
+
+
+def test_ann_index_file_is_resaved_by_later_instances(fake_model_db, setup_test_listings, tmp_path, monkeypatch):
+    path = str(tmp_path / "ann.npz")
+    monkeypatch.setattr('database.ANN_INDEX_PATH', path)
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    fake_model_db.build_ann_index(kind="hnsw", path=path)
+
+    # A second process syncs a file with one listing dropped and one added
+    with open(TEST_LISTINGS_FILE) as f:
+        listings = json.load(f)
+    listings = [listings[0], dict(listings[0], neighborhood="Pine Hollow")]
+    updated_file = tmp_path / "updated_listings.json"
+    updated_file.write_text(json.dumps(listings))
+    syncing_db = HomeMatchDB(path=fake_model_db.path)
+    assert syncing_db.ann_index_path == path
+    syncing_db.sync_listings(listings_file=str(updated_file), num_workers=1, progress=False)
+
+    # A third one loads the index as the second left it
+    reloaded = HomeMatchDB(path=fake_model_db.path)
+    assert sorted(reloaded.ann_index.ids[p] for p in reloaded.ann_index._positions.values()) == \
+        sorted(reloaded.collection.get(include=[])['ids'])
+    results = reloaded.search_listings("family home", n_results=5)
+    assert sorted(m['neighborhood'] for m in results['metadatas'][0]) == ["Pine Hollow", "Quiet Meadows"]
+
+
+def test_build_ann_index_on_an_empty_collection(fake_model_db, setup_test_listings):
+    with pytest.raises(ValueError, match="collection is empty"):
+        fake_model_db.build_ann_index(kind="ivf", n_lists=2)
+    assert fake_model_db.ann_index is None
+
+    # HNSW builds incrementally, so it can start empty and fill up during ingestion
+    index = fake_model_db.build_ann_index(kind="hnsw")
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    assert len(index) == 2
+    assert fake_model_db.search_listings("family home", n_results=1)['ids'][0]
+
+
+def test_search_listings_uses_quantized_index(fake_model_db, setup_test_listings):
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    expected = fake_model_db.search_listings("family home", n_results=2)
+
+    index = fake_model_db.build_quantized_index(quantizer="sq8", rerank=10)
+    results = fake_model_db.search_listings("family home", n_results=2)
+
+    assert index.compression_ratio >= 1
+    assert results['ids'] == expected['ids']
+    assert results['distances'][0] == pytest.approx(expected['distances'][0], rel=1e-4)
+
+
+@pytest.mark.parametrize("build", [
+    lambda db, path: db.build_ann_index(kind="hnsw", path=path),
+    lambda db, path: db.build_quantized_index(quantizer="sq8", rerank=10, path=path),
+])
+def test_search_skips_listings_deleted_since_the_index_was_saved(fake_model_db, setup_test_listings, tmp_path,
+                                                                 monkeypatch, build):
+    path = str(tmp_path / "ann.npz")
+    monkeypatch.setattr('database.ANN_INDEX_PATH', path)
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    build(fake_model_db, path)
+
+    # Deleted behind the index's back, e.g. by a process that didn't load it
+    fake_model_db.collection.delete(ids=["listing_0"])
+
+    results = HomeMatchDB(path=fake_model_db.path).search_listings("family home", n_results=2)
+    assert results['ids'][0] == ["listing_1"]
+    assert [m['neighborhood'] for m in results['metadatas'][0]] == ["City Central"]
+    assert len(results['distances'][0]) == 1
+
+
+def test_model_and_client_load_lazily_and_stay_warm(tmp_path):
+    import database
+
+    with patch('database.SentenceTransformer') as mock_sentence_transformer:
+        db = HomeMatchDB(path=str(tmp_path / "chroma_db"))
+        mock_sentence_transformer.assert_not_called()
+        assert db._client is None
+
+        assert db.model is mock_sentence_transformer.return_value
+        # Later instances in the same process reuse the loaded model
+        assert HomeMatchDB(path=str(tmp_path / "other_db")).model is db.model
+        mock_sentence_transformer.assert_called_once_with(database.EMBEDDING_MODEL_NAME)
+
+        database.load_embedding_model(backend="onnx", onnx_file="onnx/model_qint8_avx512_vnni.onnx")
+        mock_sentence_transformer.assert_called_with(
+            database.EMBEDDING_MODEL_NAME, backend="onnx",
+            model_kwargs={"file_name": "onnx/model_qint8_avx512_vnni.onnx"},
+        )
+    assert database.embedding_model_key(backend="onnx") == f"{database.EMBEDDING_MODEL_NAME}:onnx"
+
+
+def test_ann_index_file_loads_on_first_search(fake_model_db, setup_test_listings, tmp_path, monkeypatch):
+    import database
+
+    path = str(tmp_path / "ann.npz")
+    fake_model_db.ingest_listings(listings_file=TEST_LISTINGS_FILE, num_workers=1, progress=False)
+    fake_model_db.build_ann_index(kind="hnsw", path=path)
+    monkeypatch.setattr('database.ANN_INDEX_PATH', path)
+
+    with patch('database.load_index', side_effect=database.load_index) as load_index:
+        db = HomeMatchDB(path=fake_model_db.path)
+        load_index.assert_not_called()
+        assert db.ann_index_path == path
+
+        db.search_listings("family home", n_results=1)
+        db.search_listings("family home", n_results=1)
+    load_index.assert_called_once_with(path)
+    assert len(db.ann_index) == 2
+
+
+def test_ingest_and_sync_stream_jsonl_gz(fake_model_db, setup_test_listings, tmp_path):
+    from listing_io import write_listings
+
+    with open(TEST_LISTINGS_FILE) as f:
+        listings = json.load(f)
+    feed = str(tmp_path / "listings.jsonl.gz")
+    write_listings(feed, listings + [{"neighborhood": "Broken", "price": "call us"}])
+
+    stats = fake_model_db.ingest_listings(listings_file=feed, chunk_size=1, num_workers=1, progress=False)
+    assert (stats.listings, stats.skipped, stats.chunks) == (2, 1, 2)
+    assert fake_model_db.collection.count() == 2
+
+    stats = fake_model_db.sync_listings(listings_file=feed, num_workers=1, progress=False)
+    assert (stats.listings, stats.unchanged, stats.deleted, stats.skipped) == (2, 0, 2, 1)
+    stats = fake_model_db.sync_listings(listings_file=feed, num_workers=1, progress=False)
+    assert (stats.listings, stats.unchanged, stats.deleted) == (0, 2, 0)
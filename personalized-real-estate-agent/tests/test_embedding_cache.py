@@ -0,0 +1,150 @@
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+
+
+def _encode(texts):
+    return [np.full(3, len(text), dtype=np.float32) for text in texts]
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "embedding_cache")
+
+
+def test_get_or_compute_only_computes_misses(cache_dir):
+    cache = EmbeddingCache(cache_dir, max_entries=10)
+    compute = MagicMock(side_effect=_encode)
+
+    first = cache.get_or_compute("model-a", ["big backyard", "big  backyard ", "near schools"], compute)
+    second = cache.get_or_compute("model-a", ["near schools", "big backyard"], compute)
+
+    # Whitespace-only differences share an entry, so only two texts are ever embedded
+    compute.assert_called_once_with(["big backyard", "near schools"])
+    assert first.shape == (3, 3) and first.dtype == np.float32
+    np.testing.assert_array_equal(second, first[[2, 0]])
+    assert cache.hits == 2
+
+
+def test_entries_are_keyed_by_model(cache_dir):
+    cache = EmbeddingCache(cache_dir)
+    cache.put("model-a", "quiet street", np.ones(3))
+
+    assert cache.get("model-b", "quiet street") is None
+    np.testing.assert_array_equal(cache.get("model-a", "quiet street"), np.ones(3))
+
+
+def test_lru_eviction_and_persistence(cache_dir):
+    with EmbeddingCache(cache_dir, max_entries=2) as cache:
+        cache.put("m", "one", np.full(3, 1.0))
+        cache.put("m", "two", np.full(3, 2.0))
+        cache.get("m", "one")  # "two" is now least recently used
+        cache.put("m", "three", np.full(3, 3.0))
+
+    reopened = EmbeddingCache(cache_dir, max_entries=2)
+    assert len(reopened) == 2
+    assert reopened.get("m", "two") is None
+    np.testing.assert_array_equal(reopened.get("m", "one"), np.full(3, 1.0))
+    np.testing.assert_array_equal(reopened.get("m", "three"), np.full(3, 3.0))
+
+
+def test_evicted_slot_is_not_reused_before_the_eviction_is_on_disk(cache_dir):
+    cache = EmbeddingCache(cache_dir, max_entries=2)
+    cache.put("model-a", "first", np.full(3, 1.0))
+    cache.put("model-a", "second", np.full(3, 2.0))
+    cache.flush()
+    cache.put("model-a", "third", np.full(3, 3.0))
+
+    # The process dies here, without flush() or close()
+    reopened = EmbeddingCache(cache_dir, max_entries=2)
+
+    assert reopened.get("model-a", "first") is None
+    np.testing.assert_array_equal(reopened.get("model-a", "second"), np.full(3, 2.0))
+    assert reopened.get("model-a", "third") is None
+
+
+def test_dimension_mismatch_raises(cache_dir):
+    cache = EmbeddingCache(cache_dir)
+    cache.put("m", "one", np.ones(3))
+    with pytest.raises(ValueError):
+        cache.put("m", "two", np.ones(4))
+
+
+def test_vector_file_grows_by_doubling_up_to_max_entries(cache_dir):
+    cache = EmbeddingCache(cache_dir, max_entries=5000)
+    cache.put("m", "one", np.ones(3))
+    assert cache.capacity == EmbeddingCache.MIN_CAPACITY
+
+    for i in range(EmbeddingCache.MIN_CAPACITY):
+        cache.put("m", f"text {i}", np.full(3, float(i)))
+    assert cache.capacity == 2 * EmbeddingCache.MIN_CAPACITY
+
+    for i in range(4000):
+        cache.put("m", f"more {i}", np.full(3, float(i)))
+    assert cache.capacity == 5000
+    assert len(cache) == 5000
+    cache.close()
+    assert os.path.getsize(os.path.join(cache_dir, EmbeddingCache.VECTORS_FILE)) == 5000 * 3 * 4
+
+
+def test_flush_appends_changes_instead_of_rewriting_the_index(cache_dir):
+    cache = EmbeddingCache(cache_dir)
+    for i in range(100):
+        cache.put("m", f"text {i}", np.full(3, float(i)))
+    cache.flush()
+    index_path = os.path.join(cache_dir, EmbeddingCache.INDEX_FILE)
+    log_path = os.path.join(cache_dir, EmbeddingCache.LOG_FILE)
+    with open(index_path) as f:
+        index = f.read()
+
+    cache.get("m", "text 0")
+    cache.put("m", "text 100", np.full(3, 100.0))
+    cache.flush()
+    cache.flush()
+
+    with open(index_path) as f:
+        assert f.read() == index
+    with open(log_path) as f:
+        assert len(f.readlines()) == 3  # generation header, touch, put
+
+    reopened = EmbeddingCache(cache_dir, max_entries=100)
+    # "text 0" was used last, so "text 1" is the one evicted
+    assert reopened.get("m", "text 1") is None
+    np.testing.assert_array_equal(reopened.get("m", "text 0"), np.zeros(3))
+    np.testing.assert_array_equal(reopened.get("m", "text 100"), np.full(3, 100.0))
+
+
+def test_long_log_is_folded_into_the_index(cache_dir):
+    cache = EmbeddingCache(cache_dir)
+    cache.put("m", "one", np.ones(3))
+    cache.flush()
+    for _ in range(100):
+        cache.get("m", "one")
+        cache.flush()
+
+    log_path = os.path.join(cache_dir, EmbeddingCache.LOG_FILE)
+    assert not os.path.exists(log_path) or len(open(log_path).readlines()) <= 64
+    np.testing.assert_array_equal(EmbeddingCache(cache_dir).get("m", "one"), np.ones(3))
+
+
+def test_torn_log_write_is_dropped_on_reopen(cache_dir):
+    cache = EmbeddingCache(cache_dir)
+    cache.put("m", "one", np.ones(3))
+    cache.flush()
+    cache.put("m", "two", np.full(3, 2.0))
+    cache.close()
+    with open(os.path.join(cache_dir, EmbeddingCache.LOG_FILE), "a") as f:
+        f.write('["put", "m:')
+
+    reopened = EmbeddingCache(cache_dir)
+    assert len(reopened) == 2
+    reopened.put("m", "three", np.full(3, 3.0))
+    reopened.close()
+
+    again = EmbeddingCache(cache_dir)
+    np.testing.assert_array_equal(again.get("m", "two"), np.full(3, 2.0))
+    np.testing.assert_array_equal(again.get("m", "three"), np.full(3, 3.0))
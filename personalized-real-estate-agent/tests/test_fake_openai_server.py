@@ -0,0 +1,26 @@
+import numpy as np
+import openai
+
+from fake_openai_server import FakeOpenAIServer, hashing_embeddings
+
+
+def test_hashing_embeddings_are_deterministic_and_lexical():
+    embeddings = hashing_embeddings(["quiet garden home", "Quiet home, garden!", "downtown loft"], dim=64)
+
+    assert embeddings.shape == (3, 64) and embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(embeddings[0], embeddings[1])
+    assert embeddings[0] @ embeddings[2] < 0.99
+
+
+def test_embeddings_and_completions_endpoints(monkeypatch):
+    with FakeOpenAIServer(embedding_dim=32, responder=lambda messages: "An answer") as server:
+        monkeypatch.setattr(openai, "api_base", server.api_base)
+        monkeypatch.setattr(openai, "api_key", "test-key")
+
+        response = openai.Embedding.create(input=["a", "b c"], engine="text-embedding-ada-002")
+        completion = openai.Completion.create(model="gpt-3.5-turbo-instruct", prompt="Question?", max_tokens=5)
+
+    vectors = np.array([item["embedding"] for item in response["data"]], dtype=np.float32)
+    np.testing.assert_allclose(vectors, hashing_embeddings(["a", "b c"], 32), atol=1e-6)
+    assert completion["choices"][0]["text"] == "An answer"
@@ -0,0 +1,133 @@
+import json
+import re
+import threading
+
+import openai
+import pytest
+
+import listing_generator
+from fake_openai_server import FakeOpenAIServer
+from listing_generator import (
+    ListingDeduplicator, generate_listings, generate_listings_to_file, parse_listings, validate_listing,
+)
+
+VALID_LISTING = {
+    "neighborhood": "Green Oaks",
+    "price": 800000,
+    "bedrooms": 3,
+    "bathrooms": 2,
+    "house_size": 2000,
+    "description": "Eco-friendly home with solar panels.",
+    "neighborhood_description": "Close-knit community with bike paths.",
+}
+
+
+def test_validate_listing_coerces_and_rejects():
+    assert validate_listing(VALID_LISTING) == VALID_LISTING
+    assert validate_listing(dict(VALID_LISTING, price="$800,000", bedrooms=3.0, extra="x")) == VALID_LISTING
+    assert validate_listing(dict(VALID_LISTING, price=-1)) is None
+    assert validate_listing(dict(VALID_LISTING, bathrooms=2.5)) is None
+    assert validate_listing(dict(VALID_LISTING, description=" ")) is None
+    assert validate_listing({k: v for k, v in VALID_LISTING.items() if k != "house_size"}) is None
+
+
+def test_parse_listings_keeps_valid_entries():
+    reply = "```json\n" + json.dumps({"listings": [VALID_LISTING, {"neighborhood": "Broken"}]}) + "\n```"
+    assert parse_listings(reply) == ([VALID_LISTING], 1)
+    assert parse_listings("Sure! Here you go: " + json.dumps([VALID_LISTING]) + " Enjoy.") == ([VALID_LISTING], 0)
+    assert parse_listings("not json") == ([], 1)
+
+
+def test_deduplicator_catches_near_identical_listings():
+    deduplicator = ListingDeduplicator()
+    listing = dict(VALID_LISTING, description="Eco-friendly home with solar panels, a big garden and a garage.")
+    assert deduplicator.add(listing)
+    assert not deduplicator.add(dict(listing, description="eco-friendly home with SOLAR panels - a big garden and a garage!"))
+    assert not deduplicator.add(dict(listing, price=801000, description=listing["description"] + " Move-in ready."))
+    assert deduplicator.add(dict(listing, neighborhood="Pine Hollow", description="A different home."))
+
+
+@pytest.fixture
+def listing_server(monkeypatch):
+    counter = iter(range(10 ** 6))
+    lock = threading.Lock()
+
+    def responder(messages):
+        count = int(re.search(r"Generate (\d+)", messages[-1]["content"]).group(1))
+        with lock:
+            request_number = next(counter)
+            ids = [next(counter) for _ in range(count)]
+        if request_number == 0:
+            return "I'm sorry, I can't do that."
+        listings = [dict(VALID_LISTING, neighborhood=f"Area {i}", description=f"Home number {i}.") for i in ids]
+        # Every reply also repeats the first listing and includes an invalid entry
+        return json.dumps(listings + [dict(VALID_LISTING, neighborhood="Area 1", description="Home number 1."),
+                                      {"price": "unknown"}])
+
+    server = FakeOpenAIServer(responder=responder).start()
+    monkeypatch.setattr(openai, "api_base", server.api_base)
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    yield server
+    server.stop()
+
+
+def test_generate_listings_retries_only_failed_chunks(listing_server, tmp_path):
+    output_path = tmp_path / "listings.jsonl"
+    stats = generate_listings_to_file(23, str(output_path), chunk_size=5, max_workers=4)
+
+    lines = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert len(lines) == 23 == stats.written
+    assert len({listing["description"] for listing in lines}) == 23
+    # 5 chunks plus one retry for the chunk whose reply wasn't JSON
+    assert stats.requests == 6
+    assert stats.retried_chunks == 1
+    assert stats.invalid >= 5
+
+
+def test_generate_listings_returns_list(listing_server):
+    listings = generate_listings(4, chunk_size=2, max_workers=2)
+    assert len(listings) == 4
+    assert all(validate_listing(listing) == listing for listing in listings)
+
+
+def test_generate_listings_keeps_a_bounded_number_of_chunks_queued(monkeypatch, fresh_metrics):
+    outstanding = 0
+    most_outstanding = 0
+    lock = threading.Lock()
+    calls = iter(range(10 ** 6))
+
+    class CountingExecutor(listing_generator.ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            nonlocal outstanding, most_outstanding
+            with lock:
+                outstanding += 1
+                most_outstanding = max(most_outstanding, outstanding)
+            future = super().submit(*args, **kwargs)
+            future.add_done_callback(lambda _: finished())
+            return future
+
+    def finished():
+        nonlocal outstanding
+        with lock:
+            outstanding -= 1
+
+    def fake_request_chunk(count, theme, model, temperature):
+        call = next(calls)
+        if call == 3:
+            raise RuntimeError("API unavailable")
+        listings = [dict(VALID_LISTING, neighborhood=f"Area {call}-{i}", description=f"Home {call}-{i}.")
+                    for i in range(count)]
+        return listings, 0, {}
+
+    monkeypatch.setattr(listing_generator, "ThreadPoolExecutor", CountingExecutor)
+    monkeypatch.setattr(listing_generator, "_request_chunk", fake_request_chunk)
+
+    written = []
+    stats = listing_generator.generate_listings_streaming(1000, written.append, chunk_size=5, max_workers=2)
+
+    assert len(written) == 1000 == stats.written
+    # 200 chunks, but never more than 2 * max_workers queued or running at once
+    assert most_outstanding <= 4
+    assert stats.failed_requests == 1 and stats.retried_chunks == 1
+    assert {"name": "errors_total", "stage": "generate", "error": "RuntimeError", "value": 1} in \
+        fresh_metrics.snapshot()["counters"]
@@ -0,0 +1,118 @@
+import gzip
+import io
+import json
+import threading
+
+import pytest
+
+from listing_io import ListingWriter, _iter_array, bounded_prefetch, iter_listings, write_listings
+
+LISTINGS = [
+    {"neighborhood": "Quiet Meadows", "price": 500000, "description": 'A "cozy" home, [with] {braces}'},
+    {"neighborhood": "Ünïcode Heights", "price": 750000, "nested": {"a": [1, 2.5, None]}},
+    {"neighborhood": "City Central", "price": 1, "description": ""},
+]
+
+
+@pytest.mark.parametrize("name", ["listings.json", "listings.json.gz", "listings.jsonl", "listings.ndjson.gz"])
+@pytest.mark.parametrize("read_size", [3, 1 << 16])
+def test_write_and_stream_round_trip(tmp_path, name, read_size):
+    path = str(tmp_path / name)
+    assert write_listings(path, iter(LISTINGS)) == 3
+
+    assert list(iter_listings(path, read_size=read_size)) == LISTINGS
+    if name.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert f.read(1) in "[{"
+
+
+def test_iter_listings_reads_indented_arrays_and_detects_format(tmp_path):
+    pretty = tmp_path / "listings.json"
+    pretty.write_text(json.dumps(LISTINGS, indent=4))
+    assert list(iter_listings(str(pretty), read_size=5)) == LISTINGS
+
+    # Format comes from the content, not the extension
+    lines = tmp_path / "actually_lines.json"
+    lines.write_text("\n".join(json.dumps(listing) for listing in LISTINGS) + "\n\n")
+    assert list(iter_listings(str(lines))) == LISTINGS
+
+    (tmp_path / "empty.json").write_text(" [ ] ")
+    assert list(iter_listings(str(tmp_path / "empty.json"))) == []
+
+
+def test_iter_listings_reports_malformed_input(tmp_path):
+    (tmp_path / "truncated.json").write_text('[{"a": 1}, {"a": ')
+    with pytest.raises(ValueError, match="invalid JSON array element"):
+        list(iter_listings(str(tmp_path / "truncated.json")))
+
+    (tmp_path / "bad.jsonl").write_text('{"a": 1}\n{oops}\n')
+    with pytest.raises(ValueError, match="bad.jsonl:2"):
+        list(iter_listings(str(tmp_path / "bad.jsonl")))
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 4])
+def test_iter_listings_waits_for_numbers_split_across_reads(tmp_path, read_size):
+    path = tmp_path / "numbers.json"
+    path.write_text("[2.5, -1e3, 10, true, null, 0.125]")
+
+    assert list(iter_listings(str(path), read_size=read_size)) == [2.5, -1000.0, 10, True, None, 0.125]
+
+
+class CountingReader(io.StringIO):
+    """StringIO that remembers how many characters were read."""
+
+    consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+def test_iter_listings_fails_fast_on_a_bad_element(tmp_path):
+    rest = ", ".join(json.dumps(listing) for listing in LISTINGS * 200)
+    f = CountingReader('[{"a": 1}, {"a": 1 "b": 2}, ' + rest + "]")
+    items = _iter_array(f, "bad.json", 16, max_element_size=1 << 20)
+    assert next(items) == {"a": 1}
+    with pytest.raises(ValueError, match="invalid JSON array element"):
+        next(items)
+    assert f.consumed < 100
+
+    # An element that never decodes is given up on once it outgrows the limit
+    (tmp_path / "huge.json").write_text('[{"description": "' + "x" * 500)
+    with pytest.raises(ValueError, match="longer than 100 characters"):
+        list(iter_listings(str(tmp_path / "huge.json"), read_size=16, max_element_size=100))
+
+
+def test_listing_writer_refuses_to_append_to_arrays(tmp_path):
+    with pytest.raises(ValueError):
+        ListingWriter(str(tmp_path / "listings.json"), append=True)
+
+    path = str(tmp_path / "listings.jsonl")
+    write_listings(path, LISTINGS[:1])
+    write_listings(path, LISTINGS[1:], append=True)
+    assert list(iter_listings(path)) == LISTINGS
+
+
+def test_bounded_prefetch_applies_backpressure_and_propagates_errors():
+    produced = []
+    release = threading.Event()
+
+    def items():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    stream = bounded_prefetch(items(), max_pending=2)
+    assert next(stream) == 0
+    release.wait(0.2)
+    # One item handed out, two queued, one blocked in put()
+    assert len(produced) <= 4
+    assert list(stream) == list(range(1, 10))
+
+    def failing():
+        yield 1
+        raise RuntimeError("parse error")
+
+    with pytest.raises(RuntimeError, match="parse error"):
+        list(bounded_prefetch(failing()))
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from metrics import MetricsRegistry, metrics
+from preference_parser import PreferenceParser
+from service import create_app
+
+
+def test_spans_counters_and_exports(tmp_path):
+    registry = MetricsRegistry(json_log_path=str(tmp_path / "spans.jsonl"))
+
+    @registry.timed("embedding", kind="query")
+    def embed():
+        return "vector"
+
+    assert embed() == "vector"
+    with pytest.raises(ValueError):
+        with registry.span("search"):
+            raise ValueError("boom")
+    registry.record_tokens("personalize", {"prompt_tokens": 100, "completion_tokens": 20}, model="gpt")
+    registry.record_cache("embedding", hits=3, misses=1)
+    registry.close()
+
+    snapshot = registry.snapshot()
+    assert {(stage["stage"], stage.get("kind"), stage["count"]) for stage in snapshot["stages"]} == \
+        {("embedding", "query", 1), ("search", None, 1)}
+    assert snapshot["cache_hit_rates"] == {"embedding": 0.75}
+    assert {"name": "errors_total", "stage": "search", "error": "ValueError", "value": 1} in snapshot["counters"]
+
+    text = registry.to_prometheus()
+    assert "# TYPE homematch_stage_duration_seconds histogram" in text
+    assert 'homematch_stage_duration_seconds_count{kind="query",stage="embedding"} 1' in text
+    assert 'homematch_stage_duration_seconds_bucket{stage="search",le="+Inf"} 1' in text
+    assert 'homematch_tokens_total{kind="prompt",model="gpt",stage="personalize"} 100' in text
+
+    events = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    assert [(event["stage"], event["error"]) for event in events] == [("embedding", None), ("search", "ValueError")]
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+
+    @registry.timed("embedding")
+    def embed():
+        return 1
+
+    with registry.span("search") as span:
+        assert span is registry.span("other")
+    registry.inc("tokens_total", 10)
+    registry.record_cache("embedding", hits=1)
+
+    assert embed() == 1
+    assert registry.snapshot() == {"stages": [], "counters": [], "cache_hit_rates": {}}
+    assert registry.to_prometheus() == "\n"
+
+
+def test_pipeline_stages_are_instrumented(fresh_metrics, fake_model_db, listings_file,
+                                          fake_server_personalizer):
+    fake_model_db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    _, personalizer = fake_server_personalizer()
+    app = create_app(db=fake_model_db, personalizer=personalizer, warm_up=False)
+    answers = ["Two bedrooms", "Schools", "Garden", "Bus", "Suburban"]
+    listing = {"description": "Original description Cozy home.", "neighborhood_description": "Leafy streets."}
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            await client.post("/match", json={"answers": answers, "n_results": 2})
+            await client.post("/personalize", json={"listing": listing, "preferences": "quiet"})
+            await client.post("/search", json={"query": "family home"})
+            text = await (await client.get("/metrics")).text()
+            snapshot = await (await client.get("/metrics", params={"format": "json"})).json()
+            return text, snapshot
+
+    text, snapshot = asyncio.run(run())
+    PreferenceParser().get_query_string()
+
+    stages = {stage["stage"] for stage in snapshot["stages"]}
+    assert {"embedding", "search_by_preferences", "search_batch", "vector_query", "personalize"} <= stages
+    assert 'stage="personalize"' in text and "homematch_tokens_total" in text
+    tokens = [c for c in snapshot["counters"] if c["name"] == "tokens_total" and c["kind"] == "completion"]
+    assert tokens and tokens[0]["value"] > 0
+    assert any(stage["stage"] == "preference_parsing" for stage in metrics.snapshot()["stages"])
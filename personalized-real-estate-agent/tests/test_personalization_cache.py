@@ -0,0 +1,153 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from personalization_cache import (
+    MemoryPersonalizationCache,
+    SQLitePersonalizationCache,
+    preference_fingerprint,
+)
+from personalizer import ListingPersonalizer
+
+SAMPLE_LISTING = {
+    "neighborhood": "Sunnydale",
+    "price": 650000,
+    "bedrooms": 3,
+    "bathrooms": 2,
+    "house_size": 1800,
+    "description": "A charming 3-bedroom home with a small backyard.",
+    "neighborhood_description": "Sunnydale is known for its vibrant nightlife."
+}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemoryPersonalizationCache(**kwargs)
+        return SQLitePersonalizationCache(str(tmp_path / "personalizations.db"), **kwargs)
+    return make
+
+
+def test_preference_fingerprint_ignores_case_and_punctuation():
+    assert preference_fingerprint("Quiet street, good schools!") == \
+        preference_fingerprint("  quiet street good   schools")
+    assert preference_fingerprint("quiet street") != preference_fingerprint("busy street")
+
+
+def test_cache_hit_miss_and_key_parts(make_cache):
+    cache = make_cache()
+    cache.set(SAMPLE_LISTING, "Quiet street.", "gpt-3.5-turbo", 0.7, "Personalized!")
+
+    assert cache.get(SAMPLE_LISTING, "quiet street", "gpt-3.5-turbo", 0.7) == "Personalized!"
+    # Listing metadata that carries its content hash maps to the same entry
+    assert cache.get(dict(SAMPLE_LISTING, content_hash="abc"), "quiet street", "gpt-3.5-turbo", 0.7) \
+        == "Personalized!"
+    assert cache.get(SAMPLE_LISTING, "quiet street", "gpt-4", 0.7) is None
+    assert cache.get(SAMPLE_LISTING, "quiet street", "gpt-3.5-turbo", 0.2) is None
+    assert cache.get(dict(SAMPLE_LISTING, price=1), "quiet street", "gpt-3.5-turbo", 0.7) is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+
+def test_cache_ttl_and_size_bound(make_cache):
+    cache = make_cache(ttl=0.05, max_entries=2)
+    for price in (1, 2, 3):
+        cache.set(dict(SAMPLE_LISTING, price=price), "prefs", "m", 0.7, f"description {price}")
+
+    assert len(cache) == 2
+    assert cache.get(dict(SAMPLE_LISTING, price=1), "prefs", "m", 0.7) is None
+    assert cache.get(dict(SAMPLE_LISTING, price=3), "prefs", "m", 0.7) == "description 3"
+    time.sleep(0.1)
+    assert cache.get(dict(SAMPLE_LISTING, price=3), "prefs", "m", 0.7) is None
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "personalizations.db")
+    SQLitePersonalizationCache(path).set(SAMPLE_LISTING, "prefs", "m", 0.7, "Shared")
+
+    assert SQLitePersonalizationCache(path).get(SAMPLE_LISTING, "prefs", "m", 0.7) == "Shared"
+
+
+def test_sqlite_cache_prunes_on_a_stride(tmp_path):
+    cache = SQLitePersonalizationCache(str(tmp_path / "personalizations.db"), max_entries=100)
+    for price in range(105):
+        cache.set(dict(SAMPLE_LISTING, price=price), "prefs", "m", 0.7, f"description {price}")
+
+    # Pruned after the 100th write; the next few writes only insert
+    assert len(cache) == 105
+    for price in range(105, 110):
+        cache.set(dict(SAMPLE_LISTING, price=price), "prefs", "m", 0.7, f"description {price}")
+    assert len(cache) == 100
+    assert cache.get(dict(SAMPLE_LISTING, price=9), "prefs", "m", 0.7) is None
+    assert cache.get(dict(SAMPLE_LISTING, price=109), "prefs", "m", 0.7) == "description 109"
+
+    plan = cache._conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM personalizations WHERE expires_at < ?", (time.time(),)
+    ).fetchall()
+    assert "personalizations_expires_at" in str(plan)
+
+
+def test_cache_backend_missing_a_method_fails_on_construction():
+    from personalization_cache import PersonalizationCache
+
+    class GetOnlyCache(PersonalizationCache):
+        def _get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        PersonalizationCache()
+    with pytest.raises(TypeError):
+        GetOnlyCache()
+
+
+@patch('openai.ChatCompletion.create')
+def test_personalizer_skips_llm_on_cache_hit(mock_chat_completion_create):
+    mock_chat_completion_create.return_value = MagicMock(
+        choices=[MagicMock(message={'content': "This is a personalized description."})]
+    )
+    personalizer = ListingPersonalizer(cache=MemoryPersonalizationCache())
+
+    first = personalizer.personalize_listing(SAMPLE_LISTING, "Quiet neighborhood, good schools.")
+    second = personalizer.personalize_listing(SAMPLE_LISTING, "quiet neighborhood good schools")
+
+    assert first == second == "This is a personalized description."
+    mock_chat_completion_create.assert_called_once()
+    assert personalizer.cache.stats()["llm_calls_saved"] == 1
+
+
+@patch('openai.ChatCompletion.create', side_effect=Exception("API down"))
+def test_personalizer_does_not_cache_fallback(mock_chat_completion_create):
+    personalizer = ListingPersonalizer(cache=MemoryPersonalizationCache())
+
+    assert personalizer.personalize_listing(SAMPLE_LISTING, "prefs") == SAMPLE_LISTING["description"]
+    assert len(personalizer.cache) == 0
+
+
+@patch('openai.ChatCompletion.acreate')
+def test_async_personalizer_uses_the_cache_off_the_event_loop(mock_chat_completion_acreate, tmp_path):
+    import threading
+
+    async def acreate(**kwargs):
+        return MagicMock(choices=[MagicMock(message={'content': "Async personalized."})])
+
+    mock_chat_completion_acreate.side_effect = acreate
+    cache = SQLitePersonalizationCache(str(tmp_path / "personalizations.db"))
+    cache_threads = []
+    for name in ("_get", "_set"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            cache_threads.append(threading.get_ident())
+            return method(*args)
+        setattr(cache, name, record)
+    personalizer = ListingPersonalizer(cache=cache)
+
+    first = personalizer.personalize_many([SAMPLE_LISTING], "prefs")
+    second = personalizer.personalize_many([SAMPLE_LISTING], "prefs")
+
+    assert first == second == ["Async personalized."]
+    mock_chat_completion_acreate.assert_called_once()
+    assert len(cache_threads) == 3
+    assert threading.get_ident() not in cache_threads
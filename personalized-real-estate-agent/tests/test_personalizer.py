@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 import pytest
 from unittest.mock import MagicMock, patch
 from personalizer import ListingPersonalizer
@@ -38,3 +41,104 @@ def test_personalize_listing(mock_chat_completion_create, personalizer_instance)
     assert kwargs['model'] == "gpt-3.5-turbo"
     assert "personalizing a property description" in kwargs['messages'][1]['content']
     assert "quiet neighborhood" in kwargs['messages'][1]['content']
+
+
+def _listing(i):
+    return {
+        "neighborhood": f"Neighborhood {i}",
+        "price": 500000 + i,
+        "bedrooms": 3,
+        "bathrooms": 2,
+        "house_size": 1800,
+        "description": f"Original description {i}.",
+        "neighborhood_description": "A quiet place."
+    }
+
+
+def _listing_number(messages):
+    return int(messages[-1]['content'].split("Original description ")[1].split(".")[0])
+
+
+def test_personalize_many_runs_concurrently_in_order(fake_server_personalizer):
+    # Later listings answer faster, so completion order differs from input order
+    server, personalizer = fake_server_personalizer(
+        latency=lambda messages: 0.4 - 0.1 * _listing_number(messages)
+    )
+    listings = [_listing(i) for i in range(4)]
+
+    started = time.perf_counter()
+    descriptions = personalizer.personalize_many(listings, "quiet neighborhood")
+    elapsed = time.perf_counter() - started
+
+    assert descriptions == [f"Personalized {i}" for i in range(4)]
+    assert server.max_in_flight == 4
+    assert elapsed < 0.8
+
+
+def test_personalize_many_retries_rate_limits(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer(fail_first=2, retry_after=0.05)
+
+    descriptions = personalizer.personalize_many([_listing(0), _listing(1)], "quiet neighborhood")
+
+    assert descriptions == ["Personalized 0", "Personalized 1"]
+    assert server.requests == 4
+
+
+def test_personalize_many_falls_back_after_retries(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer(fail_first=100)
+    personalizer.max_retries = 1
+
+    descriptions = personalizer.personalize_many([_listing(0)], "quiet neighborhood")
+
+    assert descriptions == ["Original description 0."]
+    assert server.requests == 2
+
+
+def test_personalize_many_inside_a_running_loop_points_to_the_async_version(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer()
+
+    async def caller():
+        with pytest.raises(RuntimeError, match="apersonalize_many"):
+            personalizer.personalize_many([_listing(0)], "quiet neighborhood")
+        return await personalizer.apersonalize_many([_listing(0)], "quiet neighborhood")
+
+    assert asyncio.run(caller()) == ["Personalized 0"]
+    assert server.requests == 1
+
+
+def test_apersonalize_as_completed_yields_in_completion_order(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer(
+        latency=lambda messages: 0.3 if _listing_number(messages) == 0 else 0.0
+    )
+
+    async def collect():
+        return [item async for item in personalizer.apersonalize_as_completed(
+            [_listing(0), _listing(1)], "quiet neighborhood")]
+
+    assert asyncio.run(collect()) == [(1, "Personalized 1"), (0, "Personalized 0")]
+
+
+def test_stream_personalized_listing_yields_chunks(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer()
+
+    chunks = list(personalizer.stream_personalized_listing(_listing(3), "quiet neighborhood"))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == "Personalized 3"
+
+
+def test_stream_personalized_listing_falls_back_mid_stream(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer(fail_stream_after=1)
+
+    chunks = list(personalizer.stream_personalized_listing(_listing(3), "quiet neighborhood"))
+
+    assert chunks[0] == "Personalized "
+    assert chunks[-1] == "Original description 3."
+
+
+def test_stream_personalized_listing_falls_back_before_first_chunk(fake_server_personalizer):
+    server, personalizer = fake_server_personalizer(fail_first=1)
+
+    chunks = list(personalizer.stream_personalized_listing(_listing(3), "quiet neighborhood"))
+
+    assert chunks == ["Original description 3."]
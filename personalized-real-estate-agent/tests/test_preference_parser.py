@@ -0,0 +1,48 @@
+from preference_parser import PreferenceParser
+
+
+def test_extract_preferences_from_default_answers():
+    parser = PreferenceParser()
+
+    preferences = parser.extract_preferences()
+
+    assert preferences.filters.ranges == {"bedrooms": (3, None)}
+    assert [facet.name for facet in preferences.facets] == \
+        ["size", "priorities", "amenities", "transportation", "urbanity"]
+    assert preferences.facets[3].text == parser.answers[3]
+    assert preferences.query_string == parser.get_query_string()
+
+
+def test_extract_filters_from_numeric_answers():
+    parser = PreferenceParser()
+
+    listing_filter = parser.extract_filters(
+        "At least 2 baths and 4 bedrooms, around 1,800 sq ft, with a budget of $750k "
+        "so probably something over $400,000."
+    )
+
+    assert listing_filter.ranges == {
+        "bedrooms": (4, None),
+        "bathrooms": (2, None),
+        "price": (400000, 750000),
+        "house_size": (1800, None),
+    }
+    assert not parser.extract_filters("A quiet street with a two-car garage.")
+
+
+def test_house_size_upper_bounds():
+    parser = PreferenceParser()
+
+    assert parser.extract_filters("Something under 2,000 sqft.").ranges == {"house_size": (None, 2000)}
+    assert parser.extract_filters("At most 1500 square feet, please.").ranges == {"house_size": (None, 1500)}
+    assert parser.extract_filters("Less than 900 sq ft is fine.").ranges == {"house_size": (None, 900)}
+    assert parser.extract_filters("At least 1,200 sq. ft but no more than 1,600 sqft.").ranges == \
+        {"house_size": (1200, 1600)}
+
+
+def test_number_words_inside_other_words_are_not_counts():
+    parser = PreferenceParser()
+
+    # "often" ends in "ten" and "someone" in "one"; neither is a count
+    assert not parser.extract_filters("I often take baths, and someone bedrooms-obsessed lives with me.")
+    assert parser.extract_filters("Ideally ten baths.").ranges == {"bathrooms": (10, None)}
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from ann_index import ExactIndex, load_index
+from quantization import ProductQuantizer, QuantizedIndex, ScalarQuantizer
+
+
+@pytest.fixture(scope="module")
+def clustered_vectors():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    vectors = centers[rng.integers(0, len(centers), 2000)] + 0.5 * rng.normal(size=(2000, 32))
+    return vectors.astype(np.float32)
+
+
+def _recall(index, vectors, k=10):
+    exact = ExactIndex(vectors.shape[1], metric=index.metric)
+    exact.add(vectors)
+    hits = [len(set(exact.search(q, k)[0]) & set(index.search(q, k)[0])) for q in vectors[:50]]
+    return sum(hits) / (50 * k)
+
+
+def test_scalar_quantizer_round_trip(clustered_vectors):
+    quantizer = ScalarQuantizer(32).train(clustered_vectors)
+    codes = quantizer.encode(clustered_vectors)
+
+    assert codes.dtype == np.uint8 and codes.shape == clustered_vectors.shape
+    np.testing.assert_allclose(quantizer.decode(codes), clustered_vectors, atol=quantizer.scale.max())
+
+
+@pytest.mark.parametrize("quantizer, min_ratio", [
+    (ScalarQuantizer(32), 3.5),
+    (ProductQuantizer(32, n_subvectors=4, iterations=10), 30),
+])
+def test_quantized_index_compression_and_rerank(clustered_vectors, quantizer, min_ratio):
+    index = QuantizedIndex(quantizer, metric="cosine",
+                           exact_vectors=lambda ids: clustered_vectors[ids])
+    index.build(clustered_vectors, ids=range(len(clustered_vectors)))
+
+    assert index.compression_ratio >= min_ratio
+    approximate_recall = _recall(index, clustered_vectors)
+    index.rerank = 100
+    assert _recall(index, clustered_vectors) >= max(approximate_recall, 0.9)
+
+    ids, distances = index.search(clustered_vectors[3], k=5)
+    assert ids[0] == 3
+    assert distances[0] == pytest.approx(0.0, abs=1e-5)
+    assert list(distances) == sorted(distances)
+
+
+def test_quantized_index_replace_remove_and_save_load(clustered_vectors, tmp_path):
+    index = QuantizedIndex(ProductQuantizer(32, n_subvectors=8, iterations=5))
+    index.build(clustered_vectors[:500], ids=[f"listing_{i}" for i in range(500)])
+    index.add(clustered_vectors[600:601], ids=["listing_1"])
+    index.remove(["listing_2"])
+
+    assert len(index) == 499
+    assert "listing_2" not in index.search(clustered_vectors[2], k=10)[0]
+
+    path = str(tmp_path / "quantized.npz")
+    index.save(path)
+    loaded = load_index(path)
+    assert isinstance(loaded, QuantizedIndex)
+    assert len(loaded) == 499
+    assert loaded.search(clustered_vectors[42], k=5)[0] == index.search(clustered_vectors[42], k=5)[0]
+
+
+def test_quantized_index_chunked_resync_reuses_slots(clustered_vectors):
+    index = QuantizedIndex(ScalarQuantizer(32).train(clustered_vectors), metric="cosine")
+    ids = [f"listing_{i}" for i in range(len(clustered_vectors))]
+    for start in range(0, len(ids), 100):
+        index.add(clustered_vectors[start:start + 100], ids=ids[start:start + 100])
+    buffer = index._codes
+    expected = index.search(clustered_vectors[3], k=5)[0]
+
+    # Re-upserting the same IDs overwrites their slots without growing or copying the codes
+    for _ in range(3):
+        for start in range(0, len(ids), 100):
+            index.add(clustered_vectors[start:start + 100], ids=ids[start:start + 100])
+    assert len(index) == index._size == len(ids)
+    assert index._codes is buffer
+    assert len(index._codes) <= 2 * len(ids)
+    assert index.search(clustered_vectors[3], k=5)[0] == expected
+
+    index.remove(ids[:1000])
+    assert len(index) == index._size == 1000
+    assert index.search(clustered_vectors[1500], k=1)[0] == ["listing_1500"]
+    # Compaction goes through the shared slot bookkeeping and keeps the sq8 norms aligned with their codes
+    np.testing.assert_allclose(index._code_norms[:index._size], index.quantizer.code_norms(index.codes), rtol=1e-6)
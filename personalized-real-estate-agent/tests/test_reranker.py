@@ -0,0 +1,83 @@
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from reranker import CrossEncoderReranker, benchmark_reranking
+
+
+def _keyword_scores(pairs, **kwargs):
+    # Relevance = how many query words appear in the document
+    return np.array([sum(word in document.lower() for word in query.lower().split()) for query, document in pairs],
+                    dtype=np.float32)
+
+
+@pytest.fixture
+def fake_cross_encoder():
+    with patch('reranker.CrossEncoder') as mock_cross_encoder:
+        mock_cross_encoder.return_value.predict.side_effect = _keyword_scores
+        yield mock_cross_encoder.return_value
+
+
+def _results(documents):
+    return {
+        'ids': [[f"listing_{i}" for i in range(len(documents))]],
+        'documents': [documents],
+        'metadatas': [[{"rank": i} for i in range(len(documents))]],
+        'distances': [[0.1 * i for i in range(len(documents))]],
+    }
+
+
+def test_rerank_reorders_by_cross_encoder_score_in_batches(fake_cross_encoder):
+    reranker = CrossEncoderReranker(batch_size=2, latency_budget=None)
+    documents = ["a loft downtown", "quiet suburban home with garden", "garden flat", "quiet garden home"]
+
+    reranked = reranker.rerank("quiet garden home", _results(documents), n_results=3)
+
+    assert reranked['ids'] == [["listing_1", "listing_3", "listing_2"]]
+    assert reranked['metadatas'][0][0] == {"rank": 1}
+    assert reranked['distances'] == [[0.1, pytest.approx(0.3), 0.2]]
+    assert reranked['rerank_scores'] == [[3.0, 3.0, 1.0]]
+    assert fake_cross_encoder.predict.call_count == 2
+    assert reranker.last_stats.as_dict()["scored"] == 4
+
+
+def test_rerank_stops_at_the_latency_budget(fake_cross_encoder):
+    def slow_scores(pairs, **kwargs):
+        time.sleep(0.05)
+        return _keyword_scores(pairs)
+
+    fake_cross_encoder.predict.side_effect = slow_scores
+    reranker = CrossEncoderReranker(batch_size=2, latency_budget=0.07)
+    documents = ["loft", "home", "garden home", "quiet garden home", "garden"]
+
+    reranked = reranker.rerank("quiet garden home", _results(documents), n_results=4)
+
+    stats = reranker.last_stats
+    assert stats.truncated and stats.batches == 1 and stats.scored == 2
+    # Scored candidates first by score, then the unscored ones in first-stage order
+    assert reranked['ids'] == [["listing_1", "listing_0", "listing_2", "listing_3"]]
+    assert np.isnan(reranked['rerank_scores'][0][2])
+
+    # None lifts the budget for one call, in rerank() as in score()
+    reranker.rerank("quiet garden home", _results(documents), n_results=4, latency_budget=None)
+    assert not reranker.last_stats.truncated and reranker.last_stats.scored == 5
+    assert not np.isnan(reranker.score("quiet garden home", documents, latency_budget=None)).any()
+    reranker.score("quiet garden home", documents)
+    assert reranker.last_stats.truncated
+
+
+def test_search_over_fetches_candidates(fake_cross_encoder, fake_model_db, listings_file):
+    fake_model_db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    reranker = CrossEncoderReranker(candidates=2, latency_budget=None)
+
+    results = reranker.search(fake_model_db, "downtown apartment with city views", n_results=1)
+
+    assert results['metadatas'][0][0]['neighborhood'] == "City Central"
+    assert len(fake_cross_encoder.predict.call_args[0][0]) == 2
+
+    rows = benchmark_reranking(fake_model_db, [("downtown apartment with city views", ["listing_1"])],
+                               reranker, n_results=1, candidate_counts=(2,), latency_budgets=(None, 10.0))
+    assert [row["reranked"] for row in rows] == [False, True, True]
+    assert rows[1]["precision"] == 1.0
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from service import MicroBatcher, create_app
+
+
+def test_micro_batcher_coalesces_concurrent_items():
+    batches = []
+    gate = threading.Event()
+
+    def handler(items):
+        gate.wait(1)
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(handler, max_batch_size=4, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)), asyncio.sleep(0.1))
+        gate.set()
+        await batcher.close()
+        return results[:-1]
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8, 10]
+    assert [len(batch) for batch in batches] == [4, 2]
+
+
+def test_micro_batcher_propagates_handler_errors():
+    def handler(items):
+        raise RuntimeError("encoder failed")
+
+    async def run():
+        batcher = MicroBatcher(handler)
+        try:
+            with pytest.raises(RuntimeError, match="encoder failed"):
+                await batcher.submit("query")
+        finally:
+            await batcher.close()
+
+    asyncio.run(run())
+
+
+def test_micro_batcher_fails_only_the_item_that_breaks_a_batch():
+    batches = []
+
+    def handler(items):
+        batches.append(list(items))
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    async def run():
+        batcher = MicroBatcher(handler, max_wait=0.05)
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in ["a", "bad", "c"]),
+                                        return_exceptions=True)
+        finally:
+            await batcher.close()
+
+    first, bad, third = asyncio.run(run())
+    assert (first, third) == ("A", "C")
+    assert isinstance(bad, ValueError)
+    # One batch of three, then each item on its own
+    assert batches == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+
+
+def _request_all(app, calls):
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            async def call(method, path, body):
+                response = await client.request(method, path, json=body)
+                return response.status, await response.json() if response.status == 200 else None
+            return await asyncio.gather(*(call(*c) for c in calls))
+    return asyncio.run(run())
+
+
+def test_search_endpoint_batches_concurrent_queries(fake_model_db, listings_file,
+                                                    fake_server_personalizer):
+    fake_model_db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    _, personalizer = fake_server_personalizer()
+    app = create_app(db=fake_model_db, personalizer=personalizer, max_wait=0.05)
+    fake_model_db.model.encode.reset_mock()
+
+    responses = _request_all(app, [
+        ("POST", "/search", {"query": "family home", "n_results": 1}),
+        ("POST", "/search", {"query": "city apartment", "n_results": 2}),
+        ("POST", "/search", {"query": "anything", "filters": {"min_price": 600000}}),
+        ("POST", "/search", {"query": "bad", "filters": {"min_garages": 1}}),
+        ("POST", "/search", {}),
+    ])
+
+    statuses = [status for status, _ in responses]
+    assert statuses == [200, 200, 200, 400, 400]
+    assert len(responses[0][1]["results"]) == 1
+    assert len(responses[1][1]["results"]) == 2
+    assert [r["listing"]["neighborhood"] for r in responses[2][1]["results"]] == ["City Central"]
+    # Warm-up encodes once; the three valid searches share a single encoder call
+    assert fake_model_db.model.encode.call_count == 2
+    assert len(fake_model_db.model.encode.call_args[0][0]) == 3
+
+
+def test_personalize_and_match_endpoints(fake_model_db, listings_file, fake_server_personalizer):
+    fake_model_db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    _, personalizer = fake_server_personalizer()
+    app = create_app(db=fake_model_db, personalizer=personalizer, warm_up=False)
+    listing = {"neighborhood": "Quiet Meadows", "description": "Original description Cozy home.",
+               "neighborhood_description": "Leafy streets."}
+    answers = ["Two bedrooms", "Schools", "Garden", "Bus", "Suburban"]
+
+    started = time.perf_counter()
+    responses = _request_all(app, [
+        ("POST", "/personalize", {"listing": listing, "preferences": "quiet"}),
+        ("POST", "/personalize", {"listing": {"description": "No neighborhood"}, "preferences": "quiet"}),
+        ("POST", "/match", {"answers": answers, "n_results": 2}),
+        ("POST", "/match", {"answers": answers[:2]}),
+        ("GET", "/health", None),
+    ])
+
+    assert time.perf_counter() - started < 10
+    assert [status for status, _ in responses] == [200, 400, 200, 400, 200]
+    assert responses[0][1] == {"description": "Personalized Cozy home"}
+    matched = responses[2][1]["results"]
+    assert len(matched) == 2
+    assert all(item["personalized_description"] for item in matched)
+    assert responses[4][1]["status"] == "ok"
+
+
+def test_invalid_n_results_is_a_bad_request(fake_model_db, listings_file, fake_server_personalizer):
+    fake_model_db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    _, personalizer = fake_server_personalizer()
+    app = create_app(db=fake_model_db, personalizer=personalizer, warm_up=False)
+    answers = ["Two bedrooms", "Schools", "Garden", "Bus", "Suburban"]
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            responses = []
+            for path, body in [
+                ("/search", {"query": "family home", "n_results": 0}),
+                ("/search", {"query": "family home", "n_results": -3}),
+                ("/search", {"query": "family home", "n_results": "many"}),
+                ("/search", {"query": "family home", "n_results": 2.5}),
+                ("/search", {"query": "family home", "n_results": True}),
+                ("/match", {"answers": answers, "n_results": 0}),
+                ("/match", {"answers": answers, "n_results": None}),
+                ("/search", {"query": "family home", "n_results": 1}),
+            ]:
+                response = await client.post(path, json=body)
+                responses.append((response.status, await response.text()))
+            return responses
+
+    responses = asyncio.run(run())
+    assert [status for status, _ in responses] == [400] * 7 + [200]
+    assert all("'n_results' must be a positive integer" in text for _, text in responses[:7])
+
+
+def test_bad_filters_are_rejected_without_failing_concurrent_searches(fake_model_db, listings_file,
+                                                                      fake_server_personalizer):
+    fake_model_db.ingest_listings(listings_file=listings_file, num_workers=1, progress=False)
+    _, personalizer = fake_server_personalizer()
+    app = create_app(db=fake_model_db, personalizer=personalizer, max_wait=0.05, warm_up=False)
+
+    responses = _request_all(app, [
+        ("POST", "/search", {"query": "family home", "n_results": 1}),
+        ("POST", "/search", {"query": "bad", "filters": {"min_price": {"a": 1}}}),
+        ("POST", "/search", {"query": "city apartment", "n_results": 2}),
+        ("POST", "/search", {"query": "bad", "filters": {"min_price": "abc"}}),
+        ("POST", "/search", {"query": "bad", "filters": {"max_bedrooms": True}}),
+        ("POST", "/search", {"query": "bad", "filters": ["min_price", 1]}),
+        ("POST", "/search", {"query": "anything", "filters": {"min_price": 600000, "max_price": None}}),
+    ])
+
+    assert [status for status, _ in responses] == [200, 400, 200, 400, 400, 400, 200]
+    assert len(responses[0][1]["results"]) == 1
+    assert len(responses[2][1]["results"]) == 2
+    assert [r["listing"]["neighborhood"] for r in responses[6][1]["results"]] == ["City Central"]
@@ -0,0 +1,180 @@
+import time
+from typing import Any, List, Optional, Set
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.llms.base import LLM
+from langchain.memory import ChatMessageHistory
+
+from conversation_memory import DeferredSummaryMemory, TokenBudgetMemory, count_tokens
+
+PLOT = "A long plot summary about a movie where many things happen to many people. " * 20
+
+
+def seeded_history(questions=3):
+    history = ChatMessageHistory()
+    history.add_user_message("You are AI that will recommend user a movie based on their answers.")
+    for i in range(questions):
+        history.add_ai_message(f"Personal question {i}?")
+        history.add_user_message(f"personal answer {i}")
+    return history
+
+
+def budget_memory(max_token_limit=600, recent_turns=2):
+    history = seeded_history()
+    return TokenBudgetMemory(chat_memory=history, max_token_limit=max_token_limit,
+                             pinned_messages=len(history.messages), recent_turns=recent_turns,
+                             memory_key="questions_and_answers", input_key="input")
+
+
+def rate(memory, turn):
+    memory.save_context({"input": f"{PLOT} Movie {turn}"},
+                        {"response": f"{PLOT} RATING FOR MOVIE Movie {turn} is {turn % 100}"})
+
+
+def test_count_tokens_is_positive_and_grows_with_text():
+    assert 0 < count_tokens("one movie") < count_tokens("one movie " * 50)
+
+
+def test_prompt_size_stays_flat_over_many_turns():
+    memory = budget_memory()
+    sizes = []
+    for turn in range(40):
+        rate(memory, turn)
+        sizes.append(memory.token_count())
+
+    assert max(sizes) <= memory.max_token_limit
+    # Once the budget is reached the history stops growing
+    assert sizes[-1] == sizes[19]
+    prompt = memory.load_memory_variables({})["questions_and_answers"]
+    assert count_tokens(prompt) <= memory.max_token_limit
+
+
+def test_pinned_questions_and_answers_survive_pruning():
+    memory = budget_memory()
+    pinned = [message.content for message in seeded_history().messages]
+    for turn in range(40):
+        rate(memory, turn)
+
+    messages = [message.content for message in memory.chat_memory.messages]
+    assert messages[:len(pinned)] == pinned
+
+
+def test_older_turns_shrink_to_their_rating_line_and_the_oldest_go_first():
+    memory = budget_memory(max_token_limit=1000, recent_turns=2)
+    for turn in range(40):
+        rate(memory, turn)
+
+    turns = [message.content for message in memory.chat_memory.messages[memory.pinned_messages:]]
+    # Only the AI side of a turn is remembered; the latest turns stay verbatim
+    assert turns[-1].startswith(PLOT) and turns[-1].endswith("RATING FOR MOVIE Movie 39 is 39")
+    assert turns[-2].startswith(PLOT)
+    # Older ones are reduced to their rating, newest kept, oldest evicted
+    compressed = turns[:-2]
+    assert compressed and all(line.startswith("RATING FOR MOVIE") for line in compressed)
+    assert compressed[-1] == "RATING FOR MOVIE Movie 37 is 37"
+    assert "RATING FOR MOVIE Movie 0 is 0" not in compressed
+
+
+def test_latest_turn_is_kept_even_over_budget():
+    memory = budget_memory(max_token_limit=10, recent_turns=1)
+    rate(memory, 0)
+
+    messages = memory.chat_memory.messages[memory.pinned_messages:]
+    assert len(messages) == 1
+    assert messages[0].content.endswith("RATING FOR MOVIE Movie 0 is 0")
+
+
+class RecordingLLM(LLM):
+    """Fake LLM answering "summary N" to the Nth prompt, optionally slowly or failing on some calls."""
+
+    delay: float = 0.0
+    fail_on: Set[int] = set()
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        if len(self.prompts) in self.fail_on:
+            raise RuntimeError("summary service unavailable")
+        return f"summary {len(self.prompts)}"
+
+
+def deferred_memory(llm, summarize_every=2):
+    return DeferredSummaryMemory(llm=llm, memory_key="recommendation_summary", input_key="input",
+                                 buffer="summary 0", summarize_every=summarize_every)
+
+
+def save_turns(memory, start, count):
+    for turn in range(start, start + count):
+        memory.save_context({"input": f"plot {turn}"}, {"response": f"rating {turn}"})
+
+
+def test_deferred_summary_batches_every_summarize_every_turns():
+    llm = RecordingLLM()
+    memory = deferred_memory(llm, summarize_every=3)
+
+    save_turns(memory, 0, 2)
+    memory.flush()
+    # flush summarizes whatever is queued, even short of a full batch
+    assert len(llm.prompts) == 1
+
+    save_turns(memory, 2, 7)
+    memory.flush()
+    memory.close()
+    # two full batches of three turns, then the remaining one on flush
+    assert len(llm.prompts) == 4
+    assert "plot 2" in llm.prompts[1] and "plot 4" in llm.prompts[1] and "plot 5" not in llm.prompts[1]
+    assert "plot 8" in llm.prompts[3]
+
+
+def test_deferred_summary_updates_apply_in_order():
+    llm = RecordingLLM(delay=0.02)
+    memory = deferred_memory(llm, summarize_every=1)
+
+    save_turns(memory, 0, 5)
+    memory.flush()
+    memory.close()
+
+    # each update starts from the summary the previous one produced
+    assert len(llm.prompts) == 5
+    for call, prompt in enumerate(llm.prompts):
+        assert f"summary {call}" in prompt and f"plot {call}" in prompt
+    assert memory.buffer == "summary 5"
+
+
+def test_deferred_summary_flush_waits_for_pending_updates():
+    llm = RecordingLLM(delay=0.2)
+    memory = deferred_memory(llm, summarize_every=1)
+
+    started = time.perf_counter()
+    save_turns(memory, 0, 1)
+    # saving only queues the update
+    assert time.perf_counter() - started < 0.1
+    assert memory.buffer == "summary 0"
+
+    memory.flush()
+    assert memory.buffer == "summary 1"
+    assert memory.load_memory_variables({})["recommendation_summary"] == "summary 1"
+    memory.close()
+
+
+def test_deferred_summary_keeps_previous_summary_on_failure():
+    llm = RecordingLLM(fail_on={2})
+    memory = deferred_memory(llm, summarize_every=1)
+
+    save_turns(memory, 0, 2)
+    memory.flush()
+    assert memory.buffer == "summary 1"
+
+    # the next update builds on the summary that survived the failure
+    save_turns(memory, 2, 1)
+    memory.close()
+    assert "summary 1" in llm.prompts[2]
+    assert memory.buffer == "summary 3"
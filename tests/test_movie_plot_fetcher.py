@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from movie_plot_fetcher import FILM_INFOBOX, MAX_TITLES_PER_REQUEST, ResponseCache, WikipediaPlotFetcher
+
+PLOT_TEXT = "{title} is a film.\n\n== Plot ==\nSomething happens in {title}.\n== Cast ==\nSomeone."
+
+
+class StubWikipedia:
+    """
+    Minimal MediaWiki API over HTTP for the fetcher tests.
+
+    ``pages`` maps page titles to {"categories": [...], "infobox": bool};
+    ``search`` maps search terms to result titles. Titles starting with a
+    lowercase letter are normalized by capitalizing them, ``redirects`` maps
+    titles to their targets, and text requests for titles in ``broken``
+    answer with a 500.
+    Every response carries an ETag, and a matching If-None-Match gets a 304.
+    """
+
+    def __init__(self, pages=None, search=None, redirects=None, broken=(), delay=0.0):
+        self.pages = pages or {}
+        self.search = search or {}
+        self.redirects = redirects or {}
+        self.broken = set(broken)
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failing = False
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                with stub._lock:
+                    stub.requests.append((params, dict(self.headers)))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    status, body = stub.respond(params)
+                    etag = '"v1"'
+                    if status == 200 and self.headers.get("If-None-Match") == etag:
+                        status, body = 304, None
+                    data = json.dumps(body).encode() if body is not None else b""
+                    self.send_response(status)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.api_url = f"http://127.0.0.1:{self.server.server_port}/w/api.php"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, params):
+        if self.failing:
+            return 500, {"error": "down"}
+        if params.get("list") == "search":
+            titles = self.search.get(params["srsearch"], [])
+            return 200, {"query": {"search": [{"title": title} for title in titles]}}
+
+        query = {"normalized": [], "redirects": [], "pages": {}}
+        for i, title in enumerate(params["titles"].split("|")):
+            if title in self.broken and params["prop"] == "extracts":
+                return 500, {"error": "broken"}
+            if title[0].islower():
+                query["normalized"].append({"from": title, "to": title[0].upper() + title[1:]})
+                title = title[0].upper() + title[1:]
+            if title in self.redirects:
+                query["redirects"].append({"from": title, "to": self.redirects[title]})
+                title = self.redirects[title]
+            page = self.pages.get(title)
+            if page is None:
+                query["pages"][str(-i - 1)] = {"title": title, "missing": ""}
+                continue
+            entry = {"title": title}
+            if "categories" in params["prop"]:
+                entry["categories"] = [{"title": category} for category in page.get("categories", [])]
+            if "templates" in params["prop"] and page.get("infobox"):
+                entry["templates"] = [{"title": FILM_INFOBOX}]
+            if params["prop"] == "extracts":
+                entry["extract"] = PLOT_TEXT.format(title=title)
+            query["pages"][str(i)] = entry
+        return 200, {"query": query}
+
+    def title_requests(self):
+        return [params for params, _ in self.requests if "titles" in params]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache"))
+
+
+def test_film_titles_batches_titles_and_checks_infobox_and_categories(cache):
+    pages = {f"Page {i}": {} for i in range(120)}
+    pages["Page 3"] = {"infobox": True}
+    pages["Page 60"] = {"categories": ["Category:2023 films"]}
+    # Descriptions such as "film director" or "film score" no longer make a page a film
+    pages["Page 100"] = {"categories": ["Category:American film directors", "Category:Film scores"]}
+    with StubWikipedia(pages=pages) as stub:
+        fetcher = WikipediaPlotFetcher(stub.api_url, cache=cache)
+
+        films = fetcher.film_titles(list(pages))
+
+    assert films == {"Page 3", "Page 60"}
+    batches = [params["titles"].split("|") for params in stub.title_requests()]
+    assert [len(batch) for batch in batches] == [MAX_TITLES_PER_REQUEST, MAX_TITLES_PER_REQUEST, 20]
+    assert all(params["tltemplates"] == FILM_INFOBOX for params in stub.title_requests())
+
+
+def test_query_pages_maps_normalized_and_redirected_titles(cache):
+    pages = {"Barbie (film)": {"infobox": True}, "Oppenheimer (film)": {"infobox": True}}
+    with StubWikipedia(pages=pages, redirects={"Oppenheimer (movie)": "Oppenheimer (film)"}) as stub:
+        fetcher = WikipediaPlotFetcher(stub.api_url, cache=cache)
+
+        found = fetcher._query_pages(["barbie (film)", "oppenheimer (movie)", "Nothing"], {"prop": "templates"})
+        films = fetcher.film_titles(["barbie (film)", "oppenheimer (movie)"])
+
+    assert set(found) == {"barbie (film)", "oppenheimer (movie)"}
+    assert found["barbie (film)"]["title"] == "Barbie (film)"
+    assert found["oppenheimer (movie)"]["title"] == "Oppenheimer (film)"
+    assert films == {"barbie (film)", "oppenheimer (movie)"}
+
+
+def test_cache_fresh_hit_revalidation_and_stale_on_error(cache):
+    with StubWikipedia(search={"Barbie": ["Barbie (film)"]}) as stub:
+        fetcher = WikipediaPlotFetcher(stub.api_url, cache=cache)
+        assert fetcher.search("Barbie") == ["Barbie (film)"]
+        assert len(stub.requests) == 1
+
+        # Within the TTL the cached response is used without a request
+        assert WikipediaPlotFetcher(stub.api_url, cache=cache).search("Barbie") == ["Barbie (film)"]
+        assert len(stub.requests) == 1
+
+        # Past the TTL it is revalidated with its ETag and the 304 keeps the cached data
+        expired = ResponseCache(cache.cache_dir, ttl=0)
+        revalidating = WikipediaPlotFetcher(stub.api_url, cache=expired)
+        assert revalidating.search("Barbie") == ["Barbie (film)"]
+        assert stub.requests[-1][1].get("If-None-Match") == '"v1"'
+        assert revalidating.not_modified == 1
+
+        # When the server fails, the stale entry is served instead of raising
+        stub.failing = True
+        assert revalidating.search("Barbie") == ["Barbie (film)"]
+        with pytest.raises(Exception):
+            revalidating.search("Oppenheimer")
+
+
+def test_fetch_plots_runs_concurrently_and_reports_missing_and_failed_movies(cache):
+    pages = {
+        "Barbie (film)": {"infobox": True},
+        "Oppenheimer (film)": {"categories": ["Category:2023 films"]},
+        "Dumb Money": {"infobox": True},
+        "Greta Gerwig": {"categories": ["Category:American film directors"]},
+    }
+    search = {
+        "Barbie": ["Greta Gerwig", "Barbie (film)"],
+        "Oppenheimer": ["Oppenheimer (film)"],
+        "Dumb Money": ["Dumb Money"],
+        "Unknown": ["Greta Gerwig"],
+    }
+    with StubWikipedia(pages=pages, search=search, broken={"Dumb Money"}, delay=0.05) as stub:
+        fetcher = WikipediaPlotFetcher(stub.api_url, cache=cache, max_workers=4)
+
+        plots = fetcher.fetch_plots(["Barbie", "Oppenheimer", "Dumb Money", "Unknown"])
+
+    assert list(plots) == ["Barbie", "Oppenheimer", "Dumb Money", "Unknown"]
+    assert plots["Barbie"] == "Overview:\nBarbie (film) is a film.\nPlot:\nSomething happens in Barbie (film)."
+    assert "Something happens in Oppenheimer (film)." in plots["Oppenheimer"]
+    assert plots["Dumb Money"] == "Error fetching plot."
+    assert plots["Unknown"] == "Movie not found."
+    assert stub.max_in_flight > 1
+
+
+def test_default_cache_is_created_per_fetcher_and_can_be_disabled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first, second = WikipediaPlotFetcher(), WikipediaPlotFetcher()
+    assert first.cache is not second.cache
+    assert WikipediaPlotFetcher(cache=False).cache is None
+    assert not list(tmp_path.iterdir())